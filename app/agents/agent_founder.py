@@ -1,7 +1,8 @@
-import json
+import asyncio
 from typing import Dict, Any
 
 from .base_agent import BaseAgent
+from app.tools import search_tools
 from app.core.data_models import ResearchPlan
 from app.utils.llm_interface import LLMInterface
 from app.core.prompts import AGENT_FOUNDER_PROMPT
@@ -15,15 +16,18 @@ class AgentFounder(BaseAgent):
     e criar uma equipe de agentes especializados, definindo suas personas,
     objetivos e ferramentas para a missão de pesquisa.
     """
+    READS = ("user_request",)
+    WRITES = ("mission_plan",)
 
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, runtime: Dict[str, Any] | None = None):
         # A constituição do AgentFounder é pré-definida.
         super().__init__(
             session_id=session_id,
             role="Meta-Agente Estratégico",
             goal="Criar um plano de missão detalhado e uma equipe de agentes de IA para executá-lo.",
             tools=["llm_call"],
-            constraints=["O plano deve ser gerado em formato JSON válido e seguir o schema definido."]
+            constraints=["O plano deve ser gerado em formato JSON válido e seguir o schema definido."],
+            runtime=runtime
         )
         self.llm = LLMInterface()
 
@@ -42,18 +46,26 @@ class AgentFounder(BaseAgent):
         topic = user_request.get("topic")
 
         if not topic:
-            self.log("Erro: Tópico da pesquisa não encontrado na requisição.")
+            self.log("Erro: Tópico da pesquisa não encontrado na requisição.", level="error")
             raise ValueError("O tópico da pesquisa é obrigatório.")
 
         # Formata o prompt com o tópico da requisição
         formatted_prompt = AGENT_FOUNDER_PROMPT.format(topic=topic)
 
-        # Chama o LLM para gerar o plano de missão
+        # Chama o LLM em streaming: cada query concluída já dispara sua busca,
+        # que o WebSailorV2 reaproveita ao executar o plano.
         self.log(f"Consultando LLM para criar plano para o tópico: '{topic}'")
-        raw_plan = await self.llm.generate_json(formatted_prompt)
+        search_tasks = self.runtime.setdefault("search_tasks", {})
+
+        def start_search(query: str):
+            if query not in search_tasks:
+                self.log(f"Query pronta, iniciando busca antecipada: '{query}'")
+                search_tasks[query] = asyncio.create_task(search_tools.search_for_query(query))
+
+        raw_plan = await self.llm.stream_json(formatted_prompt, "search_queries", start_search)
 
         if not raw_plan:
-            self.log("Erro: LLM não retornou um plano de missão válido.")
+            self.log("Erro: LLM não retornou um plano de missão válido.", level="error")
             raise ValueError("Falha ao gerar o plano de missão.")
 
         # Valida o plano com Pydantic
@@ -62,7 +74,7 @@ class AgentFounder(BaseAgent):
             state["mission_plan"] = mission_plan.dict()
             self.log(f"Plano de missão validado. {len(mission_plan.team)} agentes designados.")
         except ValidationError as e:
-            self.log(f"Erro de validação do plano gerado pela IA: {e}")
+            self.log(f"Erro de validação do plano gerado pela IA: {e}", level="error")
             raise ValueError(f"O plano de missão gerado pela IA é inválido: {e}")
 
         return state
\ No newline at end of file
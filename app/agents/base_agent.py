@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+from app.core.mission_status import mission_status
+from app.utils.logger import get_logger
 
 class BaseAgent(ABC):
     """
@@ -8,8 +11,22 @@ class BaseAgent(ABC):
     Cada agente representa uma entidade autônoma com uma função específica
     dentro de uma missão de pesquisa. Eles operam sobre um estado compartilhado,
     modificando-o sequencialmente para atingir o objetivo da missão.
+
+    Cada subclasse declara em `READS` e `WRITES` as chaves do estado que lê e
+    escreve; o Controller usa essas declarações para executar em paralelo os
+    agentes independentes. Agentes sem declaração (None) rodam isolados, como
+    uma barreira entre os anteriores e os seguintes. `STREAMS_OUT`/`STREAMS_IN`
+    indicam as chaves que o agente sabe publicar/consumir item a item pelo
+    pipeline, sem esperar o produtor terminar; o Controller liga os streams
+    em `output_streams`/`input_streams` quando o modo pipeline se aplica.
     """
-    def __init__(self, session_id: str, role: str, goal: str, tools: list, constraints: list):
+    READS: Tuple[str, ...] | None = None
+    WRITES: Tuple[str, ...] | None = None
+    STREAMS_OUT: Tuple[str, ...] = ()
+    STREAMS_IN: Tuple[str, ...] = ()
+
+    def __init__(self, session_id: str, role: str, goal: str, tools: list, constraints: list,
+                 runtime: Dict[str, Any] | None = None):
         """
         Inicializa o agente com sua 'constituição' definida pelo AgentFounder.
 
@@ -19,6 +36,8 @@ class BaseAgent(ABC):
             goal (str): O objetivo mensurável que o agente deve alcançar.
             tools (list): A lista de ferramentas que o agente está autorizado a usar.
             constraints (list): As limitações e regras que o agente deve seguir.
+            runtime (Dict[str, Any] | None): Contexto da missão em memória, compartilhado
+                entre os agentes e não persistido (ex.: buscas já disparadas).
         """
         self.session_id = session_id
         self.role = role
@@ -26,6 +45,9 @@ class BaseAgent(ABC):
         self.tools = tools
         self.constraints = constraints
         self.memory = set()  # Memória interna para evitar trabalho duplicado
+        self.runtime = runtime if runtime is not None else {}
+        self.output_streams: Dict[str, Any] = {}
+        self.input_streams: Dict[str, Any] = {}
 
     @abstractmethod
     async def execute(self, state: Dict[str, Any]) -> Dict[str, Any]:
@@ -47,6 +69,18 @@ class BaseAgent(ABC):
         """Retorna o nome da classe do agente."""
         return self.__class__.__name__
 
-    def log(self, message: str):
-        """Helper para logging padronizado dos agentes."""
-        print(f"[{self.get_name()}][{self.session_id}]: {message}")
\ No newline at end of file
+    def log(self, message: str, level: str = "info", **fields: Any):
+        """
+        Helper para logging padronizado dos agentes: ponto único de entrada
+        dos registros deles, sempre com o `session_id` da missão.
+
+        Args:
+            message (str): Texto do registro.
+            level (str): "debug", "info", "warning" ou "error".
+            **fields: Campos estruturados extras (ex.: url=..., count=...).
+        """
+        getattr(get_logger(self.get_name()), level)(message, session_id=self.session_id, **fields)
+
+    def emit(self, event_type: str, **data: Any):
+        """Publica um evento de progresso da missão (ex.: 'content_extracted') para os clientes conectados."""
+        mission_status.record(self.session_id, event_type, {"agent": self.get_name(), **data})
@@ -3,17 +3,41 @@ from typing import Dict, Any, List
 
 from .base_agent import BaseAgent
 from app.tools import extraction_tools
+from app.core.pipeline import ItemStream
+from app.utils import near_duplicates
+from app.utils.parser_pool import parser_pool
+from app.utils.url_normalizer import url_key
+from app.tools.fetch_scheduler import (
+    fetch_scheduler, HostQueue, HostThrottledError, FETCH_THROTTLE_REQUEUES, FETCH_THROTTLE_GIVE_UP
+)
 
 class ContentExtractorV2(BaseAgent):
     """
     Agente responsável por processar URLs e extrair conteúdo limpo.
+
+    Além da URL exata, descarta textos quase idênticos (artigos sindicados,
+    variantes AMP/canônicas, press releases espelhados) comparando assinaturas
+    SimHash em um índice por faixas; o documento mantido lista as URLs
+    descartadas em 'near_duplicates'.
     """
+    READS = ("search_results",)
+    WRITES = ("extracted_data",)
+    STREAMS_IN = ("search_results",)
     MAX_CONCURRENT_EXTRACTIONS = 10
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fingerprints = near_duplicates.NearDuplicateIndex()
+        self.throttle_requeues: Dict[str, int] = {}
+
     async def execute(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Extrai conteúdo das URLs coletadas pelos agentes de busca.
 
+        No modo pipeline, consome as URLs do stream de 'search_results' enquanto
+        as buscas ainda estão em andamento. Os downloads são intercalados entre
+        os hosts, respeitando o ritmo de cada um (`fetch_scheduler`).
+
         Args:
             state (Dict[str, Any]): O estado atual com 'search_results'.
 
@@ -21,37 +45,134 @@ class ContentExtractorV2(BaseAgent):
             Dict[str, Any]: O estado atualizado com 'extracted_data'.
         """
         self.log(f"Iniciando extração de conteúdo: {self.goal}")
-        search_results = state.get("search_results", [])
-        urls_to_extract = [item.get("url") for item in search_results if item.get("url")]
+        queue = HostQueue(fetch_scheduler)
+        stream = self.input_streams.get("search_results")
+        if stream is not None:
+            self.log(f"Extraindo conteúdo em pipeline com {self.MAX_CONCURRENT_EXTRACTIONS} workers...")
+            feeder = asyncio.create_task(self._feed_from_stream(stream, queue))
+            try:
+                final_data = await self._run_workers(queue)
+            finally:
+                feeder.cancel()
+                await asyncio.gather(feeder, return_exceptions=True)
+        else:
+            search_results = state.get("search_results", [])
+            urls_to_extract = [item.get("url") for item in search_results if item.get("url")]
 
-        if not urls_to_extract:
-            self.log("Nenhuma URL para extrair.")
-            state["extracted_data"] = []
-            return state
+            if not urls_to_extract:
+                self.log("Nenhuma URL para extrair.")
+                state["extracted_data"] = []
+                return state
 
-        tasks = []
-        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_EXTRACTIONS)
+            queued = sum(self._enqueue(url, queue) for url in urls_to_extract)
+            queue.close()
+            self.log(f"Extraindo conteúdo de {queued} URLs...")
+            final_data = await self._run_workers(queue)
 
-        async def extract_with_semaphore(url):
-            async with semaphore:
-                return await extraction_tools.extract_content_robust(url)
+        state["extracted_data"] = final_data
+        self.log(f"Extração concluída. {len(final_data)} conteúdos extraídos com sucesso.")
 
-        for url in urls_to_extract:
-            if url not in self.memory:
-                tasks.append(extract_with_semaphore(url))
-                self.memory.add(url)
+        return state
 
-        self.log(f"Extraindo conteúdo de {len(tasks)} URLs...")
-        extracted_results = await asyncio.gather(*tasks, return_exceptions=True)
+    def _enqueue(self, url: str, queue: HostQueue) -> bool:
+        """Enfileira a URL se ela ainda não foi vista nesta missão."""
+        key = url_key(url)
+        if key in self.memory:
+            return False
+        self.memory.add(key)
+        queue.add(url)
+        return True
 
-        final_data = []
-        for result in extracted_results:
-            if isinstance(result, Exception):
-                self.log(f"Erro na extração: {result}")
-            elif result:
-                final_data.append(result)
+    async def _feed_from_stream(self, stream: ItemStream, queue: HostQueue):
+        """Repassa as URLs do stream de 'search_results' para a fila por host, conforme chegam."""
+        try:
+            async for item in stream:
+                if item.get("url"):
+                    self._enqueue(item["url"], queue)
+        finally:
+            queue.close()
 
-        state["extracted_data"] = final_data
-        self.log(f"Extração concluída. {len(final_data)} conteúdos extraídos com sucesso.")
+    async def _run_workers(self, queue: HostQueue) -> List[Dict[str, Any]]:
+        """
+        Workers retiram as URLs da fila, que alterna entre os hosts e só entrega
+        URLs de hosts prontos para receber requisições. Uma URL de host em
+        pausa longa (429/503) volta para a fila em vez de ocupar o worker.
+        """
+        final_data: List[Dict[str, Any]] = []
+
+        async def worker():
+            while (url := await queue.next()) is not None:
+                try:
+                    result = await extraction_tools.extract_content_robust(url)
+                except HostThrottledError as e:
+                    # Reenfileira antes do done(): a fila não pode parecer vazia aos outros workers
+                    self._requeue_throttled(url, e, queue)
+                    continue
+                except Exception as e:
+                    self.log(f"Erro na extração: {e}", level="error")
+                    self.emit("extraction_failed", url=url, error=str(e))
+                    continue
+                finally:
+                    queue.done(url)
+                result = await self._accept(url, result)
+                if result:
+                    final_data.append(result)
+
+        await asyncio.gather(*(worker() for _ in range(self.MAX_CONCURRENT_EXTRACTIONS)))
+        return final_data
+
+    def _requeue_throttled(self, url: str, error: HostThrottledError, queue: HostQueue):
+        """Devolve a URL à fila, que só a entrega quando o host sair da pausa, ou desiste dela."""
+        requeues = self.throttle_requeues.get(url, 0)
+        if requeues >= FETCH_THROTTLE_REQUEUES or error.retry_in > FETCH_THROTTLE_GIVE_UP:
+            self.log(f"{error} Desistindo de {url}.", level="warning")
+            self.emit("extraction_failed", url=url, error=str(error))
+            return
+        self.throttle_requeues[url] = requeues + 1
+        self.log(f"{error} {url} volta para a fila.", level="debug")
+        queue.add(url)
+
+    async def _accept(self, url: str, result: Dict[str, Any] | None) -> Dict[str, Any] | None:
+        """Publica o resultado da extração e o devolve, ou None se falhou ou é quase-duplicata."""
+        if not result:
+            self.emit("extraction_failed", url=url)
+            return None
+        duplicate_of = await self._find_near_duplicate(url, result)
+        if duplicate_of is not None:
+            self.log(f"Conteúdo de {url} é quase idêntico ao de {duplicate_of}. Descartado.")
+            self.emit("content_duplicate", url=url, duplicate_of=duplicate_of)
+            return None
+        self.emit("content_extracted", url=url, method=result.get("method"), chars=len(result.get("content") or ""))
+        return result
+
+    async def _find_near_duplicate(self, url: str, result: Dict[str, Any]) -> str | None:
+        if not near_duplicates.NEAR_DUP_ENABLED:
+            return None
+        # A assinatura é CPU-bound: roda no pool de parsing, fora do event loop
+        fingerprint = await parser_pool.run(near_duplicates.simhash, result.get("content") or "")
+        if fingerprint is None:
+            return None
+        original = self._find_in_mission(url, fingerprint)
+        if original is not None:
+            return original
+        # Só entra nos índices a página mantida: uma descartada como duplicata
+        # de outra sessão não pode servir de original às páginas seguintes
+        if near_duplicates.global_index is not None:
+            other = await near_duplicates.global_index.find(fingerprint, self.session_id)
+            if other is not None:
+                return f"{other['url']} (sessão {other['session_id']})"
+            # Outra extração desta missão pode ter entrado durante a consulta
+            original = self._find_in_mission(url, fingerprint)
+            if original is not None:
+                return original
+        self.fingerprints.add(fingerprint, result)
+        if near_duplicates.global_index is not None:
+            await near_duplicates.global_index.add(fingerprint, url, self.session_id)
+        return None
 
-        return state
\ No newline at end of file
+    def _find_in_mission(self, url: str, fingerprint: int) -> str | None:
+        original = self.fingerprints.find(fingerprint)
+        if original is None:
+            return None
+        original.setdefault("near_duplicates", []).append(url)
+        return original["url"]
@@ -10,6 +10,8 @@ class ViralContentAgent(BaseAgent):
     Focado em redes sociais, utiliza ferramentas específicas para identificar
     posts com alto engajamento.
     """
+    READS = ("user_request",)
+    WRITES = ("viral_content_results",)
 
     async def execute(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -9,6 +9,8 @@ class VisualEvidenceAgent(BaseAgent):
     O "fotógrafo" da missão, responsável por capturar screenshots
     como prova visual irrefutável.
     """
+    READS = ("mission_plan",)
+    WRITES = ("screenshot_results",)
     MAX_CONCURRENT_SCREENSHOTS = 3  # Limita para não sobrecarregar o sistema
 
     async def execute(self, state: Dict[str, Any]) -> Dict[str, Any]:
@@ -35,7 +37,12 @@ class VisualEvidenceAgent(BaseAgent):
 
         async def capture_with_semaphore(url):
             async with semaphore:
-                return await screenshot_tool.capture_screenshot(url, self.session_id)
+                result = await screenshot_tool.capture_screenshot(url, self.session_id)
+                if result and result.get("success"):
+                    self.emit("screenshot_captured", url=url, filepath=result.get("filepath"))
+                else:
+                    self.emit("screenshot_failed", url=url, error=(result or {}).get("error"))
+                return result
 
         for url in targets:
             tasks.append(capture_with_semaphore(url))
@@ -46,7 +53,7 @@ class VisualEvidenceAgent(BaseAgent):
         final_results = []
         for result in results:
             if isinstance(result, Exception):
-                self.log(f"Erro na captura de screenshot: {result}")
+                self.log(f"Erro na captura de screenshot: {result}", level="error")
             elif result and result.get("success"):
                 final_results.append(result)
 
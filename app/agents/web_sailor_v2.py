@@ -3,6 +3,9 @@ from typing import Dict, Any, List
 
 from .base_agent import BaseAgent
 from app.tools import search_tools
+from app.core.pipeline import ItemStream
+from app.utils.url_normalizer import normalize_url, url_key
+from app.utils.seen_urls import seen_urls, SEEN_URLS_SKIP
 
 class WebSailorV2(BaseAgent):
     """
@@ -11,11 +14,18 @@ class WebSailorV2(BaseAgent):
     Utiliza um arsenal de ferramentas de busca para encontrar informações
     relevantes, seguindo as diretrizes de seu objetivo e persona.
     """
+    READS = ("mission_plan",)
+    WRITES = ("search_results",)
+    STREAMS_OUT = ("search_results",)
 
     async def execute(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Executa as buscas na web definidas no plano.
 
+        No modo pipeline, cada URL nova é publicada no stream de 'search_results'
+        assim que a busca que a encontrou termina, para a extração começar antes
+        do fim das demais buscas.
+
         Args:
             state (Dict[str, Any]): O estado atual, contendo o 'mission_plan'.
 
@@ -23,7 +33,14 @@ class WebSailorV2(BaseAgent):
             Dict[str, Any]: O estado atualizado com os 'search_results'.
         """
         self.log(f"Iniciando missão: {self.goal}")
+        stream = self.output_streams.get("search_results")
+        try:
+            return await self._search(state, stream)
+        finally:
+            if stream is not None:
+                await stream.close()
 
+    async def _search(self, state: Dict[str, Any], stream: ItemStream | None) -> Dict[str, Any]:
         mission_plan = state.get("mission_plan", {})
         queries = mission_plan.get("search_queries", [])
 
@@ -32,36 +49,83 @@ class WebSailorV2(BaseAgent):
             state["search_results"] = []
             return state
 
+        # Reaproveita as buscas já disparadas pelo AgentFounder durante o streaming do plano
+        prefetched = self.runtime.get("search_tasks", {})
         tasks = []
+        reused = 0
         for query in queries:
-            # Seleciona a ferramenta de busca apropriada (aqui simplificado, poderia ser mais inteligente)
-            if "social" in query.lower() or "instagram" in query.lower():
-                tasks.append(search_tools.search_viral_content(query))
+            task = prefetched.pop(query, None)
+            if task is not None:
+                reused += 1
+                tasks.append(task)
             else:
-                # Usa uma ferramenta de busca genérica com rotação
-                tasks.append(search_tools.search_web_robust(query))
+                tasks.append(search_tools.search_for_query(query))
+
+        self.log(f"Executando {len(tasks)} tarefas de busca em paralelo ({reused} já iniciadas durante o planejamento)...")
+        if stream is not None:
+            state["search_results"] = await self._stream_results(tasks, stream)
+            self.log(f"Busca concluída. {len(state['search_results'])} URLs únicas publicadas no pipeline.")
+            return state
 
-        self.log(f"Executando {len(tasks)} tarefas de busca em paralelo...")
         results_list = await asyncio.gather(*tasks, return_exceptions=True)
 
         # Consolida e limpa os resultados
         all_results: List[Dict[str, Any]] = []
         for result in results_list:
             if isinstance(result, Exception):
-                self.log(f"Erro em uma tarefa de busca: {result}")
+                self.log(f"Erro em uma tarefa de busca: {result}", level="error")
             elif result:
                 all_results.extend(result)
 
-        # Remove duplicatas baseadas na URL
+        # Remove duplicatas pela URL canônica
         unique_urls = set()
         unique_results = []
         for item in all_results:
-            url = item.get("url")
-            if url and url not in unique_urls:
-                unique_urls.add(url)
+            item = self._accept(item, unique_urls)
+            if item is not None:
                 unique_results.append(item)
 
         state["search_results"] = unique_results
         self.log(f"Busca concluída. {len(unique_results)} URLs únicas encontradas.")
 
-        return state
\ No newline at end of file
+        return state
+
+    async def _stream_results(self, tasks: List[Any], stream: ItemStream) -> List[Dict[str, Any]]:
+        """Deduplica os resultados conforme as buscas terminam e os publica no stream."""
+        unique_urls = set()
+        unique_results = []
+        for next_done in asyncio.as_completed([asyncio.ensure_future(task) for task in tasks]):
+            try:
+                result = await next_done
+            except Exception as e:
+                self.log(f"Erro em uma tarefa de busca: {e}", level="error")
+                continue
+            for item in result or []:
+                item = self._accept(item, unique_urls)
+                if item is not None:
+                    unique_results.append(item)
+                    # Bloqueia se a extração estiver atrasada (backpressure)
+                    await stream.put(item)
+        return unique_results
+
+    def _accept(self, item: Dict[str, Any], unique_urls: set) -> Dict[str, Any] | None:
+        """
+        Normaliza a URL do resultado e o devolve se for inédito na missão.
+
+        Variações de esquema, 'www.', barra final, fragmento e parâmetros de
+        rastreamento contam como a mesma URL. Com `SEEN_URLS_SKIP`, URLs já
+        processadas em missões anteriores também são descartadas.
+        """
+        url = item.get("url")
+        if not url:
+            return None
+        key = url_key(url)
+        if key in unique_urls:
+            return None
+        unique_urls.add(key)
+        if SEEN_URLS_SKIP and seen_urls.seen(url):
+            self.log(f"URL já processada em missão anterior, ignorada: {url}")
+            return None
+        item = {**item, "url": normalize_url(url)}
+        self.emit("url_found", url=item["url"])
+        return item
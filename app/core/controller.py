@@ -1,12 +1,25 @@
+import os
 import uuid
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List, Set, Tuple
 
+from app.agents.base_agent import BaseAgent
 from app.agents.agent_founder import AgentFounder
 from app.agents.web_sailor_v2 import WebSailorV2
 from app.agents.viral_content_agent import ViralContentAgent
 from app.agents.content_extractor_v2 import ContentExtractorV2
 from app.agents.visual_evidence_agent import VisualEvidenceAgent
+from app.core.pipeline import ItemStream
+from app.core.mission_status import mission_status
 from app.utils.data_saver import DataSaver
+from app.utils.logger import get_logger, session_context
+from app.utils.tracer import tracer, span
+
+logger = get_logger("Controller")
+
+# Modo pipeline: produtores e consumidores compatíveis trocam itens por filas limitadas
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "true").lower() in ("1", "true", "yes")
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "20"))
 
 class Controller:
     """
@@ -23,19 +36,27 @@ class Controller:
             "VisualEvidenceAgent": VisualEvidenceAgent,
         }
         self.data_saver = DataSaver()
-        print("Controller ARQV30-AI inicializado.")
+        self.status = mission_status
+        logger.info("Controller ARQV30-AI inicializado.")
+
+    @staticmethod
+    def new_session_id() -> str:
+        """Gera um novo ID de sessão de missão."""
+        return f"session_{uuid.uuid4().hex}"
 
-    async def start_mission(self, user_request: Dict[str, Any]) -> str:
+    async def start_mission(self, user_request: Dict[str, Any], session_id: str | None = None) -> str:
         """
         Inicia e gerencia uma nova missão de pesquisa.
 
         Args:
             user_request (Dict[str, Any]): A requisição inicial do usuário.
+            session_id (str | None): ID já reservado (ex.: pelo MissionScheduler).
 
         Returns:
             str: O ID da sessão da missão.
         """
-        session_id = f"session_{uuid.uuid4().hex}"
+        session_id = session_id or self.new_session_id()
+        self.status.start(session_id, user_request)
         state = {
             "session_id": session_id,
             "user_request": user_request,
@@ -45,38 +66,180 @@ class Controller:
             "screenshot_results": []
         }
         await self.data_saver.save_state(session_id, "00_initial_state", state)
-        print(f"[{session_id}] Nova missão iniciada. Tópico: {user_request.get('topic')}")
+        logger.info(f"Nova missão iniciada. Tópico: {user_request.get('topic')}", session_id=session_id)
 
+        # Contexto em memória compartilhado pelos agentes da missão (não é persistido)
+        runtime: Dict[str, Any] = {}
+        trace = tracer.begin(session_id)
+        try:
+            # Registros e spans das ferramentas chamadas pelos agentes também levam o session_id
+            with session_context(session_id), tracer.activate(trace):
+                with span("mission", "controller", topic=user_request.get("topic")):
+                    await self._run_mission(session_id, state, runtime)
+        except asyncio.CancelledError:
+            self.status.finish(session_id, "erro", error="Missão cancelada.")
+            raise
+        except Exception as e:
+            self.status.finish(session_id, "erro", error=str(e))
+            raise
+        else:
+            self.status.finish(session_id, "concluído")
+        finally:
+            self._cancel_pending(session_id, runtime)
+            await self.data_saver.close_session(session_id)
+            await tracer.save(trace)
+        return session_id
+
+    async def _run_mission(self, session_id: str, state: Dict[str, Any], runtime: Dict[str, Any]):
         # Etapa 1: Fundar a Equipe com o AgentFounder
-        founder = AgentFounder(session_id)
-        state = await founder.execute(state)
-        await self.data_saver.save_state(session_id, "01_mission_plan", state)
+        founder = AgentFounder(session_id, runtime=runtime)
+        self.status.stage_started(session_id, founder.get_name())
+        with span(founder.get_name(), "agent"), tracer.profile(founder.get_name()):
+            state = await founder.execute(state)
+        with span("save_state", "io", step="01_mission_plan"):
+            await self.data_saver.save_state(session_id, "01_mission_plan", state)
+        self.status.stage_finished(session_id, founder.get_name(), "01_mission_plan", state)
 
         # Etapa 2: Instanciar e Executar a Equipe
         mission_plan = state.get("mission_plan", {})
         team = mission_plan.get("team", [])
 
         if not team:
-            print(f"[{session_id}] Missão encerrada: Nenhum agente foi definido pelo AgentFounder.")
-            return session_id
+            logger.warning("Missão encerrada: Nenhum agente foi definido pelo AgentFounder.", session_id=session_id)
+            return
 
-        # Executa os agentes definidos no plano
-        for i, agent_config in enumerate(team):
+        # Instancia os agentes definidos no plano
+        agents = []
+        for agent_config in team:
             agent_class_name = agent_config.get("agent_class")
             if agent_class_name in self.agent_map:
                 agent_class = self.agent_map[agent_class_name]
-                agent_instance = agent_class(
+                agents.append(agent_class(
                     session_id=session_id,
                     role=agent_config.get("role", ""),
                     goal=agent_config.get("goal", ""),
                     tools=agent_config.get("tools", []),
-                    constraints=agent_config.get("constraints", [])
-                )
-                print(f"[{session_id}] Executando Agente: {agent_instance.get_name()}")
-                state = await agent_instance.execute(state)
-                await self.data_saver.save_state(session_id, f"{i+2:02d}_{agent_instance.get_name()}_output", state)
+                    constraints=agent_config.get("constraints", []),
+                    runtime=runtime
+                ))
             else:
-                print(f"[{session_id}] Aviso: Agente '{agent_class_name}' definido no plano não é reconhecido.")
+                logger.warning(f"Aviso: Agente '{agent_class_name}' definido no plano não é reconhecido.", session_id=session_id)
+
+        # Executa a equipe respeitando apenas as dependências reais de dados
+        await self._run_team(session_id, agents, state)
+        logger.info("Missão concluída. Todos os agentes executaram suas tarefas.", session_id=session_id)
+
+    @staticmethod
+    def _plan_streams(agents: List[BaseAgent]) -> Dict[str, Tuple[List[int], int]]:
+        """
+        Identifica as chaves que podem fluir em pipeline: para cada chave, um único
+        consumidor com `STREAMS_IN` cujos escritores anteriores no plano declaram
+        todos `STREAMS_OUT`.
+
+        Returns:
+            Dict[str, Tuple[List[int], int]]: chave -> (índices dos produtores, índice do consumidor).
+        """
+        streams: Dict[str, Tuple[List[int], int]] = {}
+        if not PIPELINE_STREAMING:
+            return streams
+        keys = {key for agent in agents for key in agent.STREAMS_IN}
+        for key in keys:
+            consumers = [j for j, a in enumerate(agents) if key in a.STREAMS_IN and key in (a.READS or ())]
+            if len(consumers) != 1:
+                continue
+            consumer = consumers[0]
+            writers = [i for i in range(consumer) if agents[i].WRITES is None or key in agents[i].WRITES]
+            if writers and all(key in agents[i].STREAMS_OUT for i in writers):
+                streams[key] = (writers, consumer)
+        return streams
+
+    @staticmethod
+    def _build_dependencies(agents: List[BaseAgent], streams: Dict[str, Tuple[List[int], int]] | None = None) -> List[Set[int]]:
+        """
+        Monta o DAG de execução a partir das chaves que cada agente lê e escreve.
+
+        Um agente depende de um anterior (na ordem do plano) quando lê algo que
+        ele escreve, escreve algo que ele escreve ou escreve algo que ele lê.
+        Agentes sem declaração funcionam como barreira. Chaves ligadas por
+        stream (`streams`) não geram dependência entre produtor e consumidor.
+        """
+        streams = streams or {}
+        dependencies: List[Set[int]] = []
+        for j, agent in enumerate(agents):
+            deps = set()
+            for i in range(j):
+                earlier = agents[i]
+                if agent.READS is None or earlier.READS is None:
+                    deps.add(i)
+                    continue
+                reads_j, writes_j = set(agent.READS), set(agent.WRITES or ())
+                reads_i, writes_i = set(earlier.READS), set(earlier.WRITES or ())
+                streamed = {key for key, (producers, consumer) in streams.items() if i in producers and consumer == j}
+                if (writes_i & reads_j) - streamed or writes_i & writes_j or reads_i & writes_j:
+                    deps.add(i)
+            dependencies.append(deps)
+        return dependencies
+
+    async def _run_team(self, session_id: str, agents: List[BaseAgent], state: Dict[str, Any]):
+        """
+        Executa os agentes como um DAG: os independentes rodam em paralelo.
+
+        Cada agente recebe uma cópia rasa do estado no momento em que suas
+        dependências terminam, e somente as chaves declaradas em `WRITES` são
+        incorporadas de volta ao estado compartilhado.
+        """
+        streams = self._plan_streams(agents)
+        for key, (producers, consumer) in streams.items():
+            stream = ItemStream(producers=len(producers), maxsize=PIPELINE_QUEUE_SIZE)
+            for i in producers:
+                agents[i].output_streams[key] = stream
+            agents[consumer].input_streams[key] = stream
+            names = ", ".join(agents[i].get_name() for i in producers)
+            logger.debug(f"Pipeline: '{key}' flui de {names} para {agents[consumer].get_name()}.", session_id=session_id)
+
+        dependencies = self._build_dependencies(agents, streams)
+        for j, agent in enumerate(agents):
+            waits_for = ", ".join(agents[i].get_name() for i in sorted(dependencies[j])) or "nenhum"
+            logger.debug(f"DAG: {agent.get_name()} depende de: {waits_for}", session_id=session_id)
+
+        step_counter = iter(range(2, 2 + len(agents)))
+        tasks: List[asyncio.Task] = []
+
+        async def run_node(j: int):
+            agent = agents[j]
+            if dependencies[j]:
+                with span("waiting", "controller", agent=agent.get_name()):
+                    await asyncio.gather(*(tasks[i] for i in dependencies[j]))
+            logger.debug(f"Executando Agente: {agent.get_name()}", session_id=session_id)
+            self.status.stage_started(session_id, agent.get_name())
+            with span(agent.get_name(), "agent"), tracer.profile(agent.get_name()):
+                result = await agent.execute(dict(state))
+            if agent.WRITES is None:
+                state.update(result)
+            else:
+                for key in agent.WRITES:
+                    if key in result:
+                        state[key] = result[key]
+            # Checkpoints numerados pela ordem de conclusão: o último arquivo é sempre o estado mais completo
+            step_name = f"{next(step_counter):02d}_{agent.get_name()}_output"
+            with span("save_state", "io", step=step_name):
+                await self.data_saver.save_state(session_id, step_name, state)
+            self.status.stage_finished(session_id, agent.get_name(), step_name, state)
+
+        for j in range(len(agents)):
+            tasks.append(asyncio.create_task(run_node(j), name=agents[j].get_name()))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
-        print(f"[{session_id}] Missão concluída. Todos os agentes executaram suas tarefas.")
-        return session_id
\ No newline at end of file
+    def _cancel_pending(self, session_id: str, runtime: Dict[str, Any]):
+        """Cancela buscas antecipadas que nenhum agente consumiu (ex.: plano inválido)."""
+        pending = [task for task in runtime.get("search_tasks", {}).values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.info(f"{len(pending)} buscas antecipadas não utilizadas foram canceladas.", session_id=session_id)
\ No newline at end of file
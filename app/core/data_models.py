@@ -19,4 +19,5 @@ class ResearchPlan(BaseModel):
 class UserRequest(BaseModel):
     """Modelo para a requisição do usuário que inicia a pesquisa."""
     topic: str
-    user_id: str | None = None
\ No newline at end of file
+    user_id: str | None = None
+    priority: int = Field(0, ge=0, le=9, description="Prioridade na fila de missões (maior valor, maior prioridade).")
\ No newline at end of file
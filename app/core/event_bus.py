@@ -0,0 +1,86 @@
+import os
+import time
+import asyncio
+from typing import Any, Dict, Set
+
+# Eventos pendentes por assinante; acima disso os mais antigos são descartados
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+
+class Subscription:
+    """
+    Fila de eventos de uma sessão para um assinante (ex.: uma conexão SSE).
+
+    Um cliente lento nunca bloqueia quem publica: com a fila cheia, o evento
+    mais antigo é descartado e contado em `dropped`. O manifesto de status
+    continua sendo a fonte da verdade para reconstruir o estado completo.
+    """
+    def __init__(self, bus: "EventBus", session_id: str, maxsize: int):
+        self.bus = bus
+        self.session_id = session_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def deliver(self, event: Dict[str, Any]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float | None = None) -> Dict[str, Any] | None:
+        """Próximo evento, ou None se nada chegar dentro de `timeout` segundos."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class EventBus:
+    """
+    Barramento de eventos em processo, por sessão.
+
+    Agentes e o rastreador de status publicam com `publish`; os endpoints de
+    progresso (SSE/WebSocket) assinam com `subscribe`. A publicação é síncrona
+    e não faz I/O: sem assinantes, custa apenas a montagem do evento.
+    """
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._sequence: Dict[str, int] = {}
+
+    def subscribe(self, session_id: str) -> Subscription:
+        subscription = Subscription(self, session_id, self.queue_size)
+        self._subscribers.setdefault(session_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.session_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.session_id]
+
+    def publish(self, session_id: str, event_type: str, data: Dict[str, Any] | None = None):
+        """Entrega um evento a todos os assinantes da sessão."""
+        seq = self._sequence.get(session_id, 0) + 1
+        self._sequence[session_id] = seq
+        subscribers = self._subscribers.get(session_id)
+        if not subscribers:
+            return
+        event = {"type": event_type, "session_id": session_id, "seq": seq, "ts": time.time(), "data": data or {}}
+        for subscription in list(subscribers):
+            subscription.deliver(event)
+
+    def forget(self, session_id: str):
+        """Libera o contador de sequência de uma sessão encerrada."""
+        self._sequence.pop(session_id, None)
+
+event_bus = EventBus()
@@ -0,0 +1,138 @@
+import os
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+from app.core.mission_status import mission_status
+from app.utils.logger import get_logger
+
+logger = get_logger("MissionScheduler")
+
+# Capacidade de execução de missões (variáveis de ambiente)
+MISSION_CONCURRENCY = int(os.getenv("MISSION_CONCURRENCY", "2"))
+MISSION_QUEUE_SIZE = int(os.getenv("MISSION_QUEUE_SIZE", "50"))
+# Estimativa inicial de duração de uma missão, usada no Retry-After antes de haver histórico
+MISSION_DEFAULT_DURATION = float(os.getenv("MISSION_DEFAULT_DURATION", "60"))
+
+class QueueFullError(Exception):
+    """A fila de missões atingiu o limite; o cliente deve tentar após `retry_after` segundos."""
+    def __init__(self, retry_after: int):
+        super().__init__(f"Fila de missões cheia. Tente novamente em {retry_after}s.")
+        self.retry_after = retry_after
+
+class MissionScheduler:
+    """
+    Fila de missões com slots de execução limitados, prioridades e justiça entre usuários.
+
+    `submit` devolve o session_id imediatamente; os workers retiram as missões
+    da fila pela maior prioridade e, dentro de uma prioridade, alternam entre
+    usuários (round-robin), para que um único usuário não monopolize os slots.
+    Com a fila cheia, `submit` levanta `QueueFullError` (HTTP 429).
+    """
+    def __init__(self, controller, concurrency: int = MISSION_CONCURRENCY, max_queue: int = MISSION_QUEUE_SIZE):
+        self.controller = controller
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        # prioridade -> (usuário -> fila de (session_id, user_request))
+        self._queues: Dict[int, "OrderedDict[str, Deque[Tuple[str, Dict[str, Any]]]]"] = {}
+        self._queued: Dict[str, int] = {}
+        self._running: Dict[str, float] = {}
+        self._durations: Deque[float] = deque(maxlen=20)
+        self._available: asyncio.Semaphore | None = None
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        """Inicia os workers de execução (idempotente)."""
+        if self._workers:
+            return
+        self._available = asyncio.Semaphore(len(self._queued))
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        logger.info(f"{self.concurrency} slots de execução, fila de até {self.max_queue} missões.")
+
+    def submit(self, user_request: Dict[str, Any], priority: int = 0) -> str:
+        """
+        Enfileira uma missão.
+
+        Args:
+            user_request (Dict[str, Any]): A requisição do usuário.
+            priority (int): Maior valor, maior prioridade.
+
+        Returns:
+            str: O session_id reservado para a missão.
+        """
+        if len(self._queued) >= self.max_queue:
+            raise QueueFullError(self.estimate_retry_after())
+        self.start()
+        session_id = self.controller.new_session_id()
+        user_key = user_request.get("user_id") or "anonimo"
+        by_user = self._queues.setdefault(priority, OrderedDict())
+        by_user.setdefault(user_key, deque()).append((session_id, user_request))
+        self._queued[session_id] = priority
+        mission_status.create(session_id, user_request, priority)
+        self._available.release()
+        logger.debug(f"Missão {session_id} enfileirada (prioridade {priority}, usuário {user_key}).")
+        return session_id
+
+    def _next(self) -> Tuple[str, Dict[str, Any]]:
+        """Retira a próxima missão: maior prioridade, alternando entre usuários."""
+        priority = max(p for p, by_user in self._queues.items() if by_user)
+        by_user = self._queues[priority]
+        user_key, missions = next(iter(by_user.items()))
+        session_id, user_request = missions.popleft()
+        if missions:
+            by_user.move_to_end(user_key)
+        else:
+            del by_user[user_key]
+        del self._queued[session_id]
+        return session_id, user_request
+
+    async def _worker(self, slot: int):
+        while True:
+            await self._available.acquire()
+            session_id, user_request = self._next()
+            started = time.monotonic()
+            self._running[session_id] = started
+            logger.info(f"Slot {slot} executando {session_id} ({len(self._queued)} na fila).")
+            try:
+                await self.controller.start_mission(user_request, session_id=session_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Missão {session_id} falhou: {e}")
+            finally:
+                self._running.pop(session_id, None)
+                self._durations.append(time.monotonic() - started)
+
+    def queue_position(self, session_id: str) -> int | None:
+        """Posição aproximada (1 = próxima) de uma missão na fila, ou None se não estiver na fila."""
+        if session_id not in self._queued:
+            return None
+        priority = self._queued[session_id]
+        ahead = sum(
+            len(missions) for p, by_user in self._queues.items() if p > priority for missions in by_user.values()
+        )
+        for missions in self._queues[priority].values():
+            for position, (queued_id, _) in enumerate(missions):
+                if queued_id == session_id:
+                    return ahead + position + 1
+        return ahead + 1
+
+    def estimate_retry_after(self) -> int:
+        """Segundos estimados até abrir espaço na fila, com base nas últimas durações."""
+        average = sum(self._durations) / len(self._durations) if self._durations else MISSION_DEFAULT_DURATION
+        # Com todos os slots ocupados, em média uma missão termina a cada average / slots segundos
+        return max(1, math.ceil(average / self.concurrency))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queued": len(self._queued), "running": len(self._running), "slots": self.concurrency, "max_queue": self.max_queue}
+
+    async def close(self):
+        """Cancela os workers e as missões em execução."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if workers:
+            logger.info(f"Encerrado ({len(self._queued)} missões ainda na fila).")
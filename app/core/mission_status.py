@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict
+
+from app.core.event_bus import event_bus
+from app.utils.logger import get_logger
+
+logger = get_logger("MissionStatus")
+
+# Quantos manifestos de missões encerradas ficam no índice em memória
+MISSION_STATUS_CACHE_SIZE = int(os.getenv("MISSION_STATUS_CACHE_SIZE", "1000"))
+
+MANIFEST_FILENAME = "status.json"
+TERMINAL_STATUSES = ("concluído", "erro")
+# Eventos publicados pelos agentes que incrementam os contadores do manifesto
+COUNTED_EVENTS = {
+    "url_found": "urls_found",
+    "content_extracted": "contents_extracted",
+    "screenshot_captured": "screenshots_captured"
+}
+
+def summarize(state: Dict[str, Any]) -> Dict[str, int]:
+    """Contadores exibidos pelo frontend, calculados a partir do estado da missão."""
+    return {
+        "urls_found": len(state.get("search_results") or []),
+        "contents_extracted": len(state.get("extracted_data") or []),
+        "screenshots_captured": len(state.get("screenshot_results") or [])
+    }
+
+class MissionStatusTracker:
+    """
+    Manifesto de status por sessão, mantido pelo Controller a cada transição de etapa.
+
+    Cada transição (e cada evento de item registrado com `record`) também é
+    publicada no `event_bus`, alimentando os endpoints de progresso. O índice
+    em memória responde às consultas de status sem tocar no estado
+    completo; cada alteração incrementa `version` e é gravada de forma atômica
+    em `sessions/<id>/status.json` fora do event loop, para que o status
+    sobreviva a reinícios do servidor.
+    """
+    def __init__(self, base_dir: str = "sessions", max_cached: int = MISSION_STATUS_CACHE_SIZE):
+        self.base_dir = base_dir
+        self.max_cached = max_cached
+        self._index: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty: set = set()
+        self._writers: Dict[str, asyncio.Task] = {}
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.base_dir, session_id, MANIFEST_FILENAME)
+
+    def create(self, session_id: str, user_request: Dict[str, Any], priority: int = 0):
+        """Registra uma missão recém-enfileirada."""
+        now = time.time()
+        self._index[session_id] = {
+            "session_id": session_id,
+            "version": 0,
+            "status": "iniciando",
+            "last_step": "na_fila",
+            "topic": user_request.get("topic"),
+            "priority": priority,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "updated_at": now,
+            "running": [],
+            "stages": {},
+            "data_summary": summarize({}),
+            "error": None
+        }
+        self._touch(session_id)
+        self._publish(session_id, "mission_queued", {"priority": priority})
+
+    def start(self, session_id: str, user_request: Dict[str, Any] | None = None):
+        """Marca o início da execução da missão."""
+        if session_id not in self._index:
+            self.create(session_id, user_request or {})
+        manifest = self._index[session_id]
+        manifest["status"] = "em_progresso"
+        manifest["started_at"] = time.time()
+        self._touch(session_id)
+        self._publish(session_id, "mission_started")
+
+    def stage_started(self, session_id: str, stage: str):
+        manifest = self._index.get(session_id)
+        if manifest is None:
+            return
+        manifest["stages"][stage] = {"started_at": time.time(), "finished_at": None, "duration": None}
+        manifest["running"].append(stage)
+        self._touch(session_id)
+        self._publish(session_id, "stage_started", {"stage": stage})
+
+    def stage_finished(self, session_id: str, stage: str, step_name: str, state: Dict[str, Any]):
+        """Fecha uma etapa: registra a duração, o checkpoint e os contadores atuais."""
+        manifest = self._index.get(session_id)
+        if manifest is None:
+            return
+        now = time.time()
+        timing = manifest["stages"].setdefault(stage, {"started_at": now, "finished_at": None, "duration": None})
+        timing["finished_at"] = now
+        timing["duration"] = round(now - timing["started_at"], 3)
+        if stage in manifest["running"]:
+            manifest["running"].remove(stage)
+        manifest["last_step"] = step_name
+        # Os contadores ao vivo podem estar à frente do estado mesclado (etapas em paralelo)
+        counts = summarize(state)
+        manifest["data_summary"] = {k: max(v, manifest["data_summary"].get(k, 0)) for k, v in counts.items()}
+        self._touch(session_id)
+        self._publish(session_id, "stage_finished", {"stage": stage, "step": step_name, "duration": timing["duration"]})
+
+    def record(self, session_id: str, event_type: str, data: Dict[str, Any] | None = None):
+        """Registra um evento de item (ex.: URL extraída), atualizando os contadores ao vivo."""
+        manifest = self._index.get(session_id)
+        counter = COUNTED_EVENTS.get(event_type)
+        if manifest is not None and counter is not None:
+            manifest["data_summary"][counter] = manifest["data_summary"].get(counter, 0) + 1
+            self._touch(session_id)
+        self._publish(session_id, event_type, data)
+
+    def finish(self, session_id: str, status: str, error: str | None = None):
+        """Marca o estado terminal da missão ("concluído" ou "erro")."""
+        manifest = self._index.get(session_id)
+        if manifest is None:
+            return
+        manifest["status"] = status
+        manifest["error"] = error
+        manifest["running"] = []
+        manifest["finished_at"] = time.time()
+        self._touch(session_id)
+        self._publish(session_id, "mission_finished", {"status": status, "error": error})
+        event_bus.forget(session_id)
+        self._trim()
+
+    def get(self, session_id: str) -> Dict[str, Any] | None:
+        """Manifesto em memória (sem I/O)."""
+        return self._index.get(session_id)
+
+    async def load(self, session_id: str) -> Dict[str, Any] | None:
+        """Manifesto em memória ou, para sessões de execuções anteriores, lido do disco."""
+        manifest = self._index.get(session_id)
+        if manifest is not None:
+            return manifest
+        manifest = await asyncio.to_thread(self._read_file, session_id)
+        if manifest is not None:
+            self._index[session_id] = manifest
+            self._trim()
+        return manifest
+
+    def _publish(self, session_id: str, event_type: str, data: Dict[str, Any] | None = None):
+        payload = dict(data or {})
+        manifest = self._index.get(session_id)
+        if manifest is not None:
+            payload.setdefault("version", manifest["version"])
+            payload.setdefault("data_summary", dict(manifest["data_summary"]))
+        event_bus.publish(session_id, event_type, payload)
+
+    def _touch(self, session_id: str):
+        manifest = self._index[session_id]
+        manifest["version"] += 1
+        manifest["updated_at"] = time.time()
+        self._index.move_to_end(session_id)
+        self._dirty.add(session_id)
+        if session_id not in self._writers:
+            self._writers[session_id] = asyncio.create_task(self._flush_session(session_id))
+
+    async def _flush_session(self, session_id: str):
+        # Um único escritor por sessão: alterações feitas durante a escrita saem na próxima volta
+        try:
+            while session_id in self._dirty:
+                self._dirty.discard(session_id)
+                manifest = self._index.get(session_id)
+                if manifest is None:
+                    break
+                data = json.dumps(manifest, ensure_ascii=False, default=str)
+                await asyncio.to_thread(self._write_file, session_id, data)
+        except Exception as e:
+            logger.error(f"Erro ao gravar manifesto de {session_id}: {e}")
+        finally:
+            self._writers.pop(session_id, None)
+
+    def _write_file(self, session_id: str, data: str):
+        path = self._path(session_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read_file(self, session_id: str) -> Dict[str, Any] | None:
+        try:
+            with open(self._path(session_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _trim(self):
+        """Descarta do índice os manifestos encerrados mais antigos (continuam no disco)."""
+        excess = len(self._index) - self.max_cached
+        if excess <= 0:
+            return
+        for session_id in list(self._index):
+            if excess <= 0:
+                break
+            manifest = self._index[session_id]
+            if manifest["status"] in TERMINAL_STATUSES and session_id not in self._writers:
+                del self._index[session_id]
+                excess -= 1
+
+    async def flush(self):
+        """Aguarda a gravação dos manifestos pendentes."""
+        while self._writers:
+            await asyncio.gather(*list(self._writers.values()), return_exceptions=True)
+
+mission_status = MissionStatusTracker()
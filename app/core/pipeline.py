@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any
+
+_DONE = object()
+
+class ItemStream:
+    """
+    Fila assíncrona limitada que liga agentes produtores e consumidores de uma chave do estado.
+
+    Os produtores publicam cada item assim que ele fica pronto e chamam
+    `close()` ao terminar; os consumidores iteram com `async for` até que
+    todos os produtores tenham fechado. Com a fila cheia, `put` bloqueia o
+    produtor (backpressure) até o consumidor liberar espaço.
+    """
+    def __init__(self, producers: int, maxsize: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._open_producers = producers
+        self._exhausted = False
+        self.items_put = 0
+
+    async def put(self, item: Any):
+        """Publica um item, aguardando espaço na fila se necessário."""
+        await self._queue.put(item)
+        self.items_put += 1
+
+    async def close(self):
+        """Sinaliza que um produtor terminou."""
+        await self._queue.put(_DONE)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        while True:
+            item = await self._queue.get()
+            if item is not _DONE:
+                return item
+            if not self._exhausted:
+                self._open_producers -= 1
+                if self._open_producers > 0:
+                    continue
+                self._exhausted = True
+            # Repassa o sinal de fim para os demais consumidores que aguardam
+            self._queue.put_nowait(_DONE)
+            raise StopAsyncIteration
@@ -1,16 +1,67 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict
+from typing import Any, Dict, List, Tuple
 import os
+import re
 import json
+import asyncio
 
 from app.core.controller import Controller
+from app.core.mission_scheduler import MissionScheduler, QueueFullError
+from app.core.mission_status import mission_status, summarize, TERMINAL_STATUSES
+from app.core.event_bus import event_bus
 from app.core.data_models import UserRequest
+from app.utils.http_client import http_client
+from app.utils.parser_pool import parser_pool
+from app.tools.browser_pool import browser_pool
+from app.tools.fetch_scheduler import fetch_scheduler
+from app.tools.fetch_resilience import fetch_resilience
+from app.tools.search_tools import search_cache_stats, search_caches
+from app.utils.page_cache import page_cache
+from app.utils.llm_interface import llm_cache
+from app.utils.api_rotator import api_rotator
+from app.utils.response_cache import make_key
+from app.utils.screenshot_store import screenshot_store
+from app.utils.seen_urls import seen_urls
+from app.utils.response_stream import negotiate_encoding, iter_json, encode_chunks, encode_cursor, decode_cursor
+from app.utils import metrics
+from app.utils.logger import get_logger, shutdown as shutdown_logging, stats as log_stats
+from app.utils.tracer import tracer
+
+logger = get_logger("API")
+
+# Intervalo (s) dos heartbeats nas conexões de progresso, para manter proxies abertos
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+# Listas do estado paginadas em /research-results
+PAGINATED_KEYS = ("extracted_data", "screenshot_results")
+RESULTS_DEFAULT_PAGE_SIZE = 50
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cria os recursos compartilhados da aplicação e os libera no encerramento."""
+    await http_client.start()
+    await seen_urls.start()
+    parser_pool.start()
+    await browser_pool.start()
+    mission_scheduler.start()
+    try:
+        yield
+    finally:
+        await mission_scheduler.close()
+        await mission_status.flush()
+        await browser_pool.close()
+        await parser_pool.close()
+        await seen_urls.close()
+        await http_client.close()
+        shutdown_logging()
 
 app = FastAPI(
     title="ARQV30-AI Data Stage API",
     description="API para orquestrar missões de pesquisa de mercado autônomas.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -23,82 +74,342 @@ app.add_middleware(
 )
 
 controller = Controller()
+mission_scheduler = MissionScheduler(controller)
+
+# Métricas lidas na hora da coleta do /metrics (sem custo no caminho quente)
+metrics.register_gauge("arqv30_missions_running", "Missões em execução.", lambda: mission_scheduler.stats()["running"])
+metrics.register_gauge("arqv30_missions_queued", "Missões aguardando um slot.", lambda: mission_scheduler.stats()["queued"])
+metrics.register_gauge("arqv30_fetch_in_flight", "Downloads de páginas em andamento.", lambda: fetch_scheduler.stats()["in_flight"])
+metrics.register_gauge("arqv30_fetch_open_circuits", "Hosts com o circuito aberto.", lambda: fetch_resilience.stats()["open_circuits"])
+metrics.register_gauge("arqv30_log_queue_depth", "Registros de log aguardando escrita.", lambda: log_stats()["queued"])
+metrics.register_cache("page", page_cache.counters)
+metrics.register_cache("llm", llm_cache.counters)
+for provider, cache in search_caches.items():
+    metrics.register_cache(f"search:{provider}", cache.counters)
+metrics.register_cache("screenshots", screenshot_store.counters)
+metrics.register_cache("seen_urls", seen_urls.counters)
 
 @app.post("/start-research", status_code=202)
-async def start_research(request: UserRequest, background_tasks: BackgroundTasks):
+async def start_research(request: UserRequest):
     """
     Inicia uma nova missão de pesquisa de mercado em background.
     Retorna imediatamente o session_id para acompanhamento.
     """
     try:
-        print(f"[API] Recebida requisição de pesquisa: {request.topic}")
-        session_id = await controller.start_mission(request.dict())
-        print(f"[API] Missão iniciada com sucesso: {session_id}")
-        return {"message": "Missão de pesquisa iniciada.", "session_id": session_id, "status": "processing"}
+        logger.debug(f"Recebida requisição de pesquisa: {request.topic}")
+        session_id = mission_scheduler.submit(request.dict(), priority=request.priority)
+        logger.debug(f"Missão enfileirada com sucesso: {session_id}")
+        return {
+            "message": "Missão de pesquisa enfileirada.",
+            "session_id": session_id,
+            "status": "queued",
+            "queue_position": mission_scheduler.queue_position(session_id)
+        }
+    except QueueFullError as e:
+        logger.warning(f"Fila de missões cheia. Retry-After: {e.retry_after}s")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
-        print(f"[API] Erro ao iniciar missão: {str(e)}")
+        logger.error(f"Erro ao iniciar missão: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao iniciar missão: {str(e)}")
 
 @app.get("/health")
 async def health_check():
     """Endpoint para verificar se a API está funcionando."""
-    return {"status": "ok", "message": "ARQV30-AI API está funcionando"}
+    return {
+        "status": "ok",
+        "message": "ARQV30-AI API está funcionando",
+        "missions": mission_scheduler.stats(),
+        "fetch": fetch_scheduler.stats(),
+        "fetch_resilience": fetch_resilience.stats(),
+        "api_keys": api_rotator.summary()
+    }
+
+@app.get("/api-keys/stats")
+async def get_api_key_stats():
+    """Saúde de cada chave de API do pool (chaves mascaradas)."""
+    return api_rotator.stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas no formato do Prometheus (latências, filas, caches e erros por host)."""
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=503, detail="prometheus_client não instalado.")
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Contadores de acerto/erro dos caches, para ajuste fino."""
+    return {
+        "page_cache": page_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "search_cache": search_cache_stats(),
+        "screenshots": screenshot_store.stats(),
+        "seen_urls": seen_urls.stats()
+    }
 
 @app.get("/research-status/{session_id}")
 async def get_research_status(session_id: str):
     """
     Verifica o status de uma missão de pesquisa.
     """
-    print(f"[API] Verificando status da sessão: {session_id}")
+    logger.debug(f"Verificando status da sessão: {session_id}")
+    manifest = await mission_status.load(session_id)
+    if manifest is not None:
+        return _status_payload(session_id, manifest)
+
+    # Sessões anteriores ao manifesto: reconstrói os contadores a partir do estado salvo
     session_dir = os.path.join("sessions", session_id)
     if not os.path.exists(session_dir):
         raise HTTPException(status_code=404, detail="Sessão não encontrada.")
 
     try:
-        # Encontra o último arquivo de estado salvo
-        files = sorted([f for f in os.listdir(session_dir) if f.endswith(".json")])
-        if not files:
+        data_saver = controller.data_saver
+        steps = await asyncio.to_thread(data_saver.list_steps, session_id)
+        if not steps:
             return {"session_id": session_id, "status": "iniciando", "last_step": "N/A"}
 
-        last_file = files[-1]
-        with open(os.path.join(session_dir, last_file), 'r', encoding='utf-8') as f:
-            state = json.load(f)
-
+        state = await asyncio.to_thread(
+            data_saver.load_state, session_id, None, ("search_results", "extracted_data", "screenshot_results")
+        ) or {}
         return {
             "session_id": session_id,
-            "status": "concluído" if "final_state" in last_file else "em_progresso",
-            "last_step": last_file.replace('.json', ''),
-            "data_summary": {
-                "urls_found": len(state.get("search_results", [])),
-                "contents_extracted": len(state.get("extracted_data", [])),
-                "screenshots_captured": len(state.get("screenshot_results", []))
-            }
+            "status": "em_progresso",
+            "last_step": steps[-1],
+            "data_summary": summarize(state)
         }
     except Exception as e:
-        print(f"[API] Erro ao ler estado da sessão: {e}")
+        logger.error(f"Erro ao ler estado da sessão: {e}")
         raise HTTPException(status_code=500, detail=f"Erro ao ler o estado da sessão: {e}")
 
+def _status_payload(session_id: str, manifest: Dict) -> Dict:
+    """Cópia do manifesto com a posição na fila, quando a missão ainda aguarda."""
+    status = dict(manifest)
+    position = mission_scheduler.queue_position(session_id)
+    if position is not None:
+        status["queue_position"] = position
+    return status
+
+async def _mission_events(session_id: str, manifest: Dict):
+    """
+    Snapshot do manifesto seguido dos eventos da sessão, até o fim da missão.
+
+    A assinatura é feita antes do snapshot, para não perder eventos entre os dois.
+    Produz None nos heartbeats.
+    """
+    with event_bus.subscribe(session_id) as events:
+        manifest = mission_status.get(session_id) or manifest
+        yield {"type": "snapshot", "session_id": session_id, "seq": 0, "data": _status_payload(session_id, manifest)}
+        if manifest["status"] in TERMINAL_STATUSES:
+            return
+        while True:
+            event = await events.get(timeout=EVENTS_HEARTBEAT)
+            yield event
+            if event is not None and event["type"] == "mission_finished":
+                return
+
+@app.get("/research-events/{session_id}")
+async def stream_research_events(session_id: str):
+    """
+    Progresso da missão via Server-Sent Events: transições de etapa, URLs
+    extraídas, screenshots e contadores, conforme acontecem.
+    """
+    manifest = await mission_status.load(session_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Sessão não encontrada.")
+
+    async def sse():
+        async for event in _mission_events(session_id, manifest):
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            data = json.dumps(event, ensure_ascii=False, default=str)
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/ws/research/{session_id}")
+async def research_events_websocket(websocket: WebSocket, session_id: str):
+    """Mesmo fluxo de `/research-events`, por WebSocket (uma mensagem JSON por evento)."""
+    await websocket.accept()
+    manifest = await mission_status.load(session_id)
+    if manifest is None:
+        await websocket.close(code=4404, reason="Sessão não encontrada.")
+        return
+    try:
+        async for event in _mission_events(session_id, manifest):
+            await websocket.send_json(event if event is not None else {"type": "ping", "session_id": session_id})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.debug(f"Cliente desconectado do progresso da sessão {session_id}")
+
+def _split_csv(value: str | None) -> List[str] | None:
+    if not value:
+        return None
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+
+def _page_windows(limit: int | None, offsets: Dict[str, int]) -> Dict[str, Tuple[int, int]]:
+    """Janela [início, fim) de cada lista paginada para a página pedida."""
+    if limit is None:
+        return {}
+    return {key: (offsets.get(key, 0), offsets.get(key, 0) + limit) for key in PAGINATED_KEYS}
+
+def _build_results(state: Dict[str, Any], totals: Dict[str, int], item_keys: List[str] | None,
+                   limit: int | None, offsets: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Aplica a projeção dos itens e monta a página a partir do estado já recortado.
+
+    O cursor guarda o offset de todas as listas paginadas, inclusive das já
+    esgotadas (offset = tamanho), para que elas voltem vazias nas páginas
+    seguintes em vez de recomeçar do início.
+    """
+    document: Dict[str, Any] = {}
+    next_offsets: Dict[str, int] = {}
+    has_more = False
+    for key, value in state.items():
+        if isinstance(value, list):
+            if limit is not None and key in totals:
+                next_offsets[key] = min(offsets.get(key, 0) + limit, totals[key])
+                has_more = has_more or next_offsets[key] < totals[key]
+            if item_keys is not None:
+                value = [{k: item[k] for k in item_keys if k in item} if isinstance(item, dict) else item for item in value]
+        document[key] = value
+    if limit is not None:
+        document["page"] = {"limit": limit, "totals": totals}
+        document["next_cursor"] = encode_cursor(next_offsets) if has_more else None
+    return document
+
 @app.get("/research-results/{session_id}")
-async def get_research_results(session_id: str):
+async def get_research_results(
+    session_id: str,
+    request: Request,
+    fields: str | None = None,
+    item_fields: str | None = None,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None
+):
     """
-    Retorna os resultados completos de uma missão de pesquisa.
+    Retorna os resultados de uma missão de pesquisa.
+
+    - `fields`: chaves do estado a retornar, separadas por vírgula (ex.: `search_results`).
+    - `item_fields`: campos mantidos em cada item das listas (ex.: `url,method`).
+    - `limit`/`cursor`: paginação de `extracted_data` e `screenshot_results`;
+      a resposta traz `next_cursor` (None na última página).
+
+    A resposta é serializada em streaming, comprimida (br/gzip) conforme o
+    `Accept-Encoding` e validada por ETag (`If-None-Match` -> 304). Com
+    paginação, as listas paginadas são lidas só na janela da página.
     """
     session_dir = os.path.join("sessions", session_id)
     if not os.path.exists(session_dir):
         raise HTTPException(status_code=404, detail="Sessão não encontrada.")
 
+    keys = _split_csv(fields)
+    item_keys = _split_csv(item_fields)
     try:
-        files = sorted([f for f in os.listdir(session_dir) if f.endswith(".json")])
-        if not files:
-            raise HTTPException(status_code=404, detail="Nenhum resultado encontrado.")
+        offsets = decode_cursor(cursor) if cursor else {}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if cursor and limit is None:
+        limit = RESULTS_DEFAULT_PAGE_SIZE
 
-        last_file = files[-1]
-        with open(os.path.join(session_dir, last_file), 'r', encoding='utf-8') as f:
-            final_state = json.load(f)
+    # O ETag acompanha a versão do manifesto, que muda a cada etapa concluída
+    etag = None
+    manifest = await mission_status.load(session_id)
+    if manifest is not None:
+        etag = f'W/"{make_key(session_id, manifest["version"], keys, item_keys, limit, offsets)[:32]}"'
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
 
-        return final_state
+    try:
+        await controller.data_saver.flush()
+        # Com paginação, só a página pedida das listas grandes é carregada
+        page = await asyncio.to_thread(
+            controller.data_saver.load_page, session_id, _page_windows(limit, offsets), keys
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao recuperar resultados: {e}")
+    if page is None:
+        raise HTTPException(status_code=404, detail="Nenhum resultado encontrado.")
+
+    state, totals = page
+    document = _build_results(state, totals, item_keys, limit, offsets)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    # Gerador síncrono: o Starlette o consome em uma thread, fora do event loop
+    return StreamingResponse(encode_chunks(iter_json(document), encoding), media_type="application/json", headers=headers)
+
+def _screenshot_response(request: Request, screenshot_id: str, thumbnail: bool):
+    located = screenshot_store.locate(screenshot_id, thumbnail=thumbnail)
+    if located is None:
+        raise HTTPException(status_code=404, detail="Screenshot não encontrado.")
+    path, media_type = located
+    # Endereçado por conteúdo: o arquivo de um id nunca muda
+    etag = f'"{screenshot_id}{"-thumb" if thumbnail else ""}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+@app.get("/screenshots/{screenshot_id}")
+async def get_screenshot(screenshot_id: str, request: Request):
+    """Serve um screenshot armazenado."""
+    return _screenshot_response(request, screenshot_id, thumbnail=False)
+
+@app.get("/screenshots/{screenshot_id}/thumbnail")
+async def get_screenshot_thumbnail(screenshot_id: str, request: Request):
+    """Serve a miniatura de um screenshot, para listagens na interface."""
+    return _screenshot_response(request, screenshot_id, thumbnail=True)
+
+# Formato de Controller.new_session_id: o id vira caminho no disco
+_SESSION_ID_RE = re.compile(r"^session_[0-9a-f]{32}$")
+
+@app.get("/research-trace/{session_id}")
+async def get_research_trace(session_id: str):
+    """
+    Trace da missão no formato de eventos do Chrome (abrir em chrome://tracing
+    ou ui.perfetto.dev). Missões em execução devolvem o trace parcial.
+    """
+    if not _SESSION_ID_RE.match(session_id):
+        raise HTTPException(status_code=404, detail="Trace não encontrado.")
+    snapshot = tracer.snapshot(session_id)
+    if snapshot is not None:
+        return snapshot
+    path = tracer.path(session_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Trace não encontrado.")
+    return FileResponse(path, media_type="application/json", filename=f"{session_id}_trace.json")
+
+@app.get("/research-trace/{session_id}/profiles/{stage}")
+async def get_research_profile(session_id: str, stage: str):
+    """Perfil (cProfile) de uma das etapas mais lentas, quando a missão foi amostrada."""
+    if not _SESSION_ID_RE.match(session_id):
+        raise HTTPException(status_code=404, detail="Perfil não encontrado.")
+    # Só as etapas listadas em 'profiles' no trace gravado
+    if stage not in await asyncio.to_thread(tracer.saved_profiles, session_id):
+        raise HTTPException(status_code=404, detail="Perfil não encontrado.")
+    path = tracer.profile_path(session_id, stage)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Perfil não encontrado.")
+    return PlainTextResponse(await asyncio.to_thread(_read_text, path))
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,152 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from app.utils.logger import get_logger
+
+logger = get_logger("BrowserPool")
+
+# Configuração do pool de navegadores (variáveis de ambiente)
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "3"))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "50"))
+BROWSER_PAGE_LOAD_TIMEOUT = int(os.getenv("BROWSER_PAGE_LOAD_TIMEOUT", "30"))
+SCREENSHOT_RENDER_WAIT = float(os.getenv("SCREENSHOT_RENDER_WAIT", "5"))
+
+class _PooledBrowser:
+    """Um Chrome headless mantido aquecido pelo pool."""
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.pages_served = 0
+        self.broken = False
+
+class BrowserPool:
+    """
+    Pool de navegadores headless reutilizáveis para captura de screenshots.
+
+    O ChromeDriver é resolvido uma única vez na inicialização. Cada navegador
+    é criado sob demanda, mantido aquecido entre capturas e reciclado após
+    `max_pages` páginas ou após qualquer falha. As chamadas bloqueantes do
+    Selenium rodam em threads dedicadas, fora do event loop.
+    """
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_pages: int = BROWSER_MAX_PAGES):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self._driver_path: str | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots: asyncio.Queue | None = None
+        self._starting: asyncio.Task | None = None
+        self._closed = False
+
+    async def start(self):
+        """Resolve o ChromeDriver e prepara os slots do pool (idempotente)."""
+        if self._starting is None:
+            self._closed = False
+            self._starting = asyncio.create_task(self._start())
+        await self._starting
+
+    async def _start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="browser")
+        self._slots = asyncio.Queue()
+        # Slots vazios (None) são preenchidos com um navegador no primeiro uso
+        for _ in range(self.size):
+            self._slots.put_nowait(None)
+        try:
+            self._driver_path = await self._run(ChromeDriverManager().install)
+            logger.info(f"ChromeDriver resolvido em: {self._driver_path}")
+        except Exception as e:
+            # Sem o webdriver-manager, o Selenium Manager resolve o driver ao lançar o Chrome
+            logger.warning(f"Falha ao resolver ChromeDriver ({e}). Usando Selenium Manager.")
+            self._driver_path = None
+        logger.info(f"Pool iniciado com até {self.size} navegadores.")
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _launch(self) -> _PooledBrowser:
+        """Inicia um novo Chrome headless (bloqueante, roda em thread)."""
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--window-size=1920,1080")
+        service = Service(self._driver_path) if self._driver_path else Service()
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver.set_page_load_timeout(BROWSER_PAGE_LOAD_TIMEOUT)
+        return _PooledBrowser(driver)
+
+    @staticmethod
+    def _quit(browser: _PooledBrowser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.error(f"Erro ao encerrar navegador: {e}")
+
+    @asynccontextmanager
+    async def browser(self) -> AsyncIterator[_PooledBrowser]:
+        """Empresta um navegador do pool, lançando-o se o slot estiver vazio."""
+        await self.start()
+        browser = await self._slots.get()
+        try:
+            if browser is None:
+                browser = await self._run(self._launch)
+            yield browser
+            browser.pages_served += 1
+        except BaseException:
+            if browser is not None:
+                browser.broken = True
+            raise
+        finally:
+            if browser is not None and (browser.broken or browser.pages_served >= self.max_pages or self._closed):
+                if self._closed:
+                    # O pool já foi encerrado: as threads não estão mais disponíveis
+                    self._quit(browser)
+                else:
+                    reason = "falha" if browser.broken else "limite de páginas"
+                    logger.info(f"Reciclando navegador ({reason}, {browser.pages_served} páginas).")
+                    await self._run(self._quit, browser)
+                browser = None
+            self._slots.put_nowait(browser)
+
+    async def capture(self, url: str, render_wait: float = SCREENSHOT_RENDER_WAIT) -> bytes:
+        """
+        Abre a URL em um navegador do pool e retorna o screenshot em PNG.
+
+        Args:
+            url (str): A página a capturar.
+            render_wait (float): Segundos de espera para a página renderizar.
+
+        Returns:
+            bytes: O conteúdo PNG do screenshot.
+        """
+        async with self.browser() as browser:
+            await self._run(browser.driver.get, url)
+            # Aguarda a renderização sem ocupar a thread nem travar o loop
+            await asyncio.sleep(render_wait)
+            return await self._run(browser.driver.get_screenshot_as_png)
+
+    async def close(self):
+        """Encerra todos os navegadores ociosos e as threads do pool."""
+        if self._starting is None:
+            return
+        self._closed = True
+        await self._starting
+        browsers = []
+        while not self._slots.empty():
+            browser = self._slots.get_nowait()
+            if browser is not None:
+                browsers.append(browser)
+        for browser in browsers:
+            await self._run(self._quit, browser)
+        self._executor.shutdown(wait=False)
+        self._starting = None
+        logger.info(f"Pool encerrado ({len(browsers)} navegadores fechados).")
+
+browser_pool = BrowserPool()
@@ -1,46 +1,286 @@
-from typing import Dict, Any, Optional
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, AsyncIterator, Iterable, Iterator, List, Tuple
 import aiohttp
 import trafilatura
-from bs4 import BeautifulSoup
 
-async def extract_content_robust(url: str) -> Optional[Dict[str, Any]]:
+from app.utils.http_client import http_client, read_body, decode_html, is_html, looks_binary, HTTP_STALL_TIMEOUT
+from app.utils.parser_pool import parser_pool
+from app.utils.page_cache import page_cache, content_hash
+from app.utils.url_normalizer import normalize_url
+from app.utils.seen_urls import seen_urls
+from app.tools.fetch_scheduler import fetch_scheduler, host_of, HostThrottledError, THROTTLE_STATUSES, FETCH_THROTTLE_WAIT
+from app.tools.fetch_resilience import fetch_resilience, CircuitOpenError
+from app.utils import metrics
+from app.utils.logger import get_logger
+from app.utils.tracer import span, traced
+
+logger = get_logger("ExtractionTool")
+
+# Novas tentativas após 429/503, já respeitando a pausa imposta pelo host
+FETCH_THROTTLE_RETRIES = int(os.getenv("FETCH_THROTTLE_RETRIES", "1"))
+
+# Heurísticas de qualidade da camada rápida: abaixo delas a página sobe para o trafilatura
+EXTRACT_FAST_MIN_CHARS = int(os.getenv("EXTRACT_FAST_MIN_CHARS", "500"))
+EXTRACT_FAST_MIN_PARAGRAPHS = int(os.getenv("EXTRACT_FAST_MIN_PARAGRAPHS", "3"))
+EXTRACT_FAST_MAX_LINK_DENSITY = float(os.getenv("EXTRACT_FAST_MAX_LINK_DENSITY", "0.3"))
+
+# Subárvores que nunca fazem parte do texto principal
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "form", "button", "select",
+              "nav", "header", "footer", "aside"}
+_BOILERPLATE_RE = re.compile(
+    r"(?:^|[\s_-])(?:nav|navbar|menu|header|footer|sidebar|aside|comments?|share|social|cookies?|banner|"
+    r"ads?|advert\w*|publicidade|promo|related|newsletter|breadcrumbs?|popup|modal|widget)(?:$|[\s_-])",
+    re.IGNORECASE,
+)
+_BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "blockquote", "pre", "dd", "figcaption"}
+_SPACES_RE = re.compile(r"\s+")
+_VISIBLE_TEXT_XPATH = ".//text()[not(ancestor::script or ancestor::style or ancestor::noscript or ancestor::template)]"
+
+class ParsedPage:
+    """
+    HTML analisado uma única vez e compartilhado pelas camadas da cadeia.
+
+    A árvore é a mesma que o trafilatura montaria (`trafilatura.load_html`), e
+    as camadas não a modificam: o trafilatura trabalha numa cópia. Os blocos
+    de texto visíveis são calculados uma vez, sob demanda.
+    """
+    def __init__(self, url: str, html: str):
+        self.url = url
+        self.html = html
+        self.tree = trafilatura.load_html(html)
+        self._blocks: List[Tuple[Any, str, int]] | None = None
+
+    @property
+    def blocks(self) -> List[Tuple[Any, str, int]]:
+        """Blocos de texto (elemento, texto, caracteres em links) fora de navegação, scripts e afins."""
+        if self._blocks is None:
+            self._blocks = list(_iter_blocks(self.tree)) if self.tree is not None else []
+        return self._blocks
+
+def _is_boilerplate(element: Any) -> bool:
+    if element.tag in _SKIP_TAGS:
+        return True
+    names = f"{element.get('class', '')} {element.get('id', '')}"
+    return names != " " and _BOILERPLATE_RE.search(names) is not None
+
+def _iter_blocks(root: Any) -> Iterator[Tuple[Any, str, int]]:
+    """Percorre a árvore sem descer em subárvores de boilerplate, sem alterá-la."""
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        if not isinstance(element.tag, str) or _is_boilerplate(element):
+            continue
+        if element.tag in _BLOCK_TAGS:
+            text = _SPACES_RE.sub(" ", element.text_content()).strip()
+            if text:
+                link_chars = sum(len(a.text_content()) for a in element.iter("a"))
+                yield element, text, link_chars
+            continue
+        stack.extend(reversed(element))
+
+class Extractor(ABC):
+    """
+    Camada da cadeia de extração.
+
+    `extract` devolve o texto principal ou None para passar a página à
+    próxima camada. As camadas rodam nos processos do `parser_pool`: novas
+    camadas entram em `EXTRACTORS` na importação deste módulo.
+    """
+    name = ""
+
+    @abstractmethod
+    def extract(self, page: ParsedPage) -> str | None:
+        """Texto principal da página, ou None para passar à próxima camada."""
+
+class FastExtractor(Extractor):
+    """
+    Camada barata: escolhe o contêiner com mais texto em parágrafos (pontuação
+    no estilo do Readability) e junta os blocos dele, usando só a árvore já
+    analisada. Só aceita o resultado se passar nas heurísticas de qualidade
+    (tamanho, número de parágrafos e densidade de links).
+    """
+    name = "lxml"
+
+    def extract(self, page: ParsedPage) -> str | None:
+        scores: Dict[Any, float] = {}
+        for element, text, _ in page.blocks:
+            if element.tag != "p" or len(text) < 25:
+                continue
+            score = 1 + text.count(",") + min(len(text) / 100, 3)
+            parent = element.getparent()
+            if parent is None:
+                continue
+            scores[parent] = scores.get(parent, 0.0) + score
+            grandparent = parent.getparent()
+            if grandparent is not None:
+                scores[grandparent] = scores.get(grandparent, 0.0) + score / 2
+        if not scores:
+            return None
+        candidate = max(scores, key=scores.get)
+
+        blocks = list(_iter_blocks(candidate))
+        chars = sum(len(text) for _, text, _ in blocks)
+        paragraphs = sum(1 for element, text, _ in blocks if element.tag == "p" and len(text) >= 25)
+        link_chars = sum(links for _, _, links in blocks)
+        if (chars < EXTRACT_FAST_MIN_CHARS or paragraphs < EXTRACT_FAST_MIN_PARAGRAPHS
+                or link_chars > chars * EXTRACT_FAST_MAX_LINK_DENSITY):
+            return None
+        return "\n".join(text for _, text, _ in blocks)
+
+class TrafilaturaExtractor(Extractor):
+    """Camada precisa (e mais cara): trafilatura sobre a árvore compartilhada."""
+    name = "trafilatura"
+
+    def extract(self, page: ParsedPage) -> str | None:
+        text = trafilatura.extract(page.tree, include_comments=False, include_tables=False)
+        return text if text and len(text) > 200 else None
+
+class TextExtractor(Extractor):
+    """Último recurso: todo o texto visível da página, linha a linha."""
+    name = "text"
+
+    def extract(self, page: ParsedPage) -> str | None:
+        body = page.tree.find("body")
+        texts = (body if body is not None else page.tree).xpath(_VISIBLE_TEXT_XPATH)
+        lines = (_SPACES_RE.sub(" ", line).strip() for line in "".join(texts).splitlines())
+        text = "\n".join(line for line in lines if line)
+        return text if len(text) > 100 else None
+
+# Da mais barata para a mais cara; vence a primeira que aceitar a página
+EXTRACTORS: List[Extractor] = [FastExtractor(), TrafilaturaExtractor(), TextExtractor()]
+
+def parse_html(url: str, html: str) -> Optional[Dict[str, Any]]:
     """
-    Extrai conteúdo de uma URL usando trafilatura com fallback para BeautifulSoup.
+    Extrai o texto de um HTML já baixado pela cadeia `EXTRACTORS`.
+
+    O documento é analisado uma única vez; `method` indica a camada que venceu.
+    Função síncrona e CPU-bound, executada nos processos do `parser_pool`.
     """
-    print(f"[ExtractionTool] Extraindo de: {url}")
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=20, ssl=False) as response:
-                if response.status != 200:
-                    print(f"[ExtractionTool] Erro HTTP {response.status} para {url}")
-                    return None
-                html = await response.text()
-
-        # Método Principal: Trafilatura
-        extracted_text = trafilatura.extract(html, include_comments=False, include_tables=False)
-
-        if extracted_text and len(extracted_text) > 200:
-            print(f"[ExtractionTool] Sucesso com Trafilatura: {len(extracted_text)} caracteres.")
-            return {"url": url, "content": extracted_text, "method": "trafilatura"}
-
-        # Fallback: BeautifulSoup
-        print(f"[ExtractionTool] Trafilatura falhou, usando fallback BeautifulSoup para {url}")
-        soup = BeautifulSoup(html, 'html.parser')
-        # Remove tags de script e style
-        for script_or_style in soup(['script', 'style']):
-            script_or_style.decompose()
-        
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        fallback_text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        if fallback_text and len(fallback_text) > 100:
-            print(f"[ExtractionTool] Sucesso com BeautifulSoup: {len(fallback_text)} caracteres.")
-            return {"url": url, "content": fallback_text, "method": "beautifulsoup"}
+        page = ParsedPage(url, html)
+        if page.tree is None:
+            return None
+        for extractor in EXTRACTORS:
+            text = extractor.extract(page)
+            if text:
+                logger.debug(f"Sucesso com {extractor.name}: {len(text)} caracteres.")
+                return {"url": url, "content": text, "method": extractor.name}
+        return None
 
+    except Exception as e:
+        logger.error(f"Erro ao processar HTML de {url}: {e}")
         return None
 
+async def parse_pages(pages: Iterable[Tuple[str, str]]) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Processa um lote de páginas (url, html) no pool de parsing.
+
+    Os resultados são devolvidos conforme cada lote termina, sem esperar o conjunto todo.
+    """
+    async for result in parser_pool.map(parse_html, pages):
+        yield result
+
+@traced("tool", "url")
+async def extract_content_robust(url: str) -> Optional[Dict[str, Any]]:
+    """
+    Extrai conteúdo de uma URL pela cadeia de extratores (`EXTRACTORS`).
+
+    Consulta antes o cache de páginas: entradas dentro do TTL são servidas sem
+    rede, e entradas vencidas são revalidadas com ETag/If-Modified-Since (um 304
+    evita o download e o parsing). A requisição usa a forma normalizada da URL. Downloads
+    passam pelo `fetch_scheduler` (robots.txt, ritmo e vagas por host) e pelo
+    `fetch_resilience` (timeout adaptativo, novas tentativas, hedge e circuit breaker).
+    Se o host responder 429/503 com pausa maior que `FETCH_THROTTLE_WAIT`,
+    levanta `HostThrottledError` para a URL ser reenfileirada.
+    Só respostas HTML são lidas, em blocos e até `HTTP_MAX_BODY_BYTES` (o
+    excedente é descartado); downloads parados por `HTTP_STALL_TIMEOUT` falham.
+    """
+    logger.debug(f"Extraindo de: {url}")
+    try:
+        # O cache é sempre consultado: o filtro de Bloom é gravado só de tempos em
+        # tempos e pode ter perdido URLs numa queda; se for o caso, é recomposto aqui
+        cached = await page_cache.lookup(url)
+        if cached is not None and not seen_urls.seen(url):
+            seen_urls.mark(url)
+        if cached and cached.is_fresh:
+            logger.debug(f"Cache hit para {url}")
+            return _for_url(cached.result, url)
+
+        if not await fetch_scheduler.allowed(url):
+            logger.warning(f"Bloqueado pelo robots.txt: {url}")
+            return None
+
+        headers = cached.conditional_headers() if cached else {}
+        session = await http_client.get_session()
+
+        async def request(timeout: float):
+            client_timeout = aiohttp.ClientTimeout(total=timeout, sock_read=min(timeout, HTTP_STALL_TIMEOUT))
+            async with session.get(normalize_url(url), headers=headers, timeout=client_timeout, ssl=False) as response:
+                fetch_scheduler.report(url, response.status, response.headers.get("Retry-After"))
+                content_type = response.headers.get("Content-Type")
+                if response.status != 200 or not is_html(content_type):
+                    # Sem ler o corpo: a conexão é descartada em vez de baixar um PDF ou vídeo inteiro
+                    return response.status, (response.headers, None)
+                body, truncated = await read_body(response)
+                if looks_binary(body):
+                    return response.status, (response.headers, None)
+                if truncated:
+                    metrics.BODY_LIMITS.labels("truncated").inc()
+                    logger.debug(f"Corpo de {url} truncado em {len(body)} bytes.")
+                return response.status, (response.headers, decode_html(body, content_type))
+
+        for attempt in range(FETCH_THROTTLE_RETRIES + 1):
+            # Cada tentativa respeita o ritmo e as vagas do host (com pausa após 429/503);
+            # timeouts, falhas transitórias e hedge ficam com o fetch_resilience
+            status, (response_headers, html) = await fetch_resilience.fetch(url, request)
+            if status not in THROTTLE_STATUSES or attempt == FETCH_THROTTLE_RETRIES:
+                break
+            # Pausa longa: a URL volta para quem chamou, em vez de prender o worker
+            retry_in = fetch_scheduler.blocked_for(host_of(url))
+            if retry_in > FETCH_THROTTLE_WAIT:
+                raise HostThrottledError(host_of(url), retry_in)
+        if status == 304 and cached:
+            logger.debug(f"Conteúdo não modificado (304) para {url}")
+            await page_cache.mark_revalidated(url)
+            seen_urls.mark(url)
+            return _for_url(cached.result, url)
+        if status != 200:
+            logger.warning(f"Erro HTTP {status} para {url}")
+            return None
+        if html is None:
+            metrics.BODY_LIMITS.labels("not_html").inc()
+            logger.debug(f"Conteúdo não HTML ({response_headers.get('Content-Type')}) ignorado: {url}")
+            return None
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+
+        # Conteúdo idêntico já processado (outra URL ou ETag ausente): reaproveita o parsing
+        digest = content_hash(html)
+        found, result = await page_cache.lookup_content(digest)
+        if not found:
+            # O parsing é CPU-bound: roda no pool de processos para não travar o loop
+            with metrics.timed(metrics.PARSE_SECONDS), span("parse", "cpu", bytes=len(html)) as info:
+                result = await parser_pool.run(parse_html, url, html)
+                # As camadas rodam nos processos do pool: a vencedora é contada aqui
+                info["method"] = result["method"] if result else None
+            metrics.EXTRACTION_TIERS.labels(info["method"] or "none").inc()
+        await page_cache.store(url, html, digest, result, etag, last_modified)
+        seen_urls.mark(url)
+        return _for_url(result, url)
+
+    except CircuitOpenError as e:
+        logger.warning(f"{e} Pulando {url}")
+        return None
+    except HostThrottledError:
+        raise
     except Exception as e:
-        print(f"[ExtractionTool] Erro crítico ao extrair de {url}: {e}")
-        return None
\ No newline at end of file
+        logger.error(f"Erro crítico ao extrair de {url}: {e}")
+        return None
+
+def _for_url(result: Optional[Dict[str, Any]], url: str) -> Optional[Dict[str, Any]]:
+    """Ajusta um resultado (possivelmente compartilhado no cache) para a URL solicitada."""
+    if not result:
+        return None
+    return {**result, "url": url}
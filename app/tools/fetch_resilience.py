@@ -0,0 +1,249 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple, TypeVar
+
+import aiohttp
+
+from app.tools.fetch_scheduler import fetch_scheduler, host_of
+from app.utils import metrics
+from app.utils.logger import get_logger
+from app.utils.tracer import span
+
+logger = get_logger("FetchResilience")
+
+# Resiliência dos downloads (variáveis de ambiente)
+FETCH_MIN_TIMEOUT = float(os.getenv("FETCH_MIN_TIMEOUT", "5"))
+FETCH_MAX_TIMEOUT = float(os.getenv("FETCH_MAX_TIMEOUT", "20"))
+FETCH_TIMEOUT_FACTOR = float(os.getenv("FETCH_TIMEOUT_FACTOR", "3"))  # timeout = p95 × fator
+FETCH_LATENCY_WINDOW = int(os.getenv("FETCH_LATENCY_WINDOW", "50"))
+FETCH_MIN_SAMPLES = int(os.getenv("FETCH_MIN_SAMPLES", "5"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "2"))
+FETCH_RETRY_BASE = float(os.getenv("FETCH_RETRY_BASE", "0.5"))
+FETCH_RETRY_MAX = float(os.getenv("FETCH_RETRY_MAX", "5"))
+FETCH_HEDGE = os.getenv("FETCH_HEDGE", "true").lower() in ("1", "true", "yes")
+FETCH_HEDGE_BUDGET = float(os.getenv("FETCH_HEDGE_BUDGET", "0.1"))  # fração máxima de requisições duplicadas
+FETCH_BREAKER_THRESHOLD = int(os.getenv("FETCH_BREAKER_THRESHOLD", "5"))
+FETCH_BREAKER_COOLDOWN = float(os.getenv("FETCH_BREAKER_COOLDOWN", "60"))
+FETCH_BREAKER_MAX_COOLDOWN = float(os.getenv("FETCH_BREAKER_MAX_COOLDOWN", "900"))
+
+# Falhas transitórias de um GET (idempotente) que valem nova tentativa
+RETRY_STATUSES = (500, 502, 504)
+RETRY_EXCEPTIONS = (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """O host falhou seguidamente e está temporariamente fora de uso."""
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuito aberto para {host} (nova tentativa em {retry_in:.0f}s).")
+        self.host = host
+        self.retry_in = retry_in
+
+def _percentile(samples: Deque[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class _HostHealth:
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=FETCH_LATENCY_WINDOW)
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = FETCH_BREAKER_COOLDOWN
+        self.probing = False
+
+class FetchResilience:
+    """
+    Timeouts adaptativos, novas tentativas, requisições de cobertura (hedge)
+    e circuit breaker por host para os downloads da extração.
+
+    O timeout de cada host é o p95 das latências observadas vezes
+    `FETCH_TIMEOUT_FACTOR` (limitado a [FETCH_MIN_TIMEOUT, FETCH_MAX_TIMEOUT]);
+    hosts sem histórico usam o p95 global. Falhas transitórias são repetidas
+    com backoff exponencial com jitter total. Quando a resposta passa do p95 do
+    host, uma segunda requisição é disparada se o host tiver vaga livre e o
+    orçamento de hedge permitir, e vale a que terminar primeiro. Após
+    `FETCH_BREAKER_THRESHOLD` falhas seguidas o circuito do host abre e as
+    requisições falham na hora até a pausa acabar; então uma única requisição
+    de teste decide se ele fecha ou volta a abrir (com pausa dobrada).
+    """
+    def __init__(self):
+        self._hosts: Dict[str, _HostHealth] = {}
+        self._global: Deque[float] = deque(maxlen=FETCH_LATENCY_WINDOW * 4)
+        self.counters = {"attempts": 0, "retries": 0, "timeouts": 0, "hedged": 0,
+                         "hedge_wins": 0, "circuit_open": 0, "fast_failures": 0}
+
+    def _health(self, host: str) -> _HostHealth:
+        health = self._hosts.get(host)
+        if health is None:
+            health = self._hosts[host] = _HostHealth()
+        return health
+
+    def _p95(self, host: str) -> float | None:
+        samples = self._health(host).latencies
+        if len(samples) < FETCH_MIN_SAMPLES:
+            samples = self._global
+        if len(samples) < FETCH_MIN_SAMPLES:
+            return None
+        return _percentile(samples, 0.95)
+
+    def timeout(self, host: str) -> float:
+        """Timeout total da próxima requisição ao host."""
+        p95 = self._p95(host)
+        if p95 is None:
+            return FETCH_MAX_TIMEOUT
+        return min(FETCH_MAX_TIMEOUT, max(FETCH_MIN_TIMEOUT, p95 * FETCH_TIMEOUT_FACTOR))
+
+    def retry_delay(self, attempt: int) -> float:
+        """Backoff exponencial com jitter total (evita novas tentativas sincronizadas)."""
+        return random.uniform(0, min(FETCH_RETRY_MAX, FETCH_RETRY_BASE * 2 ** attempt))
+
+    def _check_circuit(self, host: str):
+        health = self._health(host)
+        now = time.monotonic()
+        if health.failures < FETCH_BREAKER_THRESHOLD:
+            return
+        if health.open_until > now or health.probing:
+            self.counters["fast_failures"] += 1
+            metrics.FETCH_ERRORS.labels(metrics.host_label(host), "circuit_open").inc()
+            raise CircuitOpenError(host, max(0.0, health.open_until - now))
+        # Meio-aberto: esta requisição é o teste
+        health.probing = True
+
+    def _record(self, host: str, ok: bool, latency: float | None):
+        health = self._health(host)
+        if latency is not None:
+            health.latencies.append(latency)
+            self._global.append(latency)
+        if ok:
+            health.failures = 0
+            health.probing = False
+            health.cooldown = FETCH_BREAKER_COOLDOWN
+            return
+        health.failures += 1
+        if health.probing or health.failures == FETCH_BREAKER_THRESHOLD:
+            if health.probing:
+                health.cooldown = min(FETCH_BREAKER_MAX_COOLDOWN, health.cooldown * 2)
+            health.probing = False
+            health.open_until = time.monotonic() + health.cooldown
+            self.counters["circuit_open"] += 1
+            logger.warning(f"Circuito aberto para {host}: {health.failures} falhas seguidas, pausa de {health.cooldown:.0f}s.")
+
+    async def _attempt(self, url: str, host: str, request: Callable[[float], Awaitable[Tuple[int, Any]]],
+                       timeout: float) -> Tuple[int, Any]:
+        queued = time.monotonic()
+        async with fetch_scheduler.slot(url):
+            self.counters["attempts"] += 1
+            started = time.monotonic()
+            try:
+                # queued_ms: espera pela vez do host (ritmo e vagas do fetch_scheduler)
+                with span("fetch", "net", url=url, timeout=round(timeout, 2),
+                          queued_ms=round((started - queued) * 1000, 1)) as info:
+                    result = await request(timeout)
+                    info["status"] = result[0]
+            except asyncio.TimeoutError:
+                self.counters["timeouts"] += 1
+                # Amostra censurada: faz o timeout de hosts lentos crescer em vez de falhar sempre
+                self._record(host, False, timeout)
+                self._observe(host, "timeout", started)
+                raise
+            except RETRY_EXCEPTIONS as e:
+                self._record(host, False, None)
+                self._observe(host, "error", started, type(e).__name__)
+                raise
+            except asyncio.CancelledError:
+                # Teste do circuito cancelado (ex.: hedge perdedor): libera outro teste
+                self._health(host).probing = False
+                raise
+        status = result[0]
+        self._record(host, status not in RETRY_STATUSES, time.monotonic() - started)
+        if status >= 400:
+            self._observe(host, "http_5xx" if status >= 500 else "http_4xx", started, f"http_{status}")
+        else:
+            self._observe(host, "ok", started)
+        return result
+
+    def _observe(self, host: str, outcome: str, started: float, reason: str | None = None):
+        metrics.FETCH_SECONDS.labels(outcome).observe(time.monotonic() - started)
+        if outcome != "ok":
+            metrics.FETCH_ERRORS.labels(metrics.host_label(host), reason or outcome).inc()
+
+    def _can_hedge(self, host: str) -> bool:
+        if not FETCH_HEDGE or fetch_scheduler.delay(host) != 0:
+            return False
+        return self.counters["hedged"] < FETCH_HEDGE_BUDGET * max(1, self.counters["attempts"])
+
+    async def _hedged(self, url: str, host: str, request: Callable[[float], Awaitable[Tuple[int, Any]]],
+                      timeout: float) -> Tuple[int, Any]:
+        first = asyncio.ensure_future(self._attempt(url, host, request, timeout))
+        p95 = self._p95(host) if FETCH_HEDGE else None
+        if p95 is None or p95 >= timeout:
+            return await first
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=p95)
+            if not done and self._can_hedge(host):
+                self.counters["hedged"] += 1
+                tasks.add(asyncio.ensure_future(self._attempt(url, host, request, timeout)))
+            error: BaseException | None = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            first.cancel()
+
+    async def fetch(self, url: str, request: Callable[[float], Awaitable[Tuple[int, T]]]) -> Tuple[int, T]:
+        """
+        Executa `request(timeout)` com as proteções do host da URL.
+
+        `request` faz uma única requisição com o timeout total recebido e
+        devolve (status, valor); cada tentativa ocupa uma vaga do
+        `fetch_scheduler`. Levanta `CircuitOpenError` se o host estiver fora
+        de uso, ou a última falha depois de esgotadas as tentativas.
+        """
+        host = host_of(url)
+        for attempt in range(FETCH_RETRIES + 1):
+            self._check_circuit(host)
+            timeout = self.timeout(host)
+            try:
+                result = await self._hedged(url, host, request, timeout)
+            except asyncio.CancelledError:
+                # Cancelado antes de a tentativa começar (ex.: à espera da vaga do host),
+                # o teste do circuito não passa pelo _attempt: libera outro teste aqui
+                self._health(host).probing = False
+                raise
+            except RETRY_EXCEPTIONS as e:
+                if attempt == FETCH_RETRIES:
+                    raise
+                logger.warning(f"Falha transitória em {url} ({type(e).__name__}), nova tentativa...")
+            else:
+                if result[0] not in RETRY_STATUSES or attempt == FETCH_RETRIES:
+                    return result
+                logger.info(f"HTTP {result[0]} em {url}, nova tentativa...")
+            self.counters["retries"] += 1
+            await asyncio.sleep(self.retry_delay(attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        open_hosts = sum(
+            1 for h in self._hosts.values() if h.failures >= FETCH_BREAKER_THRESHOLD and h.open_until > now
+        )
+        p95 = _percentile(self._global, 0.95) if self._global else None
+        return {
+            "hosts": len(self._hosts),
+            "open_circuits": open_hosts,
+            "global_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            **self.counters,
+        }
+
+fetch_resilience = FetchResilience()
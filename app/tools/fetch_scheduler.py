@@ -0,0 +1,274 @@
+import os
+import math
+import time
+import asyncio
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from app.utils.http_client import http_client, parse_retry_after, read_body, HTTP_USER_AGENT
+from app.utils.url_normalizer import normalize_url
+from app.utils.logger import get_logger
+
+logger = get_logger("FetchScheduler")
+
+# Cortesia por host (variáveis de ambiente)
+FETCH_HOST_RATE = float(os.getenv("FETCH_HOST_RATE", "2"))  # requisições/s por host
+FETCH_HOST_BURST = float(os.getenv("FETCH_HOST_BURST", "4"))
+FETCH_HOST_CONCURRENCY = int(os.getenv("FETCH_HOST_CONCURRENCY", "2"))
+FETCH_MIN_RATE = float(os.getenv("FETCH_MIN_RATE", "0.1"))
+FETCH_MAX_BACKOFF = float(os.getenv("FETCH_MAX_BACKOFF", "300"))
+# Pausa máxima (s) que um worker aguarda por um host limitado antes de devolver a URL à fila,
+# quantas vezes a URL volta à fila e a pausa a partir da qual ela é abandonada
+FETCH_THROTTLE_WAIT = float(os.getenv("FETCH_THROTTLE_WAIT", "5"))
+FETCH_THROTTLE_REQUEUES = int(os.getenv("FETCH_THROTTLE_REQUEUES", "2"))
+FETCH_THROTTLE_GIVE_UP = float(os.getenv("FETCH_THROTTLE_GIVE_UP", "60"))
+FETCH_RESPECT_ROBOTS = os.getenv("FETCH_RESPECT_ROBOTS", "true").lower() in ("1", "true", "yes")
+ROBOTS_CACHE_TTL = int(os.getenv("ROBOTS_CACHE_TTL", "3600"))
+# Mesmo limite adotado pelo Google: o que passar de 500 KiB é ignorado
+ROBOTS_MAX_BYTES = 500 * 1024
+
+THROTTLE_STATUSES = (429, 503)
+_BASE_BACKOFF = 2.0
+
+class HostThrottledError(Exception):
+    """O host pediu uma pausa (429/503) longa demais para esperar dentro do worker."""
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} limitado por mais {retry_in:.0f}s.")
+        self.host = host
+        self.retry_in = retry_in
+
+def host_of(url: str) -> str:
+    """Host usado para agrupar as requisições (sem 'www.')."""
+    host = urlsplit(normalize_url(url)).netloc
+    return host[4:] if host.startswith("www.") else host
+
+class _HostState:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.active = 0
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.released = asyncio.Event()
+        self.robots: RobotFileParser | None = None
+        self.robots_expires = 0.0
+        self.robots_task: asyncio.Task | None = None
+        self.crawl_delay: float | None = None
+
+class FetchScheduler:
+    """
+    Cortesia por host para os downloads da extração.
+
+    Cada host tem um token bucket (taxa e rajada), um limite de requisições
+    simultâneas e um bloqueio temporário após 429/503: o intervalo respeita o
+    `Retry-After` ou cresce exponencialmente, e a taxa do host cai pela metade,
+    voltando aos poucos a cada resposta bem-sucedida. O robots.txt de cada host
+    é consultado uma vez e mantido em cache. O `HostQueue` usa o estado dos
+    hosts para intercalar as URLs em round-robin.
+    """
+    def __init__(self, rate: float = FETCH_HOST_RATE, burst: float = FETCH_HOST_BURST,
+                 concurrency: int = FETCH_HOST_CONCURRENCY):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.concurrency = max(1, concurrency)
+        self._hosts: Dict[str, _HostState] = {}
+        self._queues: "weakref.WeakSet[HostQueue]" = weakref.WeakSet()
+        self.counters = {"requests": 0, "throttled": 0, "waits": 0, "robots_blocked": 0}
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.rate, self.burst)
+        return state
+
+    def _refill(self, state: _HostState):
+        now = time.monotonic()
+        state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+        state.updated = now
+
+    def delay(self, host: str) -> float:
+        """Segundos até o host aceitar uma nova requisição (0 = agora, inf = aguardando vaga)."""
+        state = self._state(host)
+        if state.active >= self.concurrency:
+            return math.inf
+        now = time.monotonic()
+        if state.blocked_until > now:
+            return state.blocked_until - now
+        self._refill(state)
+        if state.tokens >= 1:
+            return 0.0
+        return (1 - state.tokens) / state.rate
+
+    def blocked_for(self, host: str) -> float:
+        """Segundos restantes da pausa do host após 429/503 (0 = sem pausa)."""
+        state = self._hosts.get(host)
+        return max(0.0, state.blocked_until - time.monotonic()) if state else 0.0
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[None]:
+        """Aguarda a vez do host da URL e ocupa uma de suas vagas durante o bloco."""
+        host = host_of(url)
+        state = self._state(host)
+        waited = False
+        while True:
+            wait = self.delay(host)
+            if wait == 0:
+                break
+            waited = True
+            state.released.clear()
+            try:
+                await asyncio.wait_for(state.released.wait(), None if math.isinf(wait) else wait)
+            except asyncio.TimeoutError:
+                pass
+        if waited:
+            self.counters["waits"] += 1
+        state.tokens -= 1
+        state.active += 1
+        self.counters["requests"] += 1
+        try:
+            yield
+        finally:
+            state.active -= 1
+            state.released.set()
+            self._notify()
+
+    def report(self, url: str, status: int, retry_after: str | None = None):
+        """Ajusta o ritmo do host conforme a resposta (backoff adaptativo em 429/503)."""
+        state = self._state(host_of(url))
+        if status in THROTTLE_STATUSES:
+            self.counters["throttled"] += 1
+            state.failures += 1
+            state.rate = max(FETCH_MIN_RATE, state.rate / 2)
+            backoff = parse_retry_after(retry_after)
+            if backoff is None:
+                backoff = _BASE_BACKOFF * 2 ** (state.failures - 1)
+            backoff = min(FETCH_MAX_BACKOFF, backoff)
+            state.blocked_until = max(state.blocked_until, time.monotonic() + backoff)
+            logger.warning(f"{host_of(url)} respondeu {status}: pausa de {backoff:.1f}s, taxa {state.rate:.2f} req/s.")
+        elif status < 400:
+            state.failures = 0
+            target = self.rate if state.crawl_delay is None else min(self.rate, 1 / state.crawl_delay)
+            if state.rate < target:
+                state.rate = min(target, state.rate + target * 0.1)
+        self._notify()
+
+    async def allowed(self, url: str) -> bool:
+        """Consulta o robots.txt do host (em cache) para a URL."""
+        if not FETCH_RESPECT_ROBOTS:
+            return True
+        state = self._state(host_of(url))
+        if state.robots is None or state.robots_expires < time.time():
+            if state.robots_task is None:
+                state.robots_task = asyncio.create_task(self._load_robots(url, state))
+            await asyncio.shield(state.robots_task)
+        allowed = state.robots.can_fetch(HTTP_USER_AGENT, url)
+        if not allowed:
+            self.counters["robots_blocked"] += 1
+        return allowed
+
+    async def _load_robots(self, url: str, state: _HostState):
+        parts = urlsplit(normalize_url(url))
+        robots = RobotFileParser()
+        ttl = ROBOTS_CACHE_TTL
+        try:
+            session = await http_client.get_session()
+            robots_url = f"{parts.scheme}://{parts.netloc}/robots.txt"
+            async with session.get(robots_url, timeout=aiohttp.ClientTimeout(total=5), ssl=False) as response:
+                if response.status == 200:
+                    body, _ = await read_body(response, ROBOTS_MAX_BYTES)
+                    robots.parse(body.decode("utf-8", errors="replace").splitlines())
+                elif response.status in (401, 403):
+                    # Mesma convenção do urllib.robotparser: acesso negado ao robots.txt proíbe tudo
+                    robots.disallow_all = True
+                else:
+                    robots.allow_all = True
+        except Exception as e:
+            # Sem robots.txt acessível: libera, mas tenta de novo em breve
+            robots.allow_all = True
+            ttl = min(ttl, 300)
+            logger.warning(f"robots.txt de {parts.netloc} indisponível ({e}).")
+        delay = robots.crawl_delay(HTTP_USER_AGENT)
+        if delay:
+            state.crawl_delay = float(delay)
+            state.rate = min(state.rate, 1 / state.crawl_delay)
+        state.robots = robots
+        state.robots_expires = time.time() + ttl
+        state.robots_task = None
+
+    def _notify(self):
+        for queue in list(self._queues):
+            queue.wakeup()
+
+    def stats(self) -> Dict[str, Any]:
+        throttled_hosts = sum(1 for s in self._hosts.values() if s.blocked_until > time.monotonic())
+        in_flight = sum(s.active for s in self._hosts.values())
+        return {"hosts": len(self._hosts), "throttled_hosts": throttled_hosts, "in_flight": in_flight, **self.counters}
+
+class HostQueue:
+    """
+    Fila de URLs de uma missão, entregue em round-robin entre os hosts.
+
+    `next()` devolve a próxima URL de um host que pode receber requisição
+    agora, em vez de deixar um worker parado atrás de um host ocupado
+    enquanto outros hosts estão livres. Os workers chamam `done()` ao terminar.
+    """
+    def __init__(self, scheduler: FetchScheduler):
+        self.scheduler = scheduler
+        self._pending: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._in_flight: Dict[str, int] = {}
+        self._closed = False
+        self._event = asyncio.Event()
+        scheduler._queues.add(self)
+
+    def wakeup(self):
+        self._event.set()
+
+    def add(self, url: str):
+        self._pending.setdefault(host_of(url), deque()).append(url)
+        self.wakeup()
+
+    def close(self):
+        """Sinaliza que não haverá novas URLs."""
+        self._closed = True
+        self.wakeup()
+
+    def done(self, url: str):
+        host = host_of(url)
+        self._in_flight[host] = self._in_flight.get(host, 1) - 1
+        self.wakeup()
+
+    async def next(self) -> str | None:
+        """Próxima URL pronta para download, ou None quando a fila foi fechada e esvaziou."""
+        while True:
+            if not self._pending and self._closed:
+                return None
+            wait = None
+            for host in list(self._pending):
+                if self._in_flight.get(host, 0) >= self.scheduler.concurrency:
+                    continue
+                delay = self.scheduler.delay(host)
+                if delay == 0:
+                    urls = self._pending[host]
+                    url = urls.popleft()
+                    if urls:
+                        self._pending.move_to_end(host)
+                    else:
+                        del self._pending[host]
+                    self._in_flight[host] = self._in_flight.get(host, 0) + 1
+                    return url
+                if not math.isinf(delay):
+                    wait = delay if wait is None else min(wait, delay)
+            self._event.clear()
+            try:
+                await asyncio.wait_for(self._event.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+fetch_scheduler = FetchScheduler()
@@ -1,46 +1,43 @@
-import os
 from typing import Dict, Any
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import asyncio
+
+from app.tools.browser_pool import browser_pool
+from app.utils.screenshot_store import screenshot_store
+from app.utils import metrics
+from app.utils.logger import get_logger
+from app.utils.tracer import traced
+
+logger = get_logger("ScreenshotTool")
 
 # A lógica robusta do seu viral_integration_service.py seria refatorada aqui.
 
+@traced("tool", "url")
 async def capture_screenshot(url: str, session_id: str) -> Dict[str, Any]:
     """
-    Captura um screenshot de uma URL usando Selenium.
+    Captura um screenshot de uma URL usando um navegador do pool persistente.
+
+    A imagem vai para o armazenamento compartilhado (endereçado por conteúdo);
+    o resultado traz o id e as URLs de `/screenshots` para exibição.
     """
-    print(f"[ScreenshotTool] Capturando: {url}")
-    
-    # Cria o diretório se não existir
-    session_dir = f"sessions/{session_id}/screenshots"
-    os.makedirs(session_dir, exist_ok=True)
-    
-    filename = f"{url.replace('https://', '').replace('http://', '').replace('/', '_')[:50]}.png"
-    filepath = os.path.join(session_dir, filename)
-
-    # Configuração do Selenium Headless
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1920,1080")
+    logger.debug(f"Capturando: {url}")
 
     try:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-        driver.get(url)
-        # Aguarda um pouco para a página renderizar
-        await asyncio.sleep(5)
-        driver.save_screenshot(filepath)
-        driver.quit()
-        
-        print(f"[ScreenshotTool] Screenshot salvo em: {filepath}")
-        return {"success": True, "url": url, "filepath": filepath}
+        with metrics.timed(metrics.SCREENSHOT_SECONDS, outcome="ok"):
+            png = await browser_pool.capture(url)
+            stored = await screenshot_store.store(png)
+        screenshot_id = stored["screenshot_id"]
+
+        status = "reaproveitado" if stored["deduplicated"] else "salvo"
+        logger.debug(f"Screenshot {status} em: {stored['filepath']} (sessão {session_id})")
+        return {
+            "success": True,
+            "url": url,
+            "filepath": stored["filepath"],
+            "screenshot_id": screenshot_id,
+            "format": stored["format"],
+            "image_url": f"/screenshots/{screenshot_id}",
+            "thumbnail_url": f"/screenshots/{screenshot_id}/thumbnail" if stored["thumbnail"] else None
+        }
 
     except Exception as e:
-        print(f"[ScreenshotTool] Erro ao capturar {url}: {e}")
-        return {"success": False, "url": url, "error": str(e)}
\ No newline at end of file
+        logger.error(f"Erro ao capturar {url}: {e}")
+        return {"success": False, "url": url, "error": str(e)}
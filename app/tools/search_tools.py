@@ -1,38 +1,185 @@
 import os
-from typing import List, Dict, Any
-
-from app.utils.api_rotator import APIRotator
+import re
+import copy
+import unicodedata
+from typing import List, Dict, Any, Awaitable, Callable
 import aiohttp
 
-# Simulação da integração dos seus robustos serviços de busca
-# Em um projeto real, a lógica de 'alibaba_websailor.py' e 'viral_integration_service.py' seria refatorada aqui.
+from app.utils.api_rotator import api_rotator, KEY_FAILURE_STATUSES
+from app.utils.http_client import http_client
+from app.utils.response_cache import ResponseCache, SingleFlight, make_key
+from app.utils.logger import get_logger
+from app.utils.tracer import traced
+
+logger = get_logger("SearchTool")
+
+# Cache de resultados de busca, um namespace por provedor (TTL em segundos)
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(6 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+# API do Serper (busca web quando há chaves SERPER_API_KEY configuradas)
+SERPER_BASE_URL = os.getenv("SERPER_BASE_URL", "https://google.serper.dev")
+SERPER_TIMEOUT = float(os.getenv("SERPER_TIMEOUT", "15"))
+SERPER_RESULTS = int(os.getenv("SERPER_RESULTS", "10"))
+
+SEARCH_PROVIDERS = ("web", "viral")
+search_caches = {
+    provider: ResponseCache(f"search:{provider}", ttl=SEARCH_CACHE_TTL,
+                            max_entries=SEARCH_CACHE_MAX_ENTRIES, enabled=SEARCH_CACHE_ENABLED)
+    for provider in SEARCH_PROVIDERS
+}
+# Compartilhado entre missões: a mesma query de duas missões simultâneas vira uma chamada
+_inflight_searches = SingleFlight()
+_SPACES_RE = re.compile(r"\s+")
+
+SearchBackend = Callable[[str, str], Awaitable[List[Dict[str, Any]]]]
+_search_backend: SearchBackend | None = None
+
+def set_search_backend(backend: SearchBackend | None):
+    """
+    Substitui os provedores de busca por `backend(provider, query)` (ex.: benchmarks e testes).
+
+    O cache e a coalescência continuam valendo; None restaura os provedores padrão.
+    """
+    global _search_backend
+    _search_backend = backend
+
+def normalize_query(query: str) -> str:
+    """Forma canônica da query para o cache (NFKC, minúsculas, espaços colapsados)."""
+    return _SPACES_RE.sub(" ", unicodedata.normalize("NFKC", query).casefold()).strip()
+
+async def _cached_search(provider: str, query: str,
+                         fetch: Callable[[str], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """
+    Consulta o cache do provedor e, na falta, faz a busca uma única vez por query.
+
+    Cada chamador recebe sua própria cópia da lista: os agentes reescrevem os
+    itens (ex.: URL canônica) e não podem alterar o resultado de outra missão.
+    """
+    cache = search_caches[provider]
+    key = make_key(provider, normalize_query(query))
+
+    cached = await cache.get(key)
+    if cached is not None:
+        logger.debug(f"Resultado de '{query}' ({provider}) obtido do cache.")
+        return cached
+
+    if _inflight_searches.in_flight(key):
+        cache.counters["coalesced"] += 1
+        logger.debug(f"Busca idêntica em andamento para '{query}' ({provider}). Aguardando o mesmo resultado...")
+
+    async def fetch_and_store() -> List[Dict[str, Any]]:
+        if _search_backend is not None:
+            results = await _search_backend(provider, query)
+        else:
+            results = await fetch(query)
+        # Lista vazia costuma indicar falha do provedor: não fica em cache
+        if results:
+            await cache.set(key, results)
+        return results
+
+    return copy.deepcopy(await _inflight_searches.do(key, fetch_and_store))
+
+def search_cache_stats() -> Dict[str, Any]:
+    return {provider: cache.stats() for provider, cache in search_caches.items()}
 
-api_rotator = APIRotator()
+# Busca web pelo Serper (com resultados simulados na falta de chaves); a busca
+# de conteúdo viral segue simulada. Em um projeto real, a lógica de
+# 'viral_integration_service.py' seria refatorada aqui.
 
+@traced("search", "query")
 async def search_web_robust(query: str) -> List[Dict[str, Any]]:
     """
-    Simula uma busca web robusta usando a melhor API disponível.
-    Esta função encapsularia a lógica de 'alibaba_websailor.py'.
+    Busca web robusta usando a melhor API disponível, com cache por query normalizada.
+
+    Se o Serper falhar, usa os resultados simulados sem gravá-los no cache.
     """
-    print(f"[SearchTool] Executando busca web robusta para: '{query}'")
-    # Lógica de busca com Serper, Google, etc., usando api_rotator
-    # ...
+    results = await _cached_search("web", query, _fetch_web)
+    if not results and _search_backend is None:
+        logger.warning(f"Busca web sem resultados para '{query}'. Usando resultados simulados...")
+        return _simulated_web_results(query)
+    return results
+
+async def _fetch_web(query: str) -> List[Dict[str, Any]]:
+    """
+    Busca web pelo Serper, com a sessão compartilhada e uma chave do pool.
+
+    Sem chaves configuradas, devolve resultados simulados para demonstração.
+    Se o Serper falhar, devolve uma lista vazia, que não fica em cache.
+    """
+    logger.debug(f"Executando busca web robusta para: '{query}'")
+    if not api_rotator.has_keys("serper"):
+        return _simulated_web_results(query)
+    results = await _search_serper(query)
+    return results if results is not None else []
+
+async def _search_serper(query: str) -> List[Dict[str, Any]] | None:
+    """
+    Consulta o endpoint /search do Serper.
+
+    Se a chave for recusada ou limitada (401/402/403/429), a chamada é
+    repetida com outra chave do pool. Retorna None em caso de falha.
+    """
+    payload = {"q": query, "gl": "br", "hl": "pt-br", "num": SERPER_RESULTS}
+    try:
+        session = await http_client.get_session()
+        for _ in range(api_rotator.size("serper")):
+            async with api_rotator.use("serper") as lease:
+                if lease is None:
+                    logger.warning("Todas as chaves do Serper estão em pausa.")
+                    return None
+                headers = {"X-API-KEY": lease.key, "Content-Type": "application/json"}
+                async with session.post(f"{SERPER_BASE_URL}/search", headers=headers, json=payload,
+                                        timeout=aiohttp.ClientTimeout(total=SERPER_TIMEOUT)) as response:
+                    lease.report(response.status, response.headers)
+                    if response.status == 200:
+                        data = await response.json()
+                        return [
+                            {"title": item.get("title", ""), "url": item["link"], "snippet": item.get("snippet", "")}
+                            for item in data.get("organic", []) if item.get("link")
+                        ]
+                    error_text = await response.text()
+                    logger.error(f"Erro na API Serper: {response.status} - {error_text[:200]}")
+                    if response.status not in KEY_FAILURE_STATUSES:
+                        return None
+    except Exception as e:
+        logger.error(f"Erro na requisição ao Serper: {e}")
+    return None
+
+def _simulated_web_results(query: str) -> List[Dict[str, Any]]:
     # Retorno simulado para demonstração
     return [
         {"title": f"Resultado Principal para {query}", "url": f"https://example.com/{query.replace(' ', '_')}", "snippet": "Este é o principal resultado da busca web."},
         {"title": f"Blog Post sobre {query}", "url": f"https://blog.example.com/{query.replace(' ', '_')}", "snippet": "Um artigo detalhado sobre o tópico."},
     ]
 
+@traced("search", "query")
 async def search_viral_content(query: str) -> List[Dict[str, Any]]:
+    """
+    Busca por conteúdo viral em redes sociais, com cache por query normalizada.
+    """
+    return await _cached_search("viral", query, _fetch_viral)
+
+async def _fetch_viral(query: str) -> List[Dict[str, Any]]:
     """
     Simula a busca por conteúdo viral em redes sociais.
     Esta função encapsularia a lógica de 'viral_integration_service.py'.
     """
-    print(f"[SearchTool] Buscando conteúdo viral para: '{query}'")
+    logger.debug(f"Buscando conteúdo viral para: '{query}'")
     # Lógica de busca no Instagram, YouTube, etc.
     # ...
     # Retorno simulado para demonstração
     return [
         {"title": f"Post Viral no Instagram sobre {query}", "url": f"https://instagram.com/p/{query.replace(' ', '')}", "snippet": "Conteúdo com altíssimo engajamento.", "platform": "Instagram"},
         {"title": f"Vídeo no YouTube sobre {query}", "url": f"https://youtube.com/watch?v={query[:5]}", "snippet": "Vídeo tutorial com milhões de visualizações.", "platform": "YouTube"},
-    ]
\ No newline at end of file
+    ]
+
+async def search_for_query(query: str) -> List[Dict[str, Any]]:
+    """
+    Seleciona a ferramenta de busca apropriada para uma query do plano e a executa.
+    """
+    # Seleciona a ferramenta de busca apropriada (aqui simplificado, poderia ser mais inteligente)
+    if "social" in query.lower() or "instagram" in query.lower():
+        return await search_viral_content(query)
+    # Usa uma ferramenta de busca genérica com rotação
+    return await search_web_robust(query)
@@ -1,26 +1,288 @@
 import os
-from typing import Dict, List
+import re
+import time
+import random
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Mapping
+
+from app.utils.http_client import parse_retry_after
+from app.utils.logger import get_logger
+
+logger = get_logger("APIRotator")
+
+# Provedores e a variável base de suas chaves: NOME, NOME_1, NOME_2, ...
+PROVIDER_KEY_ENV = {
+    "serper": "SERPER_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+}
+# Pool de chaves (variáveis de ambiente)
+API_KEY_SLOTS = int(os.getenv("API_KEY_SLOTS", "10"))
+API_KEY_COOLDOWN = float(os.getenv("API_KEY_COOLDOWN", "60"))  # pausa após 429 sem Retry-After
+API_KEY_MAX_COOLDOWN = float(os.getenv("API_KEY_MAX_COOLDOWN", "3600"))
+API_KEY_DISABLE_TIME = float(os.getenv("API_KEY_DISABLE_TIME", "3600"))  # chave inválida ou sem créditos
+API_KEY_MAX_WAIT = float(os.getenv("API_KEY_MAX_WAIT", "10"))
+
+# Respostas que dizem respeito à chave (e não à requisição): vale tentar outra
+KEY_FAILURE_STATUSES = (401, 402, 403, 429)
+_EWMA_ALPHA = 0.3
+_MIN_WEIGHT = 0.02
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def mask_key(key: str) -> str:
+    """Forma exibível de uma chave (apenas o início e o fim)."""
+    return f"{key[:4]}…{key[-4:]}" if len(key) > 12 else "****"
+
+def _parse_reset(value: str | None) -> float | None:
+    """Segundos até a renovação da cota (delta, epoch em s/ms ou '1m30s')."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        parts = _DURATION_RE.findall(value)
+        return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts) if parts else None
+    if number > 1e12:
+        return max(0.0, number / 1000 - time.time())
+    if number > 1e9:
+        return max(0.0, number - time.time())
+    return max(0.0, number)
+
+def _header_int(headers: Mapping[str, str], *names: str) -> int | None:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return int(float(value))
+            except ValueError:
+                pass
+    return None
+
+class _KeyState:
+    def __init__(self, key: str):
+        self.key = key
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.throttled = 0
+        self.consecutive_throttles = 0
+        self.in_flight = 0
+        self.success_ewma = 1.0
+        self.latency_ewma: float | None = None
+        self.remaining: int | None = None
+        self.limit: int | None = None
+        self.cooldown_until = 0.0
+        self.last_status: int | None = None
+
+    def available(self, now: float) -> bool:
+        return self.cooldown_until <= now
+
+class KeyLease:
+    """Chave emprestada do pool; `report` registra o resultado da chamada feita com ela."""
+    def __init__(self, rotator: "APIRotator", service: str, state: _KeyState):
+        self.service = service
+        self.key = state.key
+        self._rotator = rotator
+        self._state = state
+        self._started = time.monotonic()
+        self.reported = False
+
+    def report(self, status: int | None, headers: Mapping[str, str] | None = None):
+        """Registra o status HTTP (None = falha de rede) e os cabeçalhos de cota da resposta."""
+        if self.reported:
+            return
+        self.reported = True
+        self._state.in_flight -= 1
+        self._rotator._record(self.service, self._state, status, time.monotonic() - self._started, headers)
+
+    def release(self):
+        """Devolve a chave sem registrar resultado (ex.: chamada cancelada)."""
+        if not self.reported:
+            self.reported = True
+            self._state.in_flight -= 1
 
 class APIRotator:
-    """Gerencia e rotaciona chaves de API para diferentes serviços."""
-    def __init__(self):
-        self.keys: Dict[str, List[str]] = {
-            "serper": [key for key in [os.getenv("SERPER_API_KEY"), os.getenv("SERPER_API_KEY_1")] if key],
-            # Adicionar outras APIs aqui...
+    """
+    Pool de chaves de API por provedor, com seleção ponderada pela saúde de cada chave.
+
+    Cada chave acumula latência (média móvel), taxa de sucesso, cota restante
+    (cabeçalhos X-RateLimit-*) e uma janela de pausa: após 429 a chave respeita
+    o `Retry-After` (ou uma pausa exponencial) e após 401/402/403 sai de uso por
+    `API_KEY_DISABLE_TIME`. A escolha sorteia entre as chaves disponíveis com
+    peso maior para as rápidas, saudáveis, com cota e menos ocupadas, em vez
+    de dar 1/N do tráfego a uma chave morta. Escolha e contagem de uso
+    acontecem sem awaits, portanto são atômicas entre tarefas do mesmo loop.
+    """
+    def __init__(self, keys: Dict[str, List[str]] | None = None):
+        if keys is None:
+            keys = {service: self._load_keys(env) for service, env in PROVIDER_KEY_ENV.items()}
+        self.keys: Dict[str, List[str]] = {service: list(dict.fromkeys(k for k in values if k)) for service, values in keys.items()}
+        self._states: Dict[str, List[_KeyState]] = {
+            service: [_KeyState(key) for key in values] for service, values in self.keys.items()
         }
-        self.indices: Dict[str, int] = {service: 0 for service in self.keys}
-        print("APIRotator inicializado.")
+        summary = ", ".join(f"{service}={len(values)}" for service, values in self.keys.items())
+        logger.info(f"APIRotator inicializado ({summary}).")
 
-    def get_key(self, service: str) -> str | None:
-        """Obtém a próxima chave de API disponível para um serviço."""
-        if service not in self.keys or not self.keys[service]:
+    @staticmethod
+    def _load_keys(env_name: str) -> List[str]:
+        names = [env_name] + [f"{env_name}_{i}" for i in range(1, API_KEY_SLOTS + 1)]
+        return [os.getenv(name) for name in names if os.getenv(name)]
+
+    def has_keys(self, service: str) -> bool:
+        return bool(self._states.get(service))
+
+    def size(self, service: str) -> int:
+        return len(self._states.get(service, ()))
+
+    def _weight(self, state: _KeyState, reference_latency: float) -> float:
+        latency = state.latency_ewma if state.latency_ewma is not None else reference_latency
+        weight = max(_MIN_WEIGHT, state.success_ewma) * reference_latency / max(latency, 0.001)
+        if state.remaining is not None and state.limit:
+            weight *= max(_MIN_WEIGHT, state.remaining / state.limit)
+        return weight / (1 + state.in_flight)
+
+    def _choose(self, service: str) -> _KeyState | None:
+        states = self._states.get(service)
+        if not states:
+            return None
+        now = time.monotonic()
+        candidates = [s for s in states if s.available(now)]
+        if not candidates:
             return None
-        
-        key_list = self.keys[service]
-        current_index = self.indices[service]
-        key = key_list[current_index]
-        
-        # Rotaciona para a próxima chave
-        self.indices[service] = (current_index + 1) % len(key_list)
-        
-        return key
\ No newline at end of file
+        # Chaves ainda sem medição recebem a melhor latência conhecida (são exploradas)
+        latencies = [s.latency_ewma for s in candidates if s.latency_ewma is not None]
+        reference = min(latencies) if latencies else 1.0
+        return random.choices(candidates, weights=[self._weight(s, reference) for s in candidates])[0]
+
+    def wait_time(self, service: str) -> float | None:
+        """Segundos até alguma chave do serviço voltar da pausa (0 = há chave livre, None = sem chaves)."""
+        states = self._states.get(service)
+        if not states:
+            return None
+        return max(0.0, min(s.cooldown_until for s in states) - time.monotonic())
+
+    def get_key(self, service: str) -> str | None:
+        """Obtém uma chave disponível para o serviço (sem acompanhar o uso; prefira `use`)."""
+        state = self._choose(service)
+        return state.key if state else None
+
+    @asynccontextmanager
+    async def use(self, service: str, max_wait: float = API_KEY_MAX_WAIT) -> AsyncIterator[KeyLease | None]:
+        """
+        Empresta uma chave do serviço durante o bloco.
+
+        Se todas estiverem em pausa, aguarda até `max_wait` segundos; sem chave
+        utilizável, entrega None. Quem usa a chave chama `lease.report(status,
+        headers)`; sem relatório, o bloco conta como sucesso ou, se terminar com
+        exceção, como falha de rede (cancelamentos não contam).
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            state = self._choose(service)
+            if state is not None:
+                break
+            wait = self.wait_time(service)
+            if wait is None or time.monotonic() + wait > deadline:
+                yield None
+                return
+            await asyncio.sleep(wait)
+        state.in_flight += 1
+        lease = KeyLease(self, service, state)
+        try:
+            yield lease
+        except asyncio.CancelledError:
+            lease.release()
+            raise
+        except BaseException:
+            lease.report(None)
+            raise
+        finally:
+            lease.report(200)
+
+    def report(self, service: str, key: str, status: int | None, latency: float | None = None,
+               headers: Mapping[str, str] | None = None):
+        """Registra o resultado de uma chamada feita com uma chave obtida por `get_key`."""
+        for state in self._states.get(service, ()):
+            if state.key == key:
+                self._record(service, state, status, latency, headers)
+                return
+
+    def _record(self, service: str, state: _KeyState, status: int | None, latency: float | None,
+                headers: Mapping[str, str] | None):
+        now = time.monotonic()
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        state.requests += 1
+        state.last_status = status
+        if latency is not None and status is not None:
+            state.latency_ewma = latency if state.latency_ewma is None else (
+                _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * state.latency_ewma
+            )
+
+        remaining = _header_int(headers, "x-ratelimit-remaining", "x-ratelimit-remaining-requests")
+        limit = _header_int(headers, "x-ratelimit-limit", "x-ratelimit-limit-requests")
+        if remaining is not None:
+            state.remaining = remaining
+        if limit is not None:
+            state.limit = limit
+        reset = _parse_reset(headers.get("x-ratelimit-reset") or headers.get("x-ratelimit-reset-requests"))
+
+        ok = status is not None and status < 400
+        state.success_ewma = _EWMA_ALPHA * ok + (1 - _EWMA_ALPHA) * state.success_ewma
+        if ok:
+            state.successes += 1
+            state.consecutive_throttles = 0
+            if state.remaining == 0:
+                # Cota esgotada: pausa até a renovação informada pelo provedor
+                cooldown = reset if reset is not None else API_KEY_COOLDOWN
+                state.cooldown_until = max(state.cooldown_until, now + min(API_KEY_MAX_COOLDOWN, cooldown))
+            return
+
+        state.errors += 1
+        if status == 429:
+            state.throttled += 1
+            state.consecutive_throttles += 1
+            cooldown = parse_retry_after(headers.get("retry-after"))
+            if cooldown is None:
+                cooldown = reset if reset is not None else API_KEY_COOLDOWN * 2 ** (state.consecutive_throttles - 1)
+            cooldown = min(API_KEY_MAX_COOLDOWN, cooldown)
+            state.cooldown_until = max(state.cooldown_until, now + cooldown)
+            logger.warning(f"Chave {mask_key(state.key)} de {service} limitada (429): pausa de {cooldown:.0f}s.")
+        elif status in (401, 402, 403):
+            if status == 402:
+                state.remaining = 0
+            state.cooldown_until = max(state.cooldown_until, now + API_KEY_DISABLE_TIME)
+            logger.warning(f"Chave {mask_key(state.key)} de {service} recusada ({status}): fora de uso por {API_KEY_DISABLE_TIME:.0f}s.")
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas por chave (mascaradas) de cada provedor."""
+        now = time.monotonic()
+        result = {}
+        for service, states in self._states.items():
+            result[service] = [{
+                "key": mask_key(s.key),
+                "available": s.available(now),
+                "cooldown_remaining": round(max(0.0, s.cooldown_until - now), 1),
+                "in_flight": s.in_flight,
+                "requests": s.requests,
+                "successes": s.successes,
+                "errors": s.errors,
+                "throttled": s.throttled,
+                "success_rate": round(s.success_ewma, 3),
+                "latency_ms": round(s.latency_ewma * 1000, 1) if s.latency_ewma is not None else None,
+                "remaining": s.remaining,
+                "limit": s.limit,
+                "last_status": s.last_status,
+            } for s in states]
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """Chaves disponíveis/total por provedor (para o /health)."""
+        now = time.monotonic()
+        return {
+            service: {"available": sum(s.available(now) for s in states), "total": len(states)}
+            for service, states in self._states.items()
+        }
+
+api_rotator = APIRotator()
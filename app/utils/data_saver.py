@@ -1,25 +1,358 @@
 import os
 import json
-from typing import Dict, Any
+import time
+import queue
+import asyncio
+import threading
+from typing import Dict, Any, List, Optional, Iterable, Tuple
 
-class DataSaver:
-    """Salva o estado da missão em arquivos JSON."""
+from app.utils.logger import get_logger
+
+logger = get_logger("DataSaver")
+
+# "delta": log incremental + snapshots periódicos; "snapshot": um JSON completo por etapa (legado)
+DATASAVER_MODE = os.getenv("DATASAVER_MODE", "delta").lower()
+# A cada quantas etapas um snapshot compacto é gravado no modo delta
+DATASAVER_SNAPSHOT_EVERY = int(os.getenv("DATASAVER_SNAPSHOT_EVERY", "5"))
+DATASAVER_FSYNC = os.getenv("DATASAVER_FSYNC", "true").lower() in ("1", "true", "yes")
+
+LOG_FILENAME = "state.log"
+SNAPSHOT_DIR = "snapshots"
+
+def _dumps(value: Any) -> str:
+    # Usar default=str para lidar com objetos não serializáveis como Pydantic models
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+class _SessionLog:
+    """Estado do log de uma sessão: sequência e a "sombra" do último estado salvo."""
+    def __init__(self, seq: int = -1):
+        self.seq = seq
+        self.since_snapshot = 0
+        # chave -> lista (cópia rasa dos itens) ou JSON serializado do valor
+        self.shadow: Dict[str, Any] = {}
+        self.last_state: Dict[str, Any] | None = None
+        self.last_step: str | None = None
+
+class _Writer(threading.Thread):
+    """Thread que grava os registros em lote, com um único fsync por arquivo por lote."""
     def __init__(self):
+        super().__init__(name="datasaver-writer", daemon=True)
+        self.ops: "queue.Queue[tuple]" = queue.Queue()
+
+    def run(self):
+        while True:
+            batch = [self.ops.get()]
+            while True:
+                try:
+                    batch.append(self.ops.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[tuple]):
+        appends: Dict[str, List[str]] = {}
+        waiters: List[threading.Event] = []
+        for op in batch:
+            kind = op[0]
+            if kind == "append":
+                appends.setdefault(op[1], []).append(op[2])
+            elif kind == "snapshot":
+                self._write_snapshot(op[1], op[2])
+            elif kind == "flush":
+                waiters.append(op[1])
+        for path, lines in appends.items():
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                    f.flush()
+                    if DATASAVER_FSYNC:
+                        os.fsync(f.fileno())
+            except Exception as e:
+                logger.error(f"Erro ao gravar log {path}: {e}")
+        for event in waiters:
+            event.set()
+
+    @staticmethod
+    def _write_snapshot(path: str, state: Dict[str, Any]):
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(_dumps(state))
+                f.flush()
+                if DATASAVER_FSYNC:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Erro ao gravar snapshot {path}: {e}")
+
+class DataSaver:
+    """
+    Salva o estado da missão.
+
+    No modo "delta" (padrão), cada `save_state` acrescenta ao `state.log` da
+    sessão apenas as chaves alteradas e os itens novos das listas, e a cada
+    `DATASAVER_SNAPSHOT_EVERY` etapas grava um snapshot compacto. A gravação e
+    o fsync (em lote) acontecem numa thread, fora do event loop. `load_state`
+    reconstrói o estado de qualquer etapa a partir do snapshot mais próximo.
+
+    Itens já adicionados às listas do estado são tratados como imutáveis.
+    """
+    def __init__(self, mode: str = DATASAVER_MODE, snapshot_every: int = DATASAVER_SNAPSHOT_EVERY):
         self.base_dir = "sessions"
+        self.mode = mode
+        self.snapshot_every = max(1, snapshot_every)
+        self._sessions: Dict[str, _SessionLog] = {}
+        self._writer: _Writer | None = None
         os.makedirs(self.base_dir, exist_ok=True)
-        print("DataSaver inicializado.")
+        logger.info(f"DataSaver inicializado (modo {self.mode}).")
+
+    def _session_dir(self, session_id: str) -> str:
+        return os.path.join(self.base_dir, session_id)
+
+    def _submit(self, op: tuple):
+        if self._writer is None:
+            self._writer = _Writer()
+            self._writer.start()
+        self._writer.ops.put(op)
 
     async def save_state(self, session_id: str, step_name: str, state: Dict[str, Any]):
         """Salva o estado atual da missão."""
-        session_dir = os.path.join(self.base_dir, session_id)
+        session_dir = self._session_dir(session_id)
         os.makedirs(session_dir, exist_ok=True)
-        
-        filepath = os.path.join(session_dir, f"{step_name}.json")
-        
+
+        if self.mode != "delta":
+            filepath = os.path.join(session_dir, f"{step_name}.json")
+            try:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    # Usar default=str para lidar com objetos não serializáveis como Pydantic models
+                    json.dump(state, f, ensure_ascii=False, indent=2, default=str)
+                logger.debug(f"Estado salvo em: {filepath}")
+            except Exception as e:
+                logger.error(f"Erro ao salvar estado: {e}")
+            return
+
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                # Usar default=str para lidar com objetos não serializáveis como Pydantic models
-                json.dump(state, f, ensure_ascii=False, indent=2, default=str)
-            print(f"[DataSaver] Estado salvo em: {filepath}")
+            log = self._sessions.setdefault(session_id, _SessionLog())
+            log.seq += 1
+            record = self._diff(log, state)
+            record.update({"seq": log.seq, "step": step_name, "ts": time.time()})
+            self._submit(("append", os.path.join(session_dir, LOG_FILENAME), _dumps(record) + "\n"))
+            log.last_state, log.last_step = state, step_name
+
+            log.since_snapshot += 1
+            if log.seq == 0 or log.since_snapshot >= self.snapshot_every:
+                self._queue_snapshot(session_id, log)
+            changed = len(record.get("set", {})) + len(record.get("extend", {}))
+            logger.debug(f"Etapa {step_name} registrada ({changed} chaves alteradas).")
         except Exception as e:
-            print(f"[DataSaver] Erro ao salvar estado: {e}")
\ No newline at end of file
+            logger.error(f"Erro ao salvar estado: {e}")
+
+    def _diff(self, log: _SessionLog, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Calcula o delta em relação ao último estado salvo e atualiza a sombra."""
+        record: Dict[str, Any] = {}
+        for key, value in state.items():
+            previous = log.shadow.get(key)
+            if isinstance(value, list):
+                if (
+                    isinstance(previous, list)
+                    and len(value) >= len(previous)
+                    and all(a is b for a, b in zip(previous, value))
+                ):
+                    if len(value) > len(previous):
+                        record.setdefault("extend", {})[key] = value[len(previous):]
+                else:
+                    record.setdefault("set", {})[key] = value
+                log.shadow[key] = list(value)
+            else:
+                serialized = _dumps(value)
+                if serialized != previous:
+                    record.setdefault("set", {})[key] = value
+                log.shadow[key] = serialized
+        removed = [key for key in log.shadow if key not in state]
+        for key in removed:
+            del log.shadow[key]
+        if removed:
+            record["delete"] = removed
+        return record
+
+    def _queue_snapshot(self, session_id: str, log: _SessionLog):
+        # Cópia rasa: a serialização acontece na thread enquanto o estado segue mudando
+        frozen = {k: list(v) if isinstance(v, list) else v for k, v in (log.last_state or {}).items()}
+        snapshot_dir = os.path.join(self._session_dir(session_id), SNAPSHOT_DIR)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        path = os.path.join(snapshot_dir, f"{log.seq:04d}_{log.last_step}.json")
+        self._submit(("snapshot", path, {"seq": log.seq, "step": log.last_step, "state": frozen}))
+        log.since_snapshot = 0
+
+    async def flush(self):
+        """Aguarda (sem bloquear o loop) a gravação de tudo o que já foi enfileirado."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._submit(("flush", done))
+        await asyncio.to_thread(done.wait)
+
+    async def close_session(self, session_id: str):
+        """Grava um snapshot final da sessão e libera a memória usada pelo delta."""
+        log = self._sessions.pop(session_id, None)
+        if log is not None and log.since_snapshot > 0:
+            self._queue_snapshot(session_id, log)
+        await self.flush()
+
+    def _read_log(self, session_id: str) -> Iterable[Dict[str, Any]]:
+        path = os.path.join(self._session_dir(session_id), LOG_FILENAME)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Linha final incompleta (queda durante a escrita): ignora
+                        break
+
+    def list_steps(self, session_id: str) -> List[str]:
+        """Lista as etapas salvas de uma sessão, em ordem."""
+        session_dir = self._session_dir(session_id)
+        if os.path.exists(os.path.join(session_dir, LOG_FILENAME)):
+            return [record["step"] for record in self._read_log(session_id)]
+        if not os.path.isdir(session_dir):
+            return []
+        return [f[:-5] for f in sorted(os.listdir(session_dir)) if f.endswith(".json")]
+
+    def load_state(self, session_id: str, step: str | None = None, keys: Iterable[str] | None = None) -> Optional[Dict[str, Any]]:
+        """
+        Reconstrói o estado de uma sessão.
+
+        Args:
+            session_id (str): A sessão.
+            step (str | None): Etapa desejada; None para a última.
+            keys (Iterable[str] | None): Restringe a reconstrução a essas chaves.
+
+        Returns:
+            Optional[Dict[str, Any]]: O estado da etapa, ou None se não existir.
+        """
+        wanted = set(keys) if keys is not None else None
+        session_dir = self._session_dir(session_id)
+        if not os.path.exists(os.path.join(session_dir, LOG_FILENAME)):
+            return self._load_legacy(session_id, step, wanted)
+
+        target_seq = None
+        if step is not None:
+            matches = [r["seq"] for r in self._read_log(session_id) if r["step"] == step]
+            if not matches:
+                return None
+            target_seq = matches[-1]
+
+        state: Dict[str, Any] = {}
+        base_seq = -1
+        snapshot = self._best_snapshot(session_id, target_seq)
+        if snapshot is not None:
+            base_seq = snapshot["seq"]
+            state = {k: v for k, v in snapshot["state"].items() if wanted is None or k in wanted}
+
+        for record in self._read_log(session_id):
+            seq = record["seq"]
+            if seq <= base_seq:
+                continue
+            if target_seq is not None and seq > target_seq:
+                break
+            for key, value in record.get("set", {}).items():
+                if wanted is None or key in wanted:
+                    state[key] = value
+            for key, items in record.get("extend", {}).items():
+                if wanted is None or key in wanted:
+                    state.setdefault(key, []).extend(items)
+            for key in record.get("delete", []):
+                state.pop(key, None)
+        return state
+
+    def load_page(self, session_id: str, windows: Dict[str, Tuple[int, int]],
+                  keys: Iterable[str] | None = None) -> Optional[Tuple[Dict[str, Any], Dict[str, int]]]:
+        """
+        Reconstrói o último estado mantendo só uma janela das listas em `windows`.
+
+        Para não carregar as listas inteiras, o log é reaplicado registro a
+        registro (sem os snapshots, que trazem o estado completo) e cada lista
+        de `windows` guarda apenas os itens em [início, fim).
+
+        Args:
+            session_id (str): A sessão.
+            windows (Dict[str, Tuple[int, int]]): Chave -> (início, fim) da janela.
+            keys (Iterable[str] | None): Restringe a reconstrução a essas chaves.
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], Dict[str, int]]]: O estado recortado e o
+            tamanho total de cada lista recortada, ou None se a sessão não existir.
+        """
+        wanted = set(keys) if keys is not None else None
+        session_dir = self._session_dir(session_id)
+        if not os.path.exists(os.path.join(session_dir, LOG_FILENAME)):
+            state = self._load_legacy(session_id, None, wanted)
+            if state is None:
+                return None
+            totals = {}
+            for key, (start, stop) in windows.items():
+                if isinstance(state.get(key), list):
+                    totals[key] = len(state[key])
+                    state[key] = state[key][start:stop]
+            return state, totals
+
+        state: Dict[str, Any] = {}
+        totals: Dict[str, int] = {}
+        for record in self._read_log(session_id):
+            for key, value in record.get("set", {}).items():
+                if wanted is not None and key not in wanted:
+                    continue
+                if key in windows and isinstance(value, list):
+                    start, stop = windows[key]
+                    totals[key] = len(value)
+                    value = value[start:stop]
+                else:
+                    totals.pop(key, None)
+                state[key] = value
+            for key, items in record.get("extend", {}).items():
+                if wanted is not None and key not in wanted:
+                    continue
+                if key in windows:
+                    # Posições dos itens novos: [total, total + len(items))
+                    start, stop = windows[key]
+                    size = totals.get(key, 0)
+                    totals[key] = size + len(items)
+                    items = items[max(0, start - size):max(0, stop - size)]
+                state.setdefault(key, []).extend(items)
+            for key in record.get("delete", []):
+                state.pop(key, None)
+                totals.pop(key, None)
+        return state, totals
+
+    def _best_snapshot(self, session_id: str, target_seq: int | None) -> Optional[Dict[str, Any]]:
+        snapshot_dir = os.path.join(self._session_dir(session_id), SNAPSHOT_DIR)
+        if not os.path.isdir(snapshot_dir):
+            return None
+        candidates = []
+        for name in os.listdir(snapshot_dir):
+            # "<seq>_<etapa>.json": o seq tem ao menos 4 dígitos, mas pode ter mais
+            prefix, sep, _ = name.partition("_")
+            if name.endswith(".json") and sep and prefix.isdigit():
+                seq = int(prefix)
+                if target_seq is None or seq <= target_seq:
+                    candidates.append((seq, name))
+        for _, name in sorted(candidates, reverse=True):
+            try:
+                with open(os.path.join(snapshot_dir, name), "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def _load_legacy(self, session_id: str, step: str | None, wanted: set | None) -> Optional[Dict[str, Any]]:
+        steps = self.list_steps(session_id)
+        if not steps:
+            return None
+        name = step if step is not None else steps[-1]
+        if name not in steps:
+            return None
+        with open(os.path.join(self._session_dir(session_id), f"{name}.json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state if wanted is None else {k: v for k, v in state.items() if k in wanted}
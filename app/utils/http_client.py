@@ -0,0 +1,169 @@
+import os
+import re
+import time
+import codecs
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Tuple
+
+import aiohttp
+
+from app.utils.logger import get_logger
+
+logger = get_logger("HTTPClient")
+
+# Limites do pool de conexões (configuráveis via variáveis de ambiente)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "8"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "Mozilla/5.0 (compatible; ARQV30-AI/1.0)")
+
+# Leitura dos corpos das respostas (variáveis de ambiente)
+HTTP_MAX_BODY_BYTES = int(os.getenv("HTTP_MAX_BODY_BYTES", str(5 * 1024 * 1024)))  # além disso, o corpo é truncado
+HTTP_READ_CHUNK_SIZE = int(os.getenv("HTTP_READ_CHUNK_SIZE", "65536"))
+HTTP_STALL_TIMEOUT = float(os.getenv("HTTP_STALL_TIMEOUT", "10"))  # máximo sem receber bytes (sock_read)
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# Bytes iniciais examinados em busca de <meta charset> (os navegadores olham os primeiros 1024)
+CHARSET_SNIFF_BYTES = 4096
+
+_CHARSET_PARAM_RE = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Interpreta o cabeçalho Retry-After (segundos ou data HTTP)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def is_html(content_type: str | None) -> bool:
+    """Content-Type de página HTML (ausente conta como HTML: o corpo ainda passa por `looks_binary`)."""
+    if not content_type:
+        return True
+    return content_type.split(";", 1)[0].strip().lower() in HTML_CONTENT_TYPES
+
+def looks_binary(head: bytes) -> bool:
+    """Início de arquivo binário (PDF, imagem, vídeo...) servido sem o Content-Type correto."""
+    return b"\x00" in head[:1024] or head.startswith(b"%PDF")
+
+async def read_body(response: aiohttp.ClientResponse, max_bytes: int = HTTP_MAX_BODY_BYTES) -> Tuple[bytes, bool]:
+    """
+    Lê o corpo em blocos até `max_bytes`.
+
+    Returns:
+        Tuple[bytes, bool]: o corpo (possivelmente truncado) e se ele foi truncado.
+    """
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(HTTP_READ_CHUNK_SIZE):
+        if size + len(chunk) > max_bytes:
+            chunks.append(chunk[:max_bytes - size])
+            return b"".join(chunks), True
+        chunks.append(chunk)
+        size += len(chunk)
+    return b"".join(chunks), False
+
+def _codec(name: bytes | str | None) -> str | None:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.decode("ascii") if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+def sniff_charset(content_type: str | None, head: bytes) -> str | None:
+    """Charset declarado: BOM, parâmetro do Content-Type ou <meta> no início do documento."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    declared = _CHARSET_PARAM_RE.search(content_type or "")
+    charset = _codec(declared.group(1)) if declared else None
+    if charset is None:
+        meta = _META_CHARSET_RE.search(head[:CHARSET_SNIFF_BYTES])
+        charset = _codec(meta.group(1)) if meta else None
+    return charset
+
+def decode_html(body: bytes, content_type: str | None = None) -> str:
+    """
+    Decodifica o HTML sem detecção estatística do charset sobre o corpo todo.
+
+    Usa o charset declarado; sem declaração, UTF-8 e, se os bytes não forem
+    UTF-8 válido, windows-1252 (o padrão legado dos navegadores). Um caractere
+    multibyte cortado no fim de um corpo truncado não invalida o UTF-8.
+    """
+    charset = sniff_charset(content_type, body[:CHARSET_SNIFF_BYTES])
+    if charset is not None:
+        return body.decode(charset, errors="replace")
+    try:
+        return codecs.getincrementaldecoder("utf-8")().decode(body, final=False)
+    except UnicodeDecodeError:
+        return body.decode("cp1252", errors="replace")
+
+class HTTPClient:
+    """
+    Cliente HTTP compartilhado por toda a aplicação.
+
+    Mantém uma única `aiohttp.ClientSession` com pool de conexões keep-alive,
+    cache de DNS e limites globais e por host. É criado no lifespan do FastAPI
+    e usado pela extração, pelas buscas e pelo LLMInterface.
+    """
+    def __init__(self):
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _is_usable(self) -> bool:
+        return (
+            self._session is not None
+            and not self._session.closed
+            and self._loop is asyncio.get_running_loop()
+        )
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Cria a sessão compartilhada, caso ainda não exista no loop atual."""
+        # A criação é síncrona (sem awaits), portanto atômica dentro do loop.
+        if not self._is_usable():
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_MAX_CONNECTIONS,
+                limit_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                use_dns_cache=True,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"User-Agent": HTTP_USER_AGENT},
+            )
+            self._loop = asyncio.get_running_loop()
+            logger.info(
+                f"Pool iniciado (limite={HTTP_MAX_CONNECTIONS}, "
+                f"por_host={HTTP_MAX_CONNECTIONS_PER_HOST}, dns_ttl={HTTP_DNS_CACHE_TTL}s)."
+            )
+        return self._session
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Retorna a sessão compartilhada.
+
+        Se o lifespan ainda não a criou (ex.: scripts fora do FastAPI),
+        ela é criada sob demanda no loop atual.
+        """
+        if not self._is_usable():
+            return await self.start()
+        return self._session
+
+    async def close(self):
+        """Fecha a sessão e todas as conexões mantidas no pool."""
+        session, self._session, self._loop = self._session, None, None
+        if session is not None and not session.closed:
+            await session.close()
+            logger.info("Pool de conexões encerrado.")
+
+http_client = HTTPClient()
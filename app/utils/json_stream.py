@@ -0,0 +1,97 @@
+import json
+from typing import List
+
+class IncrementalJSONParser:
+    """
+    Parser incremental que reconhece itens de um array de strings enquanto o JSON chega.
+
+    Recebe os pedaços de texto do streaming do LLM e devolve cada string do
+    array `watch_key` (no objeto raiz) assim que ela termina, sem esperar o
+    documento completo. Texto fora do objeto raiz (ex.: cercas ```json) é ignorado.
+    A validação do documento inteiro continua a cargo de quem consome o resultado.
+    """
+    def __init__(self, watch_key: str):
+        self.watch_key = watch_key
+        self.buffer: List[str] = []
+        # Pilha de contêineres abertos: ["obj", chave_atual] ou ["arr", None]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._string_chars: List[str] = []
+        self._expecting_key = False
+        self._done = False
+
+    def text(self) -> str:
+        """Todo o texto recebido até agora."""
+        return "".join(self.buffer)
+
+    def _in_watched_array(self) -> bool:
+        return (
+            len(self._stack) == 2
+            and self._stack[0][0] == "obj"
+            and self._stack[0][1] == self.watch_key
+            and self._stack[1][0] == "arr"
+        )
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Processa um novo pedaço de texto.
+
+        Returns:
+            List[str]: As strings do array observado que foram concluídas neste pedaço.
+        """
+        self.buffer.append(chunk)
+        completed: List[str] = []
+        for char in chunk:
+            if self._done:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    completed.extend(self._close_string())
+                    continue
+                self._string_chars.append(char)
+                continue
+
+            if char == '"' and self._stack:
+                self._in_string = True
+                self._string_chars = []
+            elif char == "{":
+                self._stack.append(["obj", None])
+                self._expecting_key = True
+            elif char == "[" and self._stack:
+                self._stack.append(["arr", None])
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if not self._stack:
+                    self._done = True
+            elif char == "," and self._stack and self._stack[-1][0] == "obj":
+                self._expecting_key = True
+        return completed
+
+    def _close_string(self) -> List[str]:
+        value = _decode_string("".join(self._string_chars))
+        top = self._stack[-1]
+        if top[0] == "obj" and self._expecting_key:
+            top[1] = value
+            self._expecting_key = False
+            return []
+        if self._in_watched_array() and value is not None:
+            return [value]
+        return []
+
+def _decode_string(raw: str) -> str | None:
+    """
+    Decodifica o conteúdo de uma string JSON (sem as aspas).
+
+    Caracteres de controle crus (ex.: quebra de linha) são aceitos; um escape
+    inválido descarta só esta string, sem interromper o streaming.
+    """
+    try:
+        return json.loads(f'"{raw}"', strict=False)
+    except ValueError:
+        return None
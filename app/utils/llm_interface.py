@@ -1,51 +1,225 @@
 import os
 import json
-import aiohttp
-from typing import Dict, Any
+from typing import Dict, Any, Callable
+
+from app.utils.http_client import http_client
+from app.utils.api_rotator import api_rotator, KEY_FAILURE_STATUSES
+from app.utils.json_stream import IncrementalJSONParser
+from app.utils.response_cache import ResponseCache, SingleFlight, make_key
+from app.utils import metrics
+from app.utils.logger import get_logger
+from app.utils.tracer import traced
+
+logger = get_logger("LLMInterface")
+
+# Cache persistente de respostas do LLM (TTL em segundos)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+# Endpoint compatível com a API do OpenRouter (ex.: um servidor local nos benchmarks)
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+# Streaming (SSE) da resposta para liberar itens do plano antes do fim da geração
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes")
+
+llm_cache = ResponseCache("llm", ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES, enabled=LLM_CACHE_ENABLED)
+# Compartilhado entre instâncias: cada AgentFounder cria seu próprio LLMInterface
+_inflight_requests = SingleFlight()
 
 class LLMInterface:
     """Interface para comunicação com o LLM via OpenRouter com fallback local."""
     def __init__(self):
-        self.api_key = os.getenv("OPENROUTER_API_KEY")
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = OPENROUTER_BASE_URL
         self.model = "qwen/qwen-2.5-72b-instruct"
-        print("LLMInterface inicializada.")
+        logger.info("LLMInterface inicializada.")
 
+    @traced("llm")
     async def generate_json(self, prompt: str) -> Dict[str, Any] | None:
-        """Gera uma resposta em JSON a partir de um prompt com fallback local."""
-        
+        """
+        Gera uma resposta em JSON a partir de um prompt com fallback local.
+
+        Respostas da API ficam em cache por (modelo, hash do prompt, response_format),
+        e requisições idênticas simultâneas compartilham uma única chamada ao OpenRouter.
+        """
         # Tenta usar a API do OpenRouter primeiro
-        if self.api_key:
-            try:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                data = {
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "response_format": {"type": "json_object"}
-                }
+        if api_rotator.has_keys("openrouter"):
+            response_format = {"type": "json_object"}
+            key = make_key(self.model, prompt, response_format)
 
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(f"{self.base_url}/chat/completions", headers=headers, json=data) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            json_content = result["choices"][0]["message"]["content"]
-                            return json.loads(json_content)
-                        else:
-                            error_text = await response.text()
-                            print(f"[LLMInterface] Erro na API OpenRouter: {response.status} - {error_text}")
-                            print("[LLMInterface] Usando fallback local...")
-            except Exception as e:
-                print(f"[LLMInterface] Erro na requisição OpenRouter: {e}")
-                print("[LLMInterface] Usando fallback local...")
+            cached = await llm_cache.get(key)
+            if cached is not None:
+                logger.debug("Resposta obtida do cache.")
+                return cached
+
+            if _inflight_requests.in_flight(key):
+                llm_cache.counters["coalesced"] += 1
+                logger.debug("Requisição idêntica em andamento. Aguardando o mesmo resultado...")
+            result = await _inflight_requests.do(key, lambda: self._request_json(prompt, response_format, key))
+            if result is not None:
+                return result
+            logger.warning("Usando fallback local...")
         else:
-            print("[LLMInterface] OPENROUTER_API_KEY não configurada. Usando fallback local...")
+            logger.warning("OPENROUTER_API_KEY não configurada. Usando fallback local...")
 
         # Fallback: Gera um plano de missão baseado no tópico extraído do prompt
         return self._generate_fallback_plan(prompt)
 
+    async def _request_json(self, prompt: str, response_format: Dict[str, Any], cache_key: str) -> Dict[str, Any] | None:
+        """
+        Faz a chamada ao OpenRouter e grava a resposta válida no cache.
+
+        A chave vem do pool do `api_rotator`; se ela for recusada ou limitada
+        (401/402/403/429), a chamada é repetida com outra chave do pool.
+        """
+        data = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "response_format": response_format
+        }
+        with metrics.timed(metrics.LLM_SECONDS, mode="json", outcome="error") as labels:
+            try:
+                session = await http_client.get_session()
+                for _ in range(api_rotator.size("openrouter")):
+                    async with api_rotator.use("openrouter") as lease:
+                        if lease is None:
+                            logger.warning("Todas as chaves do OpenRouter estão em pausa.")
+                            return None
+                        headers = {
+                            "Authorization": f"Bearer {lease.key}",
+                            "Content-Type": "application/json"
+                        }
+                        async with session.post(f"{self.base_url}/chat/completions", headers=headers, json=data) as response:
+                            lease.report(response.status, response.headers)
+                            if response.status == 200:
+                                result = await response.json()
+                                json_content = result["choices"][0]["message"]["content"]
+                                parsed = json.loads(json_content)
+                                await llm_cache.set(cache_key, parsed)
+                                labels["outcome"] = "ok"
+                                return parsed
+                            error_text = await response.text()
+                            logger.error(f"Erro na API OpenRouter: {response.status} - {error_text}")
+                            if response.status not in KEY_FAILURE_STATUSES:
+                                return None
+            except Exception as e:
+                logger.error(f"Erro na requisição OpenRouter: {e}")
+        return None
+
+    @traced("llm", "stream_key")
+    async def stream_json(self, prompt: str, stream_key: str, on_item: Callable[[str], None]) -> Dict[str, Any] | None:
+        """
+        Gera uma resposta em JSON via streaming, liberando os itens de `stream_key` assim que completos.
+
+        Cada string do array `stream_key` é entregue a `on_item` enquanto o LLM
+        ainda gera o restante do documento. O JSON completo é retornado no fim
+        (a validação do schema fica com o chamador). Em caso de cache, requisição
+        idêntica em andamento ou fallback local, os itens são entregues a partir
+        do resultado final.
+
+        Se o streaming falhar depois de entregar itens, o plano local é usado
+        com os itens já entregues no lugar dos seus, para que a missão não
+        dispare buscas de dois planos diferentes.
+        """
+        emitted: Dict[str, None] = {}
+
+        def emit(item: str):
+            if isinstance(item, str) and item not in emitted:
+                emitted[item] = None
+                on_item(item)
+
+        def emit_all(result: Dict[str, Any] | None):
+            for item in (result or {}).get(stream_key, []) or []:
+                emit(item)
+
+        if not LLM_STREAMING or not api_rotator.has_keys("openrouter"):
+            result = await self.generate_json(prompt)
+            emit_all(result)
+            return result
+
+        response_format = {"type": "json_object"}
+        key = make_key(self.model, prompt, response_format)
+
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            logger.debug("Resposta obtida do cache.")
+            emit_all(cached)
+            return cached
+
+        is_leader = not _inflight_requests.in_flight(key)
+        if not is_leader:
+            llm_cache.counters["coalesced"] += 1
+            logger.debug("Requisição idêntica em andamento. Aguardando o mesmo resultado...")
+        result = await _inflight_requests.do(
+            key, lambda: self._stream_request(prompt, response_format, key, stream_key, emit)
+        )
+        if result is None:
+            logger.warning("Usando fallback local...")
+            result = self._generate_fallback_plan(prompt)
+            if emitted:
+                result[stream_key] = list(emitted)
+        emit_all(result)
+        return result
+
+    async def _stream_request(self, prompt: str, response_format: Dict[str, Any], cache_key: str,
+                              stream_key: str, on_item: Callable[[str], None]) -> Dict[str, Any] | None:
+        """Consome o SSE do OpenRouter alimentando o parser incremental."""
+        parser = IncrementalJSONParser(stream_key)
+        data = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "response_format": response_format,
+            "stream": True
+        }
+        with metrics.timed(metrics.LLM_SECONDS, mode="stream", outcome="error") as labels:
+            try:
+                session = await http_client.get_session()
+                response = None
+                # Troca de chave só antes do primeiro byte: depois disso os itens já foram entregues
+                for _ in range(api_rotator.size("openrouter")):
+                    async with api_rotator.use("openrouter") as lease:
+                        if lease is None:
+                            logger.warning("Todas as chaves do OpenRouter estão em pausa.")
+                            return None
+                        headers = {
+                            "Authorization": f"Bearer {lease.key}",
+                            "Content-Type": "application/json",
+                            "Accept": "text/event-stream"
+                        }
+                        response = await session.post(f"{self.base_url}/chat/completions", headers=headers, json=data)
+                        lease.report(response.status, response.headers)
+                    if response.status == 200:
+                        break
+                    error_text = await response.text()
+                    response.release()
+                    logger.error(f"Erro na API OpenRouter (streaming): {response.status} - {error_text}")
+                    if response.status not in KEY_FAILURE_STATUSES:
+                        return None
+                if response is None or response.status != 200:
+                    return None
+
+                async with response:
+                    async for raw_line in response.content:
+                        line = raw_line.decode("utf-8", errors="replace").strip()
+                        # Linhas vazias separam eventos; ':' inicia comentários (keep-alive)
+                        if not line.startswith("data:"):
+                            continue
+                        payload = line[5:].strip()
+                        if payload == "[DONE]":
+                            break
+                        event = json.loads(payload)
+                        choices = event.get("choices") or [{}]
+                        delta = (choices[0].get("delta") or {}).get("content")
+                        if delta:
+                            for item in parser.feed(delta):
+                                on_item(item)
+
+                parsed = json.loads(_strip_to_json_object(parser.text()), strict=False)
+                await llm_cache.set(cache_key, parsed)
+                labels["outcome"] = "ok"
+                return parsed
+            except Exception as e:
+                logger.error(f"Erro no streaming do OpenRouter: {e}")
+        return None
+
     def _generate_fallback_plan(self, prompt: str) -> Dict[str, Any]:
         """Gera um plano de missão local baseado no tópico."""
         # Extrai o tópico do prompt
@@ -61,7 +235,7 @@ class LLMInterface:
             if end > start:
                 topic = prompt[start:end]
 
-        print(f"[LLMInterface] Gerando plano local para tópico: '{topic}'")
+        logger.info(f"Gerando plano local para tópico: '{topic}'")
 
         # Template de plano baseado no tópico
         plan = {
@@ -125,4 +299,9 @@ class LLMInterface:
             ]
         }
 
-        return plan
\ No newline at end of file
+        return plan
+
+def _strip_to_json_object(text: str) -> str:
+    """Remove texto em volta do objeto JSON (ex.: cercas de código markdown)."""
+    start, end = text.find("{"), text.rfind("}")
+    return text[start:end + 1] if start != -1 and end > start else text
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator
+
+from app.utils import metrics
+
+# Logging estruturado (variáveis de ambiente)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" ou "json" (uma linha por registro)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Missão em execução na tarefa atual: as tarefas criadas dentro dela herdam o valor
+current_session: contextvars.ContextVar[str | None] = contextvars.ContextVar("current_session", default=None)
+
+class _StdoutHandler(logging.StreamHandler):
+    """Escreve no `sys.stdout` do momento (respeita `contextlib.redirect_stdout`)."""
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = datetime.fromtimestamp(record.created).strftime("%H:%M:%S.%f")[:-3]
+        session = f"[{record.session_id}]" if getattr(record, "session_id", None) else ""
+        fields = " ".join(f"{k}={v}" for k, v in (getattr(record, "fields", None) or {}).items())
+        line = f"{timestamp} {record.levelname:<7} [{getattr(record, 'component', record.name)}]{session} {record.getMessage()}"
+        return f"{line} {fields}" if fields else line
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "component": getattr(record, "component", record.name),
+            "session_id": getattr(record, "session_id", None),
+            "message": record.getMessage(),
+            **(getattr(record, "fields", None) or {}),
+        }
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _DropOldestQueueHandler(QueueHandler):
+    """Nunca bloqueia quem loga: com a fila cheia, descarta o registro mais antigo."""
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    _DropOldestQueueHandler.dropped += 1
+                except queue.Empty:
+                    pass
+
+_root = logging.getLogger("arqv30")
+_root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+_root.propagate = False
+_lock = threading.Lock()
+_queue: "queue.Queue[logging.LogRecord] | None" = None
+_listener: QueueListener | None = None
+_pid: int | None = None
+
+def _ensure_started():
+    """Liga o logger à fila e inicia a thread de escrita (de novo em processos filhos)."""
+    global _queue, _listener, _pid
+    if _pid == os.getpid():
+        return
+    with _lock:
+        if _pid == os.getpid():
+            return
+        output = _StdoutHandler()
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+        _queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        for handler in list(_root.handlers):
+            _root.removeHandler(handler)
+        _root.addHandler(_DropOldestQueueHandler(_queue))
+        _listener = QueueListener(_queue, output, respect_handler_level=False)
+        _listener.start()
+        _pid = os.getpid()
+
+def set_level(level: str):
+    """Muda o nível mínimo em tempo de execução (ex.: "DEBUG" para investigar uma missão)."""
+    _root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+def shutdown():
+    """Escreve os registros pendentes e encerra a thread de escrita."""
+    global _pid
+    with _lock:
+        if _listener is not None and _pid == os.getpid():
+            _listener.stop()
+            _pid = None
+
+atexit.register(shutdown)
+
+@contextmanager
+def session_context(session_id: str) -> Iterator[None]:
+    """Associa os registros do bloco (e das tarefas criadas nele) à missão."""
+    token = current_session.set(session_id)
+    try:
+        yield
+    finally:
+        current_session.reset(token)
+
+class Logger:
+    """
+    Logger de um componente (ex.: 'ExtractionTool').
+
+    Chamar um método só monta o registro e o coloca numa fila; a formatação e
+    a escrita no stdout ficam numa thread separada, então o event loop nunca
+    espera pelo terminal. O `session_id` vem do argumento ou da missão em
+    execução (`session_context`); campos extras viram pares chave=valor (ou
+    chaves do JSON). Registros de erro alimentam `arqv30_errors_total`.
+    """
+    def __init__(self, component: str):
+        self.component = component
+
+    def _log(self, level: int, message: str, session_id: str | None, fields: Dict[str, Any]):
+        if level >= logging.ERROR:
+            metrics.ERRORS.labels(self.component).inc()
+        if not _root.isEnabledFor(level):
+            return
+        _ensure_started()
+        extra = {"component": self.component, "session_id": session_id or current_session.get(), "fields": fields}
+        _root.log(level, message, extra=extra)
+
+    def debug(self, message: str, session_id: str | None = None, **fields: Any):
+        self._log(logging.DEBUG, message, session_id, fields)
+
+    def info(self, message: str, session_id: str | None = None, **fields: Any):
+        self._log(logging.INFO, message, session_id, fields)
+
+    def warning(self, message: str, session_id: str | None = None, **fields: Any):
+        self._log(logging.WARNING, message, session_id, fields)
+
+    def error(self, message: str, session_id: str | None = None, **fields: Any):
+        self._log(logging.ERROR, message, session_id, fields)
+
+_loggers: Dict[str, Logger] = {}
+
+def get_logger(component: str) -> Logger:
+    logger = _loggers.get(component)
+    if logger is None:
+        logger = _loggers[component] = Logger(component)
+    return logger
+
+def stats() -> Dict[str, Any]:
+    return {"queued": _queue.qsize() if _queue is not None else 0, "dropped": _DropOldestQueueHandler.dropped}
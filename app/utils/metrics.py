@@ -0,0 +1,108 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+try:
+    # opcional: sem o prometheus_client as métricas viram no-ops e o /metrics responde 503
+    from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client.core import CounterMetricFamily
+except ImportError:
+    REGISTRY = CONTENT_TYPE_LATEST = generate_latest = CounterMetricFamily = None
+    Counter = Gauge = Histogram = None
+
+# Hosts distintos acompanhados por rótulo; os demais são agregados em "other"
+METRICS_MAX_HOSTS = int(os.getenv("METRICS_MAX_HOSTS", "500"))
+
+ENABLED = REGISTRY is not None
+
+class _NoopMetric:
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        return lambda *args, **kwargs: None
+
+def _metric(kind: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    return kind(*args, **kwargs) if ENABLED else _NoopMetric()
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+
+FETCH_SECONDS = _metric(Histogram, "arqv30_fetch_seconds",
+                        "Duração de cada tentativa de download de página.", ["outcome"], buckets=_LATENCY_BUCKETS)
+PARSE_SECONDS = _metric(Histogram, "arqv30_parse_seconds",
+                        "Duração do parsing de uma página (incluindo a espera pelo parser_pool).",
+                        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+LLM_SECONDS = _metric(Histogram, "arqv30_llm_seconds",
+                      "Duração das chamadas ao LLM.", ["mode", "outcome"],
+                      buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80))
+SCREENSHOT_SECONDS = _metric(Histogram, "arqv30_screenshot_seconds",
+                             "Duração da captura e armazenamento de um screenshot.", ["outcome"],
+                             buckets=(0.5, 1, 2.5, 5, 10, 20, 40, 60))
+FETCH_ERRORS = _metric(Counter, "arqv30_fetch_errors_total",
+                       "Falhas de download por host e motivo.", ["host", "reason"])
+BODY_LIMITS = _metric(Counter, "arqv30_fetch_body_limits_total",
+                      "Corpos de página truncados pelo limite de bytes ou descartados por não serem HTML.", ["reason"])
+EXTRACTION_TIERS = _metric(Counter, "arqv30_extraction_tier_total",
+                           "Páginas analisadas por camada vencedora da cadeia de extração (none = nenhuma).", ["tier"])
+ERRORS = _metric(Counter, "arqv30_errors_total",
+                 "Registros de erro por componente.", ["component"])
+
+_hosts: set = set()
+
+def host_label(host: str) -> str:
+    """Rótulo de host com cardinalidade limitada."""
+    if host in _hosts:
+        return host
+    if len(_hosts) < METRICS_MAX_HOSTS:
+        _hosts.add(host)
+        return host
+    return "other"
+
+@contextmanager
+def timed(histogram: Any, **labels: str) -> Iterator[Dict[str, str]]:
+    """
+    Observa a duração do bloco no histograma.
+
+    O bloco pode ajustar os rótulos pelo dicionário entregue; uma exceção
+    marca outcome="error" (se o histograma tiver esse rótulo).
+    """
+    labels = dict(labels)
+    started = time.perf_counter()
+    try:
+        yield labels
+    except BaseException:
+        if "outcome" in labels:
+            labels["outcome"] = "error"
+        raise
+    finally:
+        target = histogram.labels(**labels) if labels else histogram
+        target.observe(time.perf_counter() - started)
+
+def register_gauge(name: str, documentation: str, fn: Callable[[], float]):
+    """Gauge calculado na hora da coleta (ex.: tamanho de uma fila)."""
+    if ENABLED:
+        Gauge(name, documentation).set_function(fn)
+
+_cache_sources: Dict[str, Dict[str, int]] = {}
+
+def register_cache(name: str, counters: Dict[str, int]):
+    """Expõe o dicionário de contadores de um cache como `arqv30_cache_events_total{cache, event}`."""
+    _cache_sources[name] = counters
+
+class _CacheCollector:
+    """Lê os contadores que os caches já mantêm, sem custo no caminho quente."""
+    def collect(self):
+        family = CounterMetricFamily("arqv30_cache_events", "Eventos dos caches (acertos, faltas, gravações...).",
+                                     labels=["cache", "event"])
+        for name, counters in list(_cache_sources.items()):
+            for event, value in list(counters.items()):
+                family.add_metric([name, event], value)
+        yield family
+
+if ENABLED:
+    REGISTRY.register(_CacheCollector())
+
+def render() -> Tuple[bytes, str]:
+    """Exposição no formato texto do Prometheus e o content type correspondente."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
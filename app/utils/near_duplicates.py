@@ -0,0 +1,148 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger("NearDuplicates")
+
+# Detecção de quase-duplicatas (variáveis de ambiente)
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() in ("1", "true", "yes")
+# Distância de Hamming máxima (em 64 bits) para considerar dois textos quase iguais.
+# Textos sem relação ficam em torno de 32; cópias com cabeçalho/rodapé alterados, até ~8.
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "7"))
+# "mission": compara apenas dentro da missão; "global": também com sessões anteriores
+NEAR_DUP_SCOPE = os.getenv("NEAR_DUP_SCOPE", "mission").lower()
+NEAR_DUP_INDEX_PATH = os.getenv("NEAR_DUP_INDEX_PATH", os.path.join("cache", "near_duplicates.sqlite3"))
+
+SHINGLE_SIZE = 5
+# Textos com menos palavras que isso não têm assinatura confiável e nunca são descartados
+MIN_WORDS = 30
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE) -> int | None:
+    """
+    Assinatura SimHash de 64 bits do texto, a partir de shingles de palavras.
+
+    Função pura de nível de módulo: roda no `parser_pool`. Retorna None para
+    textos curtos demais.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    features = Counter(
+        " ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)
+    )
+    hashes = [
+        (int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big"), weight)
+        for feature, weight in features.items()
+    ]
+    fingerprint = 0
+    for bit in range(64):
+        mask = 1 << bit
+        if sum(weight if h & mask else -weight for h, weight in hashes) > 0:
+            fingerprint |= mask
+    return fingerprint
+
+def _bands(fingerprint: int, bands: int) -> List[Tuple[int, int]]:
+    width = 64 // bands
+    mask = (1 << width) - 1
+    return [(band, (fingerprint >> (band * width)) & mask) for band in range(bands)]
+
+class NearDuplicateIndex:
+    """
+    Índice em memória de assinaturas SimHash com consulta sub-linear.
+
+    A assinatura é dividida em `max_distance + 1` faixas: se duas assinaturas
+    diferem em até `max_distance` bits, ao menos uma faixa é idêntica
+    (princípio da casa dos pombos). Cada consulta verifica apenas os
+    candidatos que compartilham alguma faixa.
+    """
+    def __init__(self, max_distance: int = NEAR_DUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self._buckets: Dict[Tuple[int, int], List[Tuple[int, Any]]] = {}
+
+    def find(self, fingerprint: int) -> Any:
+        """Retorna o valor associado a uma assinatura próxima, ou None."""
+        for band in _bands(fingerprint, self.bands):
+            for candidate, value in self._buckets.get(band, ()):
+                if (candidate ^ fingerprint).bit_count() <= self.max_distance:
+                    return value
+        return None
+
+    def add(self, fingerprint: int, value: Any):
+        for band in _bands(fingerprint, self.bands):
+            self._buckets.setdefault(band, []).append((fingerprint, value))
+
+class PersistentNearDuplicateIndex:
+    """
+    Índice de assinaturas compartilhado entre sessões (SQLite), no mesmo
+    esquema de faixas do índice em memória.
+    """
+    def __init__(self, path: str = NEAR_DUP_INDEX_PATH, max_distance: int = NEAR_DUP_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                "band INTEGER, band_value INTEGER, fingerprint TEXT, url TEXT, session_id TEXT, created_at REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_fingerprints_band ON fingerprints(band, band_value)")
+            self._db = db
+        return self._db
+
+    def _find(self, fingerprint: int, session_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            db = self._connect()
+            for band, value in _bands(fingerprint, self.bands):
+                rows = db.execute(
+                    "SELECT fingerprint, url, session_id FROM fingerprints "
+                    "WHERE band = ? AND band_value = ? AND session_id != ?",
+                    (band, value, session_id)
+                ).fetchall()
+                for candidate, url, other_session in rows:
+                    # Guardado como texto: o SQLite só tem inteiros de 64 bits com sinal
+                    if (int(candidate, 16) ^ fingerprint).bit_count() <= self.max_distance:
+                        return {"url": url, "session_id": other_session}
+        return None
+
+    def _add(self, fingerprint: int, url: str, session_id: str):
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.executemany(
+                "INSERT INTO fingerprints (band, band_value, fingerprint, url, session_id, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(band, value, f"{fingerprint:016x}", url, session_id, now) for band, value in _bands(fingerprint, self.bands)]
+            )
+            db.commit()
+
+    async def find(self, fingerprint: int, session_id: str) -> Dict[str, Any] | None:
+        """Documento de outra sessão com assinatura próxima, ou None."""
+        try:
+            return await asyncio.to_thread(self._find, fingerprint, session_id)
+        except Exception as e:
+            logger.error(f"Erro ao consultar o índice global: {e}")
+            return None
+
+    async def add(self, fingerprint: int, url: str, session_id: str):
+        try:
+            await asyncio.to_thread(self._add, fingerprint, url, session_id)
+        except Exception as e:
+            logger.error(f"Erro ao gravar no índice global: {e}")
+
+global_index = PersistentNearDuplicateIndex() if NEAR_DUP_SCOPE == "global" else None
@@ -0,0 +1,229 @@
+import os
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from typing import Dict, Any, Optional
+
+from app.utils.url_normalizer import url_key
+from app.utils.logger import get_logger
+
+logger = get_logger("PageCache")
+
+# Configuração do cache de páginas (variáveis de ambiente)
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join("cache", "pages"))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", str(6 * 3600)))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+def content_hash(html: str) -> str:
+    """Hash do conteúdo de uma página, usado como endereço do blob no disco."""
+    return hashlib.sha256(html.encode("utf-8", errors="replace")).hexdigest()
+
+class CachedPage:
+    """Entrada do cache para uma URL."""
+    def __init__(self, url: str, content_hash: str, etag: str | None, last_modified: str | None,
+                 fetched_at: float, result: Optional[Dict[str, Any]], ttl: int):
+        self.url = url
+        self.content_hash = content_hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.result = result
+        self.is_fresh = (time.time() - fetched_at) < ttl
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Cabeçalhos para revalidar a entrada com o servidor de origem."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class PageCache:
+    """
+    Cache em disco, compartilhado entre sessões, de páginas baixadas e texto extraído.
+
+    O índice (SQLite) mapeia a URL normalizada para o hash do conteúdo; o HTML
+    (gzip) e o resultado da extração ficam em blobs endereçados por esse hash,
+    de modo que URLs diferentes com o mesmo conteúdo compartilham o blob e o
+    parsing. Entradas vencidas (TTL) são revalidadas com ETag/If-Modified-Since
+    e os blobs menos usados são removidos quando o orçamento de espaço estoura.
+    """
+    def __init__(self, base_dir: str = PAGE_CACHE_DIR, ttl: int = PAGE_CACHE_TTL, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.base_dir = base_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._total_bytes = 0
+        self.counters = {
+            "hits": 0,
+            "revalidated": 0,
+            "content_hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.join(self.base_dir, "blobs"), exist_ok=True)
+            db = sqlite3.connect(os.path.join(self.base_dir, "index.sqlite3"), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url_key TEXT PRIMARY KEY, url TEXT, content_hash TEXT, etag TEXT, "
+                "last_modified TEXT, fetched_at REAL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "content_hash TEXT PRIMARY KEY, size INTEGER, accessed_at REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_blobs_accessed ON blobs(accessed_at)")
+            db.execute("CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages(content_hash)")
+            self._total_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            self._db = db
+        return self._db
+
+    def _blob_path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self.base_dir, "blobs", digest[:2], f"{digest}{suffix}")
+
+    def _read_result(self, digest: str) -> tuple[bool, Optional[Dict[str, Any]]]:
+        try:
+            with open(self._blob_path(digest, ".json"), "r", encoding="utf-8") as f:
+                return True, json.load(f).get("result")
+        except (OSError, ValueError):
+            return False, None
+
+    def _lookup(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT url, content_hash, etag, last_modified, fetched_at FROM pages WHERE url_key = ?",
+                (url_key(url),)
+            ).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            found, result = self._read_result(row[1])
+            if not found:
+                # Blob removido por fora do índice: trata como ausência
+                db.execute("DELETE FROM pages WHERE url_key = ?", (url_key(url),))
+                db.commit()
+                self.counters["misses"] += 1
+                return None
+            db.execute("UPDATE blobs SET accessed_at = ? WHERE content_hash = ?", (time.time(), row[1]))
+            db.commit()
+        page = CachedPage(row[0], row[1], row[2], row[3], row[4], result, self.ttl)
+        with self._lock:
+            self.counters["hits" if page.is_fresh else "stale"] += 1
+        return page
+
+    def _mark_revalidated(self, url: str):
+        with self._lock:
+            db = self._connect()
+            db.execute("UPDATE pages SET fetched_at = ? WHERE url_key = ?", (time.time(), url_key(url)))
+            db.commit()
+            self.counters["revalidated"] += 1
+
+    def _lookup_content(self, digest: str) -> tuple[bool, Optional[Dict[str, Any]]]:
+        with self._lock:
+            db = self._connect()
+            if db.execute("SELECT 1 FROM blobs WHERE content_hash = ?", (digest,)).fetchone() is None:
+                return False, None
+            found, result = self._read_result(digest)
+            if found:
+                self.counters["content_hits"] += 1
+            return found, result
+
+    def _store(self, url: str, html: str, digest: str, result: Optional[Dict[str, Any]],
+               etag: str | None, last_modified: str | None):
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            if db.execute("SELECT 1 FROM blobs WHERE content_hash = ?", (digest,)).fetchone() is None:
+                html_path = self._blob_path(digest, ".html.gz")
+                os.makedirs(os.path.dirname(html_path), exist_ok=True)
+                with gzip.open(html_path, "wt", encoding="utf-8", compresslevel=5) as f:
+                    f.write(html)
+                with open(self._blob_path(digest, ".json"), "w", encoding="utf-8") as f:
+                    json.dump({"result": result}, f, ensure_ascii=False)
+                size = os.path.getsize(html_path) + os.path.getsize(self._blob_path(digest, ".json"))
+                db.execute("INSERT INTO blobs (content_hash, size, accessed_at) VALUES (?, ?, ?)", (digest, size, now))
+                self._total_bytes += size
+            else:
+                db.execute("UPDATE blobs SET accessed_at = ? WHERE content_hash = ?", (now, digest))
+            db.execute(
+                "INSERT OR REPLACE INTO pages (url_key, url, content_hash, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url_key(url), url, digest, etag, last_modified, now)
+            )
+            db.commit()
+            self.counters["stores"] += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection):
+        """Remove os blobs menos acessados até ficar em 90% do orçamento."""
+        target = int(self.max_bytes * 0.9)
+        rows = db.execute("SELECT content_hash, size FROM blobs ORDER BY accessed_at ASC").fetchall()
+        for digest, size in rows:
+            if self._total_bytes <= target:
+                break
+            for suffix in (".html.gz", ".json"):
+                try:
+                    os.remove(self._blob_path(digest, suffix))
+                except OSError:
+                    pass
+            db.execute("DELETE FROM blobs WHERE content_hash = ?", (digest,))
+            db.execute("DELETE FROM pages WHERE content_hash = ?", (digest,))
+            self._total_bytes -= size
+            self.counters["evictions"] += 1
+        db.commit()
+
+    async def lookup(self, url: str) -> Optional[CachedPage]:
+        """Busca a entrada da URL. `CachedPage.is_fresh` indica se ainda está no TTL."""
+        if not PAGE_CACHE_ENABLED:
+            return None
+        return await asyncio.to_thread(self._lookup, url)
+
+    async def mark_revalidated(self, url: str):
+        """Registra que a origem respondeu 304 e renova o TTL da entrada."""
+        if PAGE_CACHE_ENABLED:
+            await asyncio.to_thread(self._mark_revalidated, url)
+
+    async def lookup_content(self, digest: str) -> tuple[bool, Optional[Dict[str, Any]]]:
+        """Retorna (encontrado, resultado) da extração já feita para um conteúdo idêntico."""
+        if not PAGE_CACHE_ENABLED:
+            return False, None
+        return await asyncio.to_thread(self._lookup_content, digest)
+
+    async def store(self, url: str, html: str, digest: str, result: Optional[Dict[str, Any]],
+                    etag: str | None = None, last_modified: str | None = None):
+        """Grava a página e o resultado da extração, aplicando o orçamento de espaço."""
+        if not PAGE_CACHE_ENABLED:
+            return
+        try:
+            await asyncio.to_thread(self._store, url, html, digest, result, etag, last_modified)
+        except Exception as e:
+            logger.error(f"Erro ao gravar {url} no cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de acerto/erro e ocupação do cache."""
+        lookups = self.counters["hits"] + self.counters["stale"] + self.counters["misses"]
+        served = self.counters["hits"] + self.counters["revalidated"] + self.counters["content_hits"]
+        return {
+            "enabled": PAGE_CACHE_ENABLED,
+            **self.counters,
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+page_cache = PageCache()
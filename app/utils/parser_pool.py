@@ -0,0 +1,97 @@
+import os
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Iterable, List, Sequence
+
+from app.utils.logger import get_logger
+
+logger = get_logger("ParserPool")
+
+# Número de processos de parsing. 0 executa o parsing no próprio loop (modo legado).
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Quantas páginas são enviadas por tarefa ao pool no processamento em lote.
+PARSER_BATCH_SIZE = int(os.getenv("PARSER_BATCH_SIZE", "4"))
+
+def _run_batch(fn: Callable[..., Any], batch: Sequence[tuple]) -> List[Any]:
+    """Executa `fn` para cada conjunto de argumentos do lote (roda no processo filho)."""
+    return [fn(*args) for args in batch]
+
+class ParserPool:
+    """
+    Estágio de parsing CPU-bound executado fora do event loop.
+
+    Encaminha funções de parsing (lxml, trafilatura) para um
+    `ProcessPoolExecutor`, evitando que o GIL trave as demais missões, os
+    downloads em andamento e os polls de status enquanto uma página é analisada.
+    """
+    def __init__(self, workers: int = PARSER_WORKERS, batch_size: int = PARSER_BATCH_SIZE):
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self._executor: Executor | None = None
+
+    def start(self):
+        """Cria o pool de processos, caso ainda não exista."""
+        if self.workers > 0 and self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            logger.info(f"Pool de parsing iniciado com {self.workers} processos.")
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Executa uma única chamada de parsing no pool."""
+        if self.workers <= 0:
+            return fn(*args)
+        self.start()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        except BrokenProcessPool:
+            # Um processo filho morreu (ex.: OOM); recria o pool para as próximas chamadas.
+            logger.warning("Pool de parsing corrompido. Recriando...")
+            self._executor = None
+            raise
+
+    async def map(self, fn: Callable[..., Any], items: Iterable[tuple], batch_size: int | None = None) -> AsyncIterator[Any]:
+        """
+        Envia os itens ao pool em lotes e devolve os resultados conforme ficam prontos.
+
+        Args:
+            fn (Callable): Função de parsing de nível de módulo (precisa ser picklable).
+            items (Iterable[tuple]): Argumentos de cada chamada.
+            batch_size (int | None): Itens por tarefa enviada ao pool.
+
+        Yields:
+            Any: O resultado de cada chamada, na ordem de conclusão.
+        """
+        size = batch_size or self.batch_size
+        items = list(items)
+        batches = [items[i:i + size] for i in range(0, len(items), size)]
+        if not batches:
+            return
+
+        if self.workers <= 0:
+            for batch in batches:
+                for result in _run_batch(fn, batch):
+                    yield result
+                # Devolve o controle ao loop entre lotes, como no modo com processos.
+                await asyncio.sleep(0)
+            return
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self._executor, _run_batch, fn, batch) for batch in batches]
+        try:
+            for next_done in asyncio.as_completed(futures):
+                for result in await next_done:
+                    yield result
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def close(self):
+        """Encerra os processos do pool sem bloquear o loop."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+            logger.info("Pool de parsing encerrado.")
+
+parser_pool = ParserPool()
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+from app.utils.logger import get_logger
+
+logger = get_logger("ResponseCache")
+
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join("cache", "responses.sqlite3"))
+
+def make_key(*parts: Any) -> str:
+    """Gera uma chave estável (sha256) a partir de partes serializáveis em JSON."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Cache persistente (SQLite) de respostas de serviços externos.
+
+    Cada instância usa um `namespace` próprio dentro do mesmo arquivo, com TTL
+    e limite de entradas; ao passar do limite, as entradas acessadas há mais
+    tempo são removidas.
+    """
+    def __init__(self, namespace: str, ttl: int, max_entries: int, enabled: bool = True, path: str = RESPONSE_CACHE_PATH):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0, "coalesced": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "namespace TEXT, key TEXT, value TEXT, created_at REAL, accessed_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(namespace, accessed_at)")
+            self._db = db
+        return self._db
+
+    def _get(self, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT value, created_at FROM responses WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            if now - row[1] > self.ttl:
+                db.execute("DELETE FROM responses WHERE namespace = ? AND key = ?", (self.namespace, key))
+                db.commit()
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            db.execute(
+                "UPDATE responses SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key)
+            )
+            db.commit()
+            self.counters["hits"] += 1
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False, default=str), now, now)
+            )
+            self.counters["stores"] += 1
+            count = db.execute("SELECT COUNT(*) FROM responses WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                db.execute(
+                    "DELETE FROM responses WHERE rowid IN ("
+                    "SELECT rowid FROM responses WHERE namespace = ? ORDER BY accessed_at ASC LIMIT ?)",
+                    (self.namespace, excess)
+                )
+                self.counters["evictions"] += excess
+            db.commit()
+
+    async def get(self, key: str) -> Any:
+        """Retorna o valor em cache ou None se ausente/expirado."""
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._get, key)
+        except Exception as e:
+            logger.error(f"Erro ao ler o cache: {e}", cache=self.namespace)
+            return None
+
+    async def set(self, key: str, value: Any):
+        """Grava o valor, aplicando o limite de entradas do namespace."""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._set, key, value)
+        except Exception as e:
+            logger.error(f"Erro ao gravar no cache: {e}", cache=self.namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso do cache."""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "enabled": self.enabled,
+            **self.counters,
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes idênticas em uma única execução.
+
+    Enquanto a primeira chamada para uma chave está em andamento, as demais
+    aguardam o mesmo resultado em vez de repetir a requisição ao serviço.
+    """
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # shield: o cancelamento de um chamador não derruba a chamada dos demais
+        return await asyncio.shield(task)
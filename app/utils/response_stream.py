@@ -0,0 +1,84 @@
+import json
+import zlib
+import base64
+from typing import Any, Dict, Iterable, Iterator
+
+try:
+    import brotli  # opcional: habilita Content-Encoding: br
+except ImportError:
+    brotli = None
+
+# Tamanho mínimo dos blocos enviados ao cliente (e ao compressor)
+CHUNK_SIZE = 64 * 1024
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Escolhe a compressão aceita pelo cliente: br (se disponível), gzip ou nenhuma."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.strip().replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def iter_json(document: Dict[str, Any]) -> Iterator[str]:
+    """
+    Serializa um objeto JSON em partes: as listas de primeiro nível saem item a
+    item, sem montar o documento inteiro em uma única string.
+    """
+    yield "{"
+    for index, (key, value) in enumerate(document.items()):
+        prefix = "," if index else ""
+        if isinstance(value, list):
+            yield f"{prefix}{json.dumps(key, ensure_ascii=False)}:["
+            for position, item in enumerate(value):
+                yield ("," if position else "") + json.dumps(item, ensure_ascii=False, default=str)
+            yield "]"
+        else:
+            yield f"{prefix}{json.dumps(key, ensure_ascii=False)}:{json.dumps(value, ensure_ascii=False, default=str)}"
+    yield "}"
+
+def encode_chunks(parts: Iterable[str], encoding: str | None = None) -> Iterator[bytes]:
+    """Agrupa as partes em blocos de ~CHUNK_SIZE e aplica a compressão escolhida."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        compress, finish = compressor.process, compressor.finish
+    elif encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+    else:
+        compress, finish = (lambda data: data), (lambda: b"")
+
+    buffer = []
+    size = 0
+    for part in parts:
+        data = part.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            out = compress(b"".join(buffer))
+            buffer, size = [], 0
+            if out:
+                yield out
+    out = compress(b"".join(buffer)) + finish()
+    if out:
+        yield out
+
+def encode_cursor(offsets: Dict[str, int]) -> str:
+    """Cursor opaco de paginação (offsets por chave)."""
+    raw = json.dumps(offsets, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, int]:
+    """Inverso de `encode_cursor`; levanta ValueError para cursores inválidos."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        offsets = json.loads(raw)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {e}")
+    if not isinstance(offsets, dict) or not all(isinstance(v, int) and v >= 0 for v in offsets.values()):
+        raise ValueError("Cursor inválido.")
+    return offsets
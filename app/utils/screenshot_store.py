@@ -0,0 +1,133 @@
+import io
+import os
+import re
+import hashlib
+import asyncio
+from typing import Any, Dict
+
+from app.utils.logger import get_logger
+
+logger = get_logger("ScreenshotStore")
+
+try:
+    from PIL import Image  # opcional: sem o Pillow os screenshots ficam em PNG, sem miniaturas
+except ImportError:
+    Image = None
+
+# Armazenamento de screenshots (variáveis de ambiente)
+SCREENSHOT_STORE_DIR = os.getenv("SCREENSHOT_STORE_DIR", os.path.join("media", "screenshots"))
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "webp").lower()
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "80"))
+SCREENSHOT_THUMB_WIDTH = int(os.getenv("SCREENSHOT_THUMB_WIDTH", "320"))
+
+FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "png": ("PNG", "png", "image/png"),
+}
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+class ScreenshotStore:
+    """
+    Armazenamento de screenshots endereçado por conteúdo.
+
+    Cada captura é identificada pelo sha256 do PNG original e gravada uma única
+    vez (em WebP/JPEG na qualidade configurada), junto com uma miniatura para a
+    interface; capturas idênticas, inclusive de sessões diferentes, reaproveitam
+    os mesmos arquivos. A codificação roda fora do event loop.
+    """
+    def __init__(self, root: str = SCREENSHOT_STORE_DIR, fmt: str = SCREENSHOT_FORMAT,
+                 quality: int = SCREENSHOT_QUALITY, thumb_width: int = SCREENSHOT_THUMB_WIDTH):
+        if fmt not in FORMATS:
+            logger.warning(f"Formato '{fmt}' desconhecido, usando png.")
+            fmt = "png"
+        if Image is None and fmt != "png":
+            logger.warning("Pillow não instalado: screenshots serão armazenados em PNG, sem miniaturas.")
+            fmt = "png"
+        self.root = root
+        self.format = fmt
+        self.quality = quality
+        self.thumb_width = thumb_width
+        self.counters = {"stored": 0, "deduplicated": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def _path(self, digest: str, suffix: str = "", fmt: str | None = None) -> str:
+        extension = FORMATS[fmt or self.format][1]
+        return os.path.join(self.root, digest[:2], f"{digest}{suffix}.{extension}")
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _encode(self, image, width: int | None = None) -> bytes:
+        pil_format = FORMATS[self.format][0]
+        if width and image.width > width:
+            image = image.copy()
+            image.thumbnail((width, width * image.height // image.width))
+        if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        out = io.BytesIO()
+        options = {} if pil_format == "PNG" else {"quality": self.quality}
+        image.save(out, pil_format, optimize=True, **options)
+        return out.getvalue()
+
+    def save(self, png: bytes) -> Dict[str, Any]:
+        """
+        Armazena um screenshot PNG.
+
+        Returns:
+            Dict[str, Any]: 'screenshot_id', 'filepath', 'thumbnail' (ou None), 'format' e 'deduplicated'.
+        """
+        digest = hashlib.sha256(png).hexdigest()
+        thumbnail = self._path(digest, "_thumb") if Image is not None else None
+        self.counters["bytes_in"] += len(png)
+
+        existing = self.locate(digest)
+        if existing is not None and (thumbnail is None or os.path.exists(thumbnail)):
+            self.counters["deduplicated"] += 1
+            extension = os.path.splitext(existing[0])[1][1:]
+            fmt = next(name for name, (_, ext, _) in FORMATS.items() if ext == extension)
+            return {"screenshot_id": digest, "filepath": existing[0], "thumbnail": thumbnail,
+                    "format": fmt, "deduplicated": True}
+
+        fmt, encoded = "png", png
+        if Image is not None:
+            with Image.open(io.BytesIO(png)) as image:
+                image.load()
+                if self.format != "png":
+                    candidate = self._encode(image)
+                    # Páginas quase só de texto às vezes ficam menores no PNG original
+                    if len(candidate) < len(png):
+                        fmt, encoded = self.format, candidate
+                self._write_atomic(thumbnail, self._encode(image, self.thumb_width))
+        filepath = self._path(digest, fmt=fmt)
+        self._write_atomic(filepath, encoded)
+        self.counters["stored"] += 1
+        self.counters["bytes_out"] += len(encoded)
+        return {"screenshot_id": digest, "filepath": filepath, "thumbnail": thumbnail,
+                "format": fmt, "deduplicated": False}
+
+    async def store(self, png: bytes) -> Dict[str, Any]:
+        """Versão assíncrona de `save` (codificação em uma thread)."""
+        return await asyncio.to_thread(self.save, png)
+
+    def locate(self, screenshot_id: str, thumbnail: bool = False) -> tuple[str, str] | None:
+        """Caminho e media type de um screenshot armazenado, ou None se não existir."""
+        if not _HASH_RE.match(screenshot_id):
+            return None
+        suffix = "_thumb" if thumbnail else ""
+        # Procura em todos os formatos: o formato configurado pode ter mudado desde a gravação
+        for _, extension, media_type in FORMATS.values():
+            path = os.path.join(self.root, screenshot_id[:2], f"{screenshot_id}{suffix}.{extension}")
+            if os.path.exists(path):
+                return path, media_type
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        saved = self.counters["bytes_in"] - self.counters["bytes_out"]
+        return {"format": self.format, "quality": self.quality, **self.counters, "bytes_saved": max(0, saved)}
+
+screenshot_store = ScreenshotStore()
@@ -0,0 +1,174 @@
+import os
+import math
+import struct
+import hashlib
+import asyncio
+from typing import Any, Dict
+
+from app.utils.url_normalizer import url_key
+from app.utils.logger import get_logger
+
+logger = get_logger("SeenUrls")
+
+# Registro persistente de URLs já processadas (variáveis de ambiente)
+SEEN_URLS_PATH = os.getenv("SEEN_URLS_PATH", os.path.join("cache", "seen_urls.bloom"))
+SEEN_URLS_CAPACITY = int(os.getenv("SEEN_URLS_CAPACITY", "1000000"))
+SEEN_URLS_ERROR_RATE = float(os.getenv("SEEN_URLS_ERROR_RATE", "0.01"))
+# Descarta dos resultados de busca as URLs já processadas em missões anteriores
+SEEN_URLS_SKIP = os.getenv("SEEN_URLS_SKIP", "false").lower() in ("1", "true", "yes")
+# Grava o filtro no disco a cada N URLs novas (e no encerramento)
+SEEN_URLS_SAVE_EVERY = int(os.getenv("SEEN_URLS_SAVE_EVERY", "500"))
+
+_MAGIC = b"ARQBLM1\0"
+_HEADER = struct.Struct(">8sQIQ")  # magic, bits, hashes, itens
+
+class BloomFilter:
+    """
+    Filtro de Bloom: pertinência aproximada em ~1,2 MB por milhão de itens (1% de erro).
+
+    `in` nunca dá falso negativo; falsos positivos ocorrem na taxa configurada
+    enquanto o número de itens não passar da capacidade.
+    """
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Hashing duplo (Kirsch-Mitzenmacher): k posições a partir de dois hashes de 64 bits
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str) -> bool:
+        """Adiciona o item; retorna False se ele (provavelmente) já estava no filtro."""
+        added = False
+        for position in self._positions(item):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(_MAGIC, self.num_bits, self.num_hashes, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, capacity: int, error_rate: float) -> "BloomFilter":
+        magic, num_bits, num_hashes, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Arquivo de filtro inválido.")
+        bloom = cls(capacity, error_rate)
+        bloom.num_bits, bloom.num_hashes, bloom.count = num_bits, num_hashes, count
+        bloom.bits = bytearray(data[_HEADER.size:])
+        if len(bloom.bits) != (num_bits + 7) // 8:
+            raise ValueError("Arquivo de filtro truncado.")
+        return bloom
+
+class SeenUrls:
+    """
+    Registro, entre missões, das URLs já processadas (pela chave de `url_key`).
+
+    Serve como verificação negativa rápida (uma URL fora do filtro nunca foi
+    processada) para, com `SEEN_URLS_SKIP`, descartar dos resultados de busca
+    as URLs já processadas antes. O cache de páginas não depende dele: o
+    filtro é gravado só periodicamente e pode ficar para trás após uma queda.
+    """
+    def __init__(self, path: str = SEEN_URLS_PATH, capacity: int = SEEN_URLS_CAPACITY,
+                 error_rate: float = SEEN_URLS_ERROR_RATE, save_every: int = SEEN_URLS_SAVE_EVERY):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.save_every = save_every
+        self._filter: BloomFilter | None = None
+        self._unsaved = 0
+        self._saving: asyncio.Task | None = None
+        self.counters = {"checks": 0, "seen": 0, "added": 0}
+
+    @property
+    def filter(self) -> BloomFilter:
+        if self._filter is None:
+            self._filter = self._load()
+        return self._filter
+
+    def _load(self) -> BloomFilter:
+        try:
+            with open(self.path, "rb") as f:
+                bloom = BloomFilter.from_bytes(f.read(), self.capacity, self.error_rate)
+            logger.info(f"{bloom.count} URLs já vistas carregadas de {self.path}.")
+            return bloom
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Filtro em {self.path} ilegível ({e}). Começando um novo.")
+        return BloomFilter(self.capacity, self.error_rate)
+
+    async def start(self):
+        """Carrega o filtro do disco fora do event loop."""
+        if self._filter is None:
+            self._filter = await asyncio.to_thread(self._load)
+
+    def seen(self, url: str) -> bool:
+        """True se a URL (provavelmente) já foi processada; False é garantido."""
+        self.counters["checks"] += 1
+        found = url_key(url) in self.filter
+        if found:
+            self.counters["seen"] += 1
+        return found
+
+    def mark(self, url: str):
+        """Registra a URL como processada e agenda a gravação periódica do filtro."""
+        if not self.filter.add(url_key(url)):
+            return
+        self.counters["added"] += 1
+        self._unsaved += 1
+        if self.filter.count == self.capacity + 1:
+            logger.warning(f"Capacidade de {self.capacity} URLs excedida: a taxa de falsos positivos vai subir.")
+        if self._unsaved >= self.save_every and self._saving is None:
+            self._saving = asyncio.create_task(self.save())
+
+    def _write(self, data: bytes):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        """Grava o filtro no disco (cópia feita no loop, escrita em uma thread)."""
+        try:
+            if self._filter is None or not self._unsaved:
+                return
+            data, self._unsaved = self._filter.to_bytes(), 0
+            await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            logger.error(f"Erro ao gravar o filtro: {e}")
+        finally:
+            self._saving = None
+
+    async def close(self):
+        """Aguarda uma gravação em andamento e grava o que faltar."""
+        if self._saving is not None:
+            await self._saving
+        await self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        bloom = self._filter
+        return {
+            "skip_seen": SEEN_URLS_SKIP,
+            "urls": bloom.count if bloom else None,
+            "capacity": self.capacity,
+            "size_bytes": len(bloom.bits) if bloom else None,
+            **self.counters,
+        }
+
+seen_urls = SeenUrls()
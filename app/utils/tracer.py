@@ -0,0 +1,249 @@
+import io
+import os
+import json
+import time
+import random
+import asyncio
+import cProfile
+import pstats
+import inspect
+import functools
+import threading
+import contextvars
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger("Tracer")
+
+# Rastreamento das missões (variáveis de ambiente)
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_MAX_EVENTS = int(os.getenv("TRACE_MAX_EVENTS", "50000"))  # por missão; o excedente é descartado
+TRACE_PROFILE_SAMPLE = float(os.getenv("TRACE_PROFILE_SAMPLE", "0"))  # fração das missões com cProfile por etapa
+TRACE_PROFILE_TOP = int(os.getenv("TRACE_PROFILE_TOP", "3"))  # etapas mais lentas com o perfil gravado
+TRACE_PROFILE_LINES = int(os.getenv("TRACE_PROFILE_LINES", "40"))
+
+TRACE_FILENAME = "trace.json"
+PROFILE_PREFIX = "profile_"
+
+# Trace da missão em execução na tarefa atual (herdado pelas tarefas criadas nela)
+current_trace: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("current_trace", default=None)
+
+class Trace:
+    """
+    Spans de uma missão no formato de eventos do Chrome (chrome://tracing, Perfetto).
+
+    Cada tarefa asyncio vira uma "thread" do trace, de modo que os spans de
+    uma mesma tarefa aninham corretamente e as tarefas concorrentes (buscas,
+    downloads, agentes em paralelo) aparecem lado a lado.
+    """
+    def __init__(self, session_id: str, profiled: bool = False):
+        self.session_id = session_id
+        self.profiled = profiled
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self.profiles: List[Tuple[float, str, cProfile.Profile]] = []
+        self._lanes: "weakref.WeakKeyDictionary[asyncio.Task, int]" = weakref.WeakKeyDictionary()
+        self._next_lane = 1
+
+    def _lane(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return 0
+        lane = self._lanes.get(task)
+        if lane is None:
+            lane = self._lanes[task] = self._next_lane
+            self._next_lane += 1
+            self.events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": lane,
+                                "args": {"name": task.get_name()}})
+        return lane
+
+    def add(self, name: str, category: str, started: float, finished: float, args: Dict[str, Any]):
+        if len(self.events) >= TRACE_MAX_EVENTS:
+            self.dropped += 1
+            return
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((started - self.origin) * 1e6, 1),
+            "dur": round((finished - started) * 1e6, 1),
+            "pid": 1,
+            "tid": self._lane(),
+            "args": args,
+        })
+
+    def keep_profile(self, duration: float, stage: str, profile: cProfile.Profile):
+        """Guarda o perfil se a etapa estiver entre as `TRACE_PROFILE_TOP` mais lentas."""
+        self.profiles.append((duration, stage, profile))
+        self.profiles.sort(key=lambda item: item[0], reverse=True)
+        del self.profiles[TRACE_PROFILE_TOP:]
+
+    def to_chrome(self, profiles: Dict[str, str] | None = None) -> Dict[str, Any]:
+        return {
+            "traceEvents": [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": self.session_id}}, *self.events],
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "session_id": self.session_id,
+                "started_at": self.started_at,
+                "dropped_events": self.dropped,
+                "profiles": profiles or {},
+            },
+        }
+
+@contextmanager
+def span(name: str, category: str = "app", **args: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Registra a duração do bloco no trace da missão atual.
+
+    O bloco pode acrescentar argumentos pelo dicionário entregue (ex.: o status
+    HTTP); uma exceção é anotada em `error`. Fora de uma missão rastreada não
+    há custo além da consulta ao ContextVar.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        yield args
+        return
+    started = time.perf_counter()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        trace.add(name, category, started, time.perf_counter(), args)
+
+def traced(category: str, *params: str, name: str | None = None) -> Callable:
+    """
+    Decorador de corrotinas: cada chamada vira um span com os parâmetros `params`.
+
+    Ex.: `@traced("tool", "url")` registra `extract_content_robust` com a URL.
+    """
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if current_trace.get() is None:
+                return await fn(*args, **kwargs)
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            with span(span_name, category, **{p: bound.get(p) for p in params}):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class Tracer:
+    """
+    Cria, ativa e grava os traces das missões em `sessions/<id>/trace.json`.
+
+    Com `TRACE_PROFILE_SAMPLE` > 0, uma fração das missões também roda cada
+    etapa sob cProfile; os perfis das `TRACE_PROFILE_TOP` etapas mais lentas
+    são gravados ao lado do trace (`profile_<etapa>.txt`). O cProfile mede a
+    thread inteira: um perfil inclui o que mais rodou no event loop no
+    período, e só uma etapa é perfilada por vez.
+    """
+    def __init__(self, base_dir: str = "sessions"):
+        self.base_dir = base_dir
+        self._active: Dict[str, Trace] = {}
+        self._profiling = threading.Lock()
+
+    def path(self, session_id: str) -> str:
+        return os.path.join(self.base_dir, session_id, TRACE_FILENAME)
+
+    def profile_path(self, session_id: str, stage: str) -> str:
+        return os.path.join(self.base_dir, session_id, f"{PROFILE_PREFIX}{stage}.txt")
+
+    def saved_profiles(self, session_id: str) -> Dict[str, str]:
+        """Etapas (e arquivos) com perfil gravado no trace da missão; {} sem trace salvo."""
+        try:
+            with open(self.path(session_id), "r", encoding="utf-8") as f:
+                profiles = json.load(f).get("otherData", {}).get("profiles")
+        except (OSError, ValueError):
+            return {}
+        return profiles if isinstance(profiles, dict) else {}
+
+    def begin(self, session_id: str) -> Trace | None:
+        """Novo trace para a missão (None com o rastreamento desligado)."""
+        if not TRACE_ENABLED:
+            return None
+        trace = Trace(session_id, profiled=random.random() < TRACE_PROFILE_SAMPLE)
+        self._active[session_id] = trace
+        return trace
+
+    @contextmanager
+    def activate(self, trace: Trace | None) -> Iterator[None]:
+        """Associa ao trace os spans do bloco (e das tarefas criadas nele)."""
+        token = current_trace.set(trace)
+        try:
+            yield
+        finally:
+            current_trace.reset(token)
+
+    def snapshot(self, session_id: str) -> Dict[str, Any] | None:
+        """Trace parcial de uma missão ainda em execução."""
+        trace = self._active.get(session_id)
+        return trace.to_chrome() if trace is not None else None
+
+    @contextmanager
+    def profile(self, stage: str) -> Iterator[None]:
+        """Perfila a etapa com cProfile se a missão foi sorteada e nenhum outro perfil estiver ativo."""
+        trace = current_trace.get()
+        if trace is None or not trace.profiled or not self._profiling.acquire(blocking=False):
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Outro profiler já ativo na thread (ex.: depurador)
+            self._profiling.release()
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._profiling.release()
+        trace.keep_profile(time.perf_counter() - started, stage, profile)
+
+    async def save(self, trace: Trace | None):
+        """Grava o trace (e os perfis) da missão encerrada."""
+        if trace is None:
+            return
+        self._active.pop(trace.session_id, None)
+        profiles = {stage: os.path.basename(self.profile_path(trace.session_id, stage))
+                    for _, stage, _ in trace.profiles}
+        data = json.dumps(trace.to_chrome(profiles), ensure_ascii=False, default=str)
+        try:
+            await asyncio.to_thread(self._write_files, trace.session_id, data, list(trace.profiles))
+        except Exception as e:
+            logger.error(f"Erro ao gravar o trace: {e}", session_id=trace.session_id)
+
+    @staticmethod
+    def _report(profile: cProfile.Profile, duration: float) -> str:
+        output = io.StringIO()
+        output.write(f"Duração da etapa: {duration:.3f}s\n\n")
+        pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(TRACE_PROFILE_LINES)
+        return output.getvalue()
+
+    def _write_files(self, session_id: str, data: str, profiles: List[Tuple[float, str, cProfile.Profile]]):
+        path = self.path(session_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for duration, stage, profile in profiles:
+            with open(self.profile_path(session_id, stage), "w", encoding="utf-8") as f:
+                f.write(self._report(profile, duration))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+tracer = Tracer()
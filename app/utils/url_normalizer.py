@@ -0,0 +1,79 @@
+import re
+import posixpath
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+# Parâmetros de rastreamento que não mudam o conteúdo da página
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "ref_src",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+_SAFE_PATH_CHARS = "/:@!$&'()*+,;=-._~"
+_MULTI_SLASH_RE = re.compile(r"/{2,}")
+_PERCENT_RE = re.compile(r"%[0-9a-fA-F]{2}")
+_UNRESERVED = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+def _normalize_escape(match: re.Match) -> str:
+    # Decodifica só caracteres não reservados (%7E -> ~); os demais ficam com hexa maiúsculo
+    char = chr(int(match.group(0)[1:], 16))
+    return char if char in _UNRESERVED else match.group(0).upper()
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def normalize_url(url: str) -> str:
+    """
+    Forma canônica (e ainda acessível) de uma URL.
+
+    Esquema e host em minúsculas, sem porta padrão, sem fragmento, caminho
+    com segmentos '.'/'..' resolvidos e percent-encoding uniforme, parâmetros
+    de rastreamento (utm_*, fbclid, gclid...) removidos e os demais ordenados.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        # Porta inválida: mantém a URL como veio, apenas sem espaços
+        return url
+
+    host = (parts.hostname or "").rstrip(".")
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    netloc = host
+    if port and str(port) != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+
+    path = _MULTI_SLASH_RE.sub("/", parts.path or "/")
+    trailing = path.endswith("/")
+    path = posixpath.normpath(path)
+    if path.startswith("//"):
+        path = path[1:]
+    if trailing and not path.endswith("/"):
+        path += "/"
+    path = quote(_PERCENT_RE.sub(_normalize_escape, path), safe=_SAFE_PATH_CHARS + "%")
+
+    query_items = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+    query = urlencode(sorted(query_items), doseq=True)
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+def url_key(url: str) -> str:
+    """
+    Identidade de uma URL para deduplicação e chaves de cache.
+
+    Além de `normalize_url`, trata http/https, o prefixo 'www.' e a barra
+    final como equivalentes. Não é uma URL acessível: use-a só como chave.
+    """
+    parts = urlsplit(normalize_url(url))
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    path = parts.path.rstrip("/") or "/"
+    return f"{host}{path}" + (f"?{parts.query}" if parts.query else "")
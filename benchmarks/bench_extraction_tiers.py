@@ -0,0 +1,124 @@
+"""
+Benchmark da cadeia de extração: custo e qualidade do texto por camada.
+
+Roda cada camada de `extraction_tools.EXTRACTORS` isoladamente (incluindo a
+análise do HTML), a cadeia completa e, como referência, o caminho antigo
+(`trafilatura.extract` direto sobre o HTML) sobre um corpus fixo com vários
+layouts. A qualidade é medida contra o texto-gabarito de cada página
+(precisão, revocação e F1 sobre as palavras); páginas sem resultado contam
+como F1 zero. Tudo roda em um único processo, sem o `parser_pool`.
+
+Uso:
+    python -m benchmarks.bench_extraction_tiers --pages 300
+    python -m benchmarks.bench_extraction_tiers --layouts article br --boilerplate 60
+"""
+import argparse
+import re
+import statistics
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+import trafilatura
+
+from app.tools import extraction_tools
+from benchmarks.bench_parsing import _percentile
+from benchmarks.corpus import LAYOUTS, make_corpus
+
+_WORD_RE = re.compile(r"\w+")
+
+def _words(text: str) -> Counter:
+    return Counter(_WORD_RE.findall(text.lower()))
+
+def score(extracted: str | None, expected: str) -> Tuple[float, float, float]:
+    """Precisão, revocação e F1 das palavras extraídas em relação ao gabarito."""
+    if not extracted:
+        return 0.0, 0.0, 0.0
+    got, want = _words(extracted), _words(expected)
+    overlap = sum((got & want).values())
+    if not overlap:
+        return 0.0, 0.0, 0.0
+    precision = overlap / sum(got.values())
+    recall = overlap / sum(want.values())
+    return precision, recall, 2 * precision * recall / (precision + recall)
+
+def _tier(extractor: extraction_tools.Extractor) -> Callable[[str, str], Tuple[str | None, str]]:
+    def run(url: str, html: str) -> Tuple[str | None, str]:
+        page = extraction_tools.ParsedPage(url, html)
+        return (extractor.extract(page) if page.tree is not None else None), extractor.name
+    return run
+
+def _chain(url: str, html: str) -> Tuple[str | None, str]:
+    result = extraction_tools.parse_html(url, html)
+    return (result["content"], result["method"]) if result else (None, "nenhuma")
+
+def _legacy(url: str, html: str) -> Tuple[str | None, str]:
+    text = trafilatura.extract(html, include_comments=False, include_tables=False)
+    return (text if text and len(text) > 200 else None), "trafilatura"
+
+def run_variant(name: str, fn: Callable[[str, str], Tuple[str | None, str]],
+                pages: List[Dict[str, str]]) -> Dict[str, Any]:
+    # Aquece caches de importação e do lxml
+    fn(pages[0]["url"], pages[0]["html"])
+
+    durations: List[float] = []
+    precision: List[float] = []
+    recall: List[float] = []
+    f1: List[float] = []
+    winners: Counter = Counter()
+    extracted = 0
+    start = time.perf_counter()
+    for page in pages:
+        t0 = time.perf_counter()
+        text, tier = fn(page["url"], page["html"])
+        durations.append(time.perf_counter() - t0)
+        p, r, f = score(text, page["text"])
+        f1.append(f)
+        if text:
+            extracted += 1
+            precision.append(p)
+            recall.append(r)
+        winners[tier if text else "nenhuma"] += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "variant": name,
+        "pages": len(pages),
+        "extracted": extracted,
+        "pages_per_sec": len(pages) / elapsed if elapsed else 0.0,
+        "ms_p50": _percentile(durations, 50) * 1000,
+        "ms_p95": _percentile(durations, 95) * 1000,
+        "precision": statistics.fmean(precision) if precision else 0.0,
+        "recall": statistics.fmean(recall) if recall else 0.0,
+        "f1": statistics.fmean(f1),
+        "winners": dict(winners),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300, help="Número de páginas do corpus.")
+    parser.add_argument("--paragraphs", type=int, default=12, help="Parágrafos por artigo.")
+    parser.add_argument("--boilerplate", type=int, default=30, help="Blocos de navegação/anúncios por página.")
+    parser.add_argument("--layouts", nargs="+", choices=LAYOUTS, default=list(LAYOUTS), help="Layouts alternados no corpus.")
+    args = parser.parse_args()
+
+    pages = make_corpus(args.pages, args.paragraphs, args.boilerplate, layouts=args.layouts)
+    total_kb = sum(len(p["html"]) for p in pages) / 1024
+    print(f"Corpus: {len(pages)} páginas ({total_kb:.0f} KiB), layouts: {', '.join(args.layouts)}\n")
+
+    variants = [(f"camada {e.name}", _tier(e)) for e in extraction_tools.EXTRACTORS]
+    variants += [("cadeia", _chain), ("anterior (trafilatura)", _legacy)]
+
+    print(f"{'variante':<24} {'págs/s':>8} {'p50':>8} {'p95':>8} {'extraídas':>10} {'precisão':>9} {'revocação':>10} {'F1':>6}")
+    for name, fn in variants:
+        r = run_variant(name, fn, pages)
+        print(
+            f"{r['variant']:<24} {r['pages_per_sec']:>8.1f} {r['ms_p50']:>6.2f}ms {r['ms_p95']:>6.2f}ms "
+            f"{r['extracted']:>4}/{r['pages']:<5} {r['precision']:>9.3f} {r['recall']:>10.3f} {r['f1']:>6.3f}"
+        )
+        if name == "cadeia":
+            wins = ", ".join(f"{tier} {count}" for tier, count in sorted(r["winners"].items(), key=lambda i: -i[1]))
+            print(f"{'':>24} camada vencedora: {wins}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Benchmark de ponta a ponta das missões, sem rede: web, busca e LLM locais (`benchmarks.fakes`).
+
+Mede, para cada combinação de missões e slots de execução, a latência das
+missões (da fila ao fim), páginas extraídas/s, a duração média de cada
+etapa, o pico de RSS e o atraso do event loop. As missões passam pelo
+`MissionScheduler` e pelo `Controller` reais.
+
+Uso:
+    python -m benchmarks.bench_mission --missions 1 4 8 --concurrency 1 2 4
+    python -m benchmarks.bench_mission --save-baseline benchmarks/baselines/mission.json
+    python -m benchmarks.bench_mission --compare benchmarks/baselines/mission.json
+
+Por padrão os caches (LLM, busca e páginas) ficam desligados para medir o
+caminho frio, e o ritmo por host do `fetch_scheduler` é elevado para não ser
+o gargalo; qualquer variável de ambiente definida antes prevalece. Tudo roda
+em um diretório temporário. Com `--compare`, o processo termina com código 1
+se alguma métrica piorar além da tolerância.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.bench_parsing import _percentile, _probe_loop_lag
+from benchmarks.fakes import FakeServices, free_port
+
+# Métrica -> (maior é melhor, folga absoluta ignorada na comparação)
+BASELINE_METRICS = {
+    "e2e_p50_s": (False, 0.05),
+    "e2e_p95_s": (False, 0.05),
+    "pages_per_sec": (True, 0.5),
+    "loop_lag_p99_ms": (False, 5.0),
+    "peak_rss_mb": (False, 10.0),
+}
+
+def _rss_mb() -> float:
+    """RSS atual (Linux) ou, sem /proc, o pico do processo."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+async def _sample_rss(samples: List[float], stop: asyncio.Event):
+    while not stop.is_set():
+        samples.append(_rss_mb())
+        await asyncio.sleep(0.05)
+
+async def run_scenario(services: FakeServices, missions: int, concurrency: int, run: int) -> Dict[str, Any]:
+    from app.core.controller import Controller
+    from app.core.mission_scheduler import MissionScheduler
+    from app.core.mission_status import mission_status, TERMINAL_STATUSES
+
+    scheduler = MissionScheduler(Controller(), concurrency=concurrency, max_queue=max(missions, 1))
+    scheduler.start()
+
+    lag_samples: List[float] = []
+    rss_samples: List[float] = []
+    stop = asyncio.Event()
+    probes = [
+        asyncio.create_task(_probe_loop_lag(0.005, lag_samples, stop)),
+        asyncio.create_task(_sample_rss(rss_samples, stop)),
+    ]
+    pages_before = services.counters["pages"]
+    start = time.perf_counter()
+    try:
+        session_ids = [
+            scheduler.submit({"topic": f"benchmark {run}-{i}", "user_id": f"bench-{i % 4}"})
+            for i in range(missions)
+        ]
+        while True:
+            manifests = [mission_status.get(s) for s in session_ids]
+            if all(m and m["status"] in TERMINAL_STATUSES for m in manifests):
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+    finally:
+        stop.set()
+        await asyncio.gather(*probes)
+        await scheduler.close()
+
+    e2e = [m["finished_at"] - m["created_at"] for m in manifests]
+    extracted = sum(m["data_summary"]["contents_extracted"] for m in manifests)
+    stages: Dict[str, List[float]] = {}
+    for manifest in manifests:
+        for name, timing in manifest["stages"].items():
+            if timing.get("duration") is not None:
+                stages.setdefault(name, []).append(timing["duration"])
+
+    return {
+        "missions": missions,
+        "concurrency": concurrency,
+        "failed": sum(m["status"] != "concluído" for m in manifests),
+        "seconds": elapsed,
+        "e2e_p50_s": _percentile(e2e, 50),
+        "e2e_p95_s": _percentile(e2e, 95),
+        "e2e_max_s": max(e2e),
+        "pages_fetched": services.counters["pages"] - pages_before,
+        "pages_extracted": extracted,
+        "pages_per_sec": extracted / elapsed if elapsed else 0.0,
+        "loop_lag_p50_ms": _percentile(lag_samples, 50) * 1000,
+        "loop_lag_p99_ms": _percentile(lag_samples, 99) * 1000,
+        "loop_lag_max_ms": max(lag_samples, default=0.0) * 1000,
+        "peak_rss_mb": max(rss_samples, default=_rss_mb()),
+        "stages": {name: statistics.fmean(values) for name, values in sorted(stages.items())},
+    }
+
+async def run_all(args: argparse.Namespace, port: int) -> List[Dict[str, Any]]:
+    from app.tools import search_tools
+    from app.core.mission_status import mission_status
+    from app.utils.http_client import http_client
+    from app.utils.parser_pool import parser_pool
+    from app.utils.seen_urls import seen_urls
+
+    services = FakeServices(
+        port, pages=args.pages, hosts=args.hosts, page_latency=args.page_latency / 1000,
+        paragraphs=args.paragraphs, boilerplate=args.boilerplate, llm_latency=args.llm_latency / 1000,
+        queries=args.queries, search_latency=args.search_latency / 1000, results=args.results,
+    )
+    output = io.StringIO()
+    # Os cenários rodam no mesmo loop: os singletons da aplicação são ligados a ele
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+        await services.start()
+        await http_client.start()
+        await seen_urls.start()
+        parser_pool.start()
+        search_tools.set_search_backend(services.search)
+    print(f"Corpus: {len(services.corpus)} páginas em {len(services.hosts)} hosts locais.\n")
+
+    results = []
+    try:
+        scenarios = [(m, c) for m in args.missions for c in args.concurrency]
+        for run, (missions, concurrency) in enumerate(scenarios):
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                result = await run_scenario(services, missions, concurrency, run)
+            results.append(result)
+            _print_result(result, header=run == 0)
+            output.seek(0)
+            output.truncate()
+    finally:
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+            search_tools.set_search_backend(None)
+            await mission_status.flush()
+            await parser_pool.close()
+            await seen_urls.close()
+            await http_client.close()
+            await services.close()
+    return results
+
+def _print_result(r: Dict[str, Any], header: bool):
+    if header:
+        print(f"{'missões':>7} {'slots':>5} {'e2e p50':>8} {'e2e p95':>8} {'págs/s':>7} "
+              f"{'lag p99':>9} {'lag máx':>9} {'RSS':>8} {'falhas':>6}")
+    print(
+        f"{r['missions']:>7} {r['concurrency']:>5} {r['e2e_p50_s']:>7.2f}s {r['e2e_p95_s']:>7.2f}s "
+        f"{r['pages_per_sec']:>7.1f} {r['loop_lag_p99_ms']:>7.1f}ms {r['loop_lag_max_ms']:>7.1f}ms "
+        f"{r['peak_rss_mb']:>6.0f}MB {r['failed']:>6}"
+    )
+    stages = "  ".join(f"{name} {duration:.2f}s" for name, duration in r["stages"].items())
+    print(f"{'':>14}etapas: {stages}")
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """Métricas que pioraram além da tolerância em relação à baseline."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["missions"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["missions"], result["concurrency"]))
+        if previous is None:
+            continue
+        for metric, (higher_is_better, slack) in BASELINE_METRICS.items():
+            old, new = previous.get(metric), result[metric]
+            if old is None:
+                continue
+            worse = old - new if higher_is_better else new - old
+            if worse > slack and worse > abs(old) * tolerance:
+                regressions.append(
+                    f"{result['missions']} missões / {result['concurrency']} slots: {metric} {old:.2f} -> {new:.2f}"
+                )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--missions", type=int, nargs="+", default=[1, 4, 8], help="Missões simultâneas submetidas.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[2], help="Slots do MissionScheduler.")
+    parser.add_argument("--pages", type=int, default=500, help="Páginas do corpus.")
+    parser.add_argument("--hosts", type=int, default=8, help="Hosts locais distintos (127.0.0.N).")
+    parser.add_argument("--paragraphs", type=int, default=12, help="Parágrafos por artigo.")
+    parser.add_argument("--boilerplate", type=int, default=30, help="Blocos de navegação/anúncios por página.")
+    parser.add_argument("--page-latency", type=float, default=50, help="Latência média das páginas (ms).")
+    parser.add_argument("--llm-latency", type=float, default=1000, help="Tempo de geração do plano (ms).")
+    parser.add_argument("--search-latency", type=float, default=300, help="Latência de cada busca (ms).")
+    parser.add_argument("--queries", type=int, default=5, help="Queries por plano.")
+    parser.add_argument("--results", type=int, default=8, help="Resultados por busca.")
+    parser.add_argument("--save-baseline", metavar="ARQUIVO", help="Grava os resultados como baseline.")
+    parser.add_argument("--compare", metavar="ARQUIVO", help="Compara com uma baseline gravada.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Piora relativa aceita na comparação.")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os logs da aplicação.")
+    args = parser.parse_args()
+    for option in ("save_baseline", "compare"):
+        if getattr(args, option):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+
+    # Configuração lida pelos módulos da aplicação na importação: precisa vir antes dela
+    port = free_port()
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench-key")
+    os.environ.setdefault("OPENROUTER_BASE_URL", f"http://127.0.0.1:{port}/api/v1")
+    for name, value in (("LLM_CACHE_ENABLED", "false"), ("SEARCH_CACHE_ENABLED", "false"),
+                        ("PAGE_CACHE_ENABLED", "false"), ("FETCH_HOST_RATE", "1000"), ("FETCH_HOST_BURST", "1000")):
+        os.environ.setdefault(name, value)
+    os.chdir(tempfile.mkdtemp(prefix="bench_mission_"))
+
+    # Os logs são escritos por uma thread própria: sem --verbose, só os erros chegam ao terminal
+    from app.utils.logger import set_level
+    set_level(os.getenv("LOG_LEVEL") or ("INFO" if args.verbose else "ERROR"))
+
+    results = asyncio.run(run_all(args, port))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            meta = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                    "machine": platform.machine(), "cpus": os.cpu_count(), "args": vars(args)}
+            json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\nBaseline gravada em {args.save_baseline}.")
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print("\nRegressões em relação à baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\nSem regressões em relação à baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark do estágio de parsing: latência do event loop e páginas/s por número de processos.
+
+Uso:
+    python -m benchmarks.bench_parsing --pages 200 --workers 0 1 2 4
+
+`--workers 0` reproduz o comportamento antigo (parsing direto no loop).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from app.tools import extraction_tools
+from app.utils.logger import set_level
+from app.utils.parser_pool import ParserPool
+from benchmarks.corpus import make_corpus
+
+async def _probe_loop_lag(interval: float, samples: List[float], stop: asyncio.Event):
+    """Mede o atraso com que o loop acorda uma corrotina que dorme `interval` segundos."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+async def run_once(workers: int, pages: List[Dict[str, str]], batch_size: int) -> Dict[str, float]:
+    pool = ParserPool(workers=workers, batch_size=batch_size)
+    pool.start()
+
+    # Aquece os processos filhos para não medir o custo de fork/import
+    await asyncio.gather(*(pool.run(extraction_tools.parse_html, p["url"], p["html"]) for p in pages[:max(1, workers)]))
+
+    lag_samples: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(0.005, lag_samples, stop))
+    await asyncio.sleep(0.05)
+
+    extracted = 0
+    start = time.perf_counter()
+    try:
+        async for result in pool.map(extraction_tools.parse_html, ((p["url"], p["html"]) for p in pages)):
+            if result:
+                extracted += 1
+    finally:
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+        await pool.close()
+
+    return {
+        "workers": workers,
+        "pages": len(pages),
+        "extracted": extracted,
+        "seconds": elapsed,
+        "pages_per_sec": len(pages) / elapsed if elapsed else 0.0,
+        "loop_lag_p50_ms": _percentile(lag_samples, 50) * 1000,
+        "loop_lag_p99_ms": _percentile(lag_samples, 99) * 1000,
+        "loop_lag_max_ms": max(lag_samples, default=0.0) * 1000,
+        "loop_lag_mean_ms": statistics.fmean(lag_samples) * 1000 if lag_samples else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200, help="Número de páginas do corpus.")
+    parser.add_argument("--paragraphs", type=int, default=20, help="Parágrafos por artigo.")
+    parser.add_argument("--boilerplate", type=int, default=60, help="Blocos de navegação/anúncios por página.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4], help="Números de processos a comparar.")
+    parser.add_argument("--batch-size", type=int, default=4, help="Páginas por tarefa enviada ao pool.")
+    args = parser.parse_args()
+    # Os logs da aplicação saem por uma thread própria, fora do alcance do redirect_stdout
+    set_level("ERROR")
+
+    pages = make_corpus(args.pages, args.paragraphs, args.boilerplate)
+    avg_kb = sum(len(p["html"]) for p in pages) / len(pages) / 1024
+    print(f"Corpus: {len(pages)} páginas, {avg_kb:.1f} KB em média.\n")
+    print(f"{'workers':>7} {'páginas/s':>10} {'lag p50':>9} {'lag p99':>9} {'lag máx':>9} {'extraídas':>9}")
+    for workers in args.workers:
+        r = asyncio.run(run_once(workers, pages, args.batch_size))
+        print(
+            f"{r['workers']:>7} {r['pages_per_sec']:>10.1f} {r['loop_lag_p50_ms']:>7.1f}ms "
+            f"{r['loop_lag_p99_ms']:>7.1f}ms {r['loop_lag_max_ms']:>7.1f}ms {r['extracted']:>9}"
+        )
+
+if __name__ == "__main__":
+    main()
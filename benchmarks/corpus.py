@@ -0,0 +1,106 @@
+"""
+Gerador determinístico de páginas HTML realistas para os benchmarks.
+
+Cada página tem um artigo principal (o "gabarito" do texto a ser extraído)
+cercado de navegação, anúncios, scripts, comentários e rodapé, como as
+páginas que os agentes encontram na web. O layout varia (`LAYOUTS`): HTML
+semântico, só <div>s com classes genéricas ou texto separado por <br>.
+"""
+import random
+from typing import Dict, List, Sequence
+
+WORDS = (
+    "mercado café especial consumo tendência preço produtor torra grão safra "
+    "exportação cafeteria consumidor marca assinatura qualidade pesquisa dados "
+    "crescimento varejo digital estratégia concorrência brasil região sabor "
+    "empresa vendas canal distribuição inovação sustentabilidade certificação "
+    "análise relatório investimento demanda oferta público geração hábito"
+).split()
+
+# article: <main>/<article>/<p>; divs: só <div>s sem classes reconhecíveis; br: artigo sem <p>, em linhas com <br>
+LAYOUTS = ("article", "divs", "br")
+
+def _sentence(rng: random.Random, min_words: int = 8, max_words: int = 22) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+def make_page(index: int, paragraphs: int = 12, boilerplate: int = 30, seed: int = 42,
+              layout: str = "article") -> Dict[str, str]:
+    """
+    Gera uma página sintética.
+
+    Args:
+        index (int): Índice da página (define URL e semente).
+        paragraphs (int): Número de parágrafos do artigo principal.
+        boilerplate (int): Quantidade de blocos de navegação/anúncios ao redor.
+        seed (int): Semente base para reprodutibilidade.
+        layout (str): Estrutura do HTML (ver `LAYOUTS`); o texto gerado é o mesmo.
+
+    Returns:
+        Dict[str, str]: 'url', 'html' e 'text' (texto esperado do artigo).
+    """
+    rng = random.Random(seed * 100_003 + index)
+    title = _sentence(rng, 4, 9).rstrip(".")
+    body = [_paragraph(rng, rng.randint(3, 7)) for _ in range(paragraphs)]
+
+    nav = "".join(f'<li><a href="/secao/{i}">{rng.choice(WORDS).title()}</a></li>' for i in range(boilerplate))
+    related = "".join(
+        f'<div class="card"><a href="/artigo/{rng.randint(1, 10_000)}">{_sentence(rng, 3, 7)}</a></div>'
+        for _ in range(boilerplate // 2)
+    )
+    comments = "".join(f'<div class="comment"><p>{_sentence(rng, 4, 12)}</p></div>' for _ in range(boilerplate // 3))
+    script = "var dados = [" + ",".join(str(rng.random()) for _ in range(boilerplate * 10)) + "];"
+
+    head = (
+        "<!DOCTYPE html><html lang=\"pt-BR\"><head><meta charset=\"utf-8\">"
+        f"<title>{title}</title><style>body{{font-family:sans-serif}} .ad{{display:block}}</style>"
+        f"<script>{script}</script></head><body>"
+    )
+    ad = _sentence(rng)
+    copyright = _sentence(rng)
+    if layout == "article":
+        html = (
+            head
+            + f"<header><nav><ul>{nav}</ul></nav></header>"
+            f'<div class="ad">Publicidade: {ad}</div>'
+            f"<main><article><h1>{title}</h1>"
+            + "".join(f"<p>{p}</p>" for p in body)
+            + f'</article><aside class="related">{related}</aside>'
+            f'<section class="comments">{comments}</section></main>'
+            f"<footer><p>© 2025 Portal de Notícias. {copyright}</p><ul>{nav}</ul></footer>"
+            "</body></html>"
+        )
+    elif layout == "divs":
+        html = (
+            head
+            + f'<div class="top"><ul>{nav}</ul></div>'
+            f'<div class="box">Publicidade: {ad}</div>'
+            f'<div class="wrap"><div class="col-8"><div class="titulo">{title}</div>'
+            + "".join(f'<div class="txt"><p>{p}</p></div>' for p in body)
+            + f'</div><div class="col-4">{related}</div>'
+            f'<div class="col-12">{comments.replace("comment", "item")}</div></div>'
+            f'<div class="bottom"><p>© 2025 Portal de Notícias. {copyright}</p><ul>{nav}</ul></div>'
+            "</body></html>"
+        )
+    elif layout == "br":
+        html = (
+            head
+            + f"<header><nav><ul>{nav}</ul></nav></header>"
+            f'<div class="ad">Publicidade: {ad}</div>'
+            f'<div id="materia"><b>{title}</b><br><br>'
+            + "<br><br>".join(body)
+            + f'</div><div class="related">{related}</div>'
+            f"<footer>© 2025 Portal de Notícias. {copyright}<ul>{nav}</ul></footer>"
+            "</body></html>"
+        )
+    else:
+        raise ValueError(f"Layout desconhecido: {layout}")
+    return {"url": f"http://bench.local/artigo/{index}", "html": html, "text": "\n".join(body)}
+
+def make_corpus(size: int, paragraphs: int = 12, boilerplate: int = 30, seed: int = 42,
+                layouts: Sequence[str] = ("article",)) -> List[Dict[str, str]]:
+    """Gera `size` páginas sintéticas com os mesmos parâmetros, alternando entre `layouts`."""
+    return [make_page(i, paragraphs, boilerplate, seed, layouts[i % len(layouts)]) for i in range(size)]
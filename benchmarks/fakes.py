@@ -0,0 +1,140 @@
+"""
+Substitutos locais da web, da busca e do OpenRouter para os benchmarks offline.
+
+`FakeServices` sobe um servidor aiohttp que serve as páginas do corpus
+(com latência configurável, distribuídas em vários endereços de loopback para
+simular hosts diferentes) e um endpoint `/api/v1/chat/completions` compatível
+com o OpenRouter, com e sem streaming (SSE). `search` é um backend para
+`search_tools.set_search_backend` que devolve URLs do corpus.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import socket
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+from benchmarks.corpus import make_corpus
+
+def free_port() -> int:
+    """Porta TCP livre em 127.0.0.1."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+class FakeServices:
+    """
+    Servidor local com o corpus de páginas e o OpenRouter falso.
+
+    Args:
+        port (int): Porta usada em todos os endereços.
+        pages (int): Tamanho do corpus (as buscas sorteiam URLs dentro dele).
+        hosts (int): Endereços 127.0.0.N usados como hosts distintos (Linux aceita todo o 127/8).
+        page_latency (float): Latência média de cada página, em segundos (±50% de jitter).
+        paragraphs (int) / boilerplate (int): Tamanho das páginas (ver `corpus.make_page`).
+        llm_latency (float): Tempo total de geração do plano, em segundos.
+        queries (int): Número de queries de busca em cada plano.
+        search_latency (float): Latência de cada busca, em segundos.
+        results (int): Resultados por busca.
+    """
+    def __init__(self, port: int, pages: int = 500, hosts: int = 8, page_latency: float = 0.05,
+                 paragraphs: int = 12, boilerplate: int = 30, llm_latency: float = 1.0, queries: int = 5,
+                 search_latency: float = 0.3, results: int = 8):
+        self.port = port
+        self.corpus = make_corpus(pages, paragraphs, boilerplate)
+        self.hosts = [f"127.0.0.{i}" for i in range(1, max(1, hosts) + 1)]
+        self.page_latency = page_latency
+        self.llm_latency = llm_latency
+        self.queries = queries
+        self.search_latency = search_latency
+        self.results = results
+        self.counters = {"pages": 0, "bytes": 0, "llm_calls": 0, "searches": 0}
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def openrouter_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    def page_url(self, index: int) -> str:
+        return f"http://{self.hosts[index % len(self.hosts)]}:{self.port}/artigo/{index}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/robots.txt", self._robots)
+        app.router.add_get("/artigo/{index}", self._page)
+        app.router.add_post("/api/v1/chat/completions", self._chat)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        bound = []
+        for host in self.hosts:
+            try:
+                await web.TCPSite(self._runner, host, self.port).start()
+                bound.append(host)
+            except OSError:
+                # Sistemas que só atendem 127.0.0.1 no loopback: menos hosts distintos
+                break
+        self.hosts = bound
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _robots(self, request: web.Request) -> web.Response:
+        return web.Response(text="User-agent: *\nAllow: /\n")
+
+    async def _page(self, request: web.Request) -> web.Response:
+        index = int(request.match_info["index"])
+        if not 0 <= index < len(self.corpus):
+            raise web.HTTPNotFound()
+        await asyncio.sleep(self.page_latency * random.uniform(0.5, 1.5))
+        html = self.corpus[index]["html"]
+        self.counters["pages"] += 1
+        self.counters["bytes"] += len(html)
+        return web.Response(text=html, content_type="text/html")
+
+    def plan(self, prompt: str) -> Dict[str, Any]:
+        """Plano de missão determinístico para o prompt (queries distintas por tópico)."""
+        tag = f"{_seed(prompt):016x}"[:8]
+        agent = lambda name: {"agent_class": name, "role": f"Agente {name} do benchmark.",
+                              "goal": "Executar a etapa da missão.", "tools": [], "constraints": []}
+        return {
+            "search_queries": [f"consulta {tag} {k}" for k in range(self.queries)],
+            "extraction_tasks": [],
+            "screenshot_targets": [],
+            "team": [agent("WebSailorV2"), agent("ViralContentAgent"), agent("ContentExtractorV2")],
+        }
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.counters["llm_calls"] += 1
+        content = json.dumps(self.plan(body["messages"][-1]["content"]), ensure_ascii=False)
+        if not body.get("stream"):
+            await asyncio.sleep(self.llm_latency)
+            return web.json_response({"choices": [{"message": {"content": content}}]})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        chunks = [content[i:i + 24] for i in range(0, len(content), 24)]
+        for chunk in chunks:
+            await asyncio.sleep(self.llm_latency / len(chunks))
+            event = {"choices": [{"delta": {"content": chunk}}]}
+            await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def search(self, provider: str, query: str) -> List[Dict[str, Any]]:
+        """Backend de busca: URLs do corpus sorteadas de forma determinística pela query."""
+        self.counters["searches"] += 1
+        await asyncio.sleep(self.search_latency * random.uniform(0.5, 1.5))
+        rng = random.Random(_seed(f"{provider}:{query}"))
+        indices = rng.sample(range(len(self.corpus)), min(self.results, len(self.corpus)))
+        return [
+            {"title": f"Resultado {i} para {query}", "url": self.page_url(i), "snippet": self.corpus[i]["text"][:160]}
+            for i in indices
+        ]
@@ -0,0 +1,166 @@
+import asyncio
+import random
+from collections import Counter
+
+import pytest
+
+from app.utils import api_rotator as rotator_module
+from app.utils.api_rotator import APIRotator, _parse_reset
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+        self.epoch = 1_700_000_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.epoch
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(rotator_module, "time", fake)
+    monkeypatch.setattr(rotator_module, "API_KEY_COOLDOWN", 60.0)
+    monkeypatch.setattr(rotator_module, "API_KEY_MAX_COOLDOWN", 3600.0)
+    monkeypatch.setattr(rotator_module, "API_KEY_DISABLE_TIME", 3600.0)
+    return fake
+
+def _rotator(*keys: str) -> APIRotator:
+    return APIRotator({"serper": list(keys)})
+
+def _state(rotator: APIRotator, key: str):
+    return next(s for s in rotator._states["serper"] if s.key == key)
+
+def _picks(rotator: APIRotator, n: int = 4000) -> Counter:
+    random.seed(42)
+    return Counter(rotator.get_key("serper") for _ in range(n))
+
+def test_duplicate_and_empty_keys_are_dropped(clock):
+    rotator = APIRotator({"serper": ["a", "", "b", "a", None]})
+
+    assert rotator.keys["serper"] == ["a", "b"]
+    assert rotator.size("serper") == 2 and not rotator.has_keys("openrouter")
+
+def test_selection_is_weighted_by_latency(clock):
+    rotator = _rotator("rapida", "lenta")
+    rotator.report("serper", "rapida", 200, latency=0.1)
+    rotator.report("serper", "lenta", 200, latency=0.4)
+
+    picks = _picks(rotator)
+    # Peso inversamente proporcional à latência: 4:1
+    assert 0.75 < picks["rapida"] / 4000 < 0.85
+
+def test_selection_is_weighted_by_success_and_quota(clock):
+    rotator = _rotator("saudavel", "falhando", "sem_cota")
+    for key in ("saudavel", "falhando", "sem_cota"):
+        rotator.report("serper", key, 200, latency=0.1)
+    for _ in range(5):
+        rotator.report("serper", "falhando", 500, latency=0.1)
+    rotator.report("serper", "sem_cota", 200, latency=0.1, headers={"X-RateLimit-Remaining": "5", "X-RateLimit-Limit": "100"})
+
+    picks = _picks(rotator)
+    assert picks["saudavel"] > 0.8 * 4000
+    assert picks["falhando"] < picks["saudavel"] / 4
+    assert picks["sem_cota"] < picks["saudavel"] / 10
+
+def test_unmeasured_keys_are_explored(clock):
+    rotator = _rotator("medida", "nova")
+    rotator.report("serper", "medida", 200, latency=2.0)
+
+    picks = _picks(rotator)
+    assert abs(picks["medida"] - picks["nova"]) < 400
+
+def test_in_flight_lowers_weight(clock):
+    rotator = _rotator("a", "b")
+    _state(rotator, "a").in_flight = 3
+
+    picks = _picks(rotator)
+    assert 0.15 < picks["a"] / 4000 < 0.25
+
+def test_ewma_updates(clock):
+    rotator = _rotator("a")
+    state = _state(rotator, "a")
+    rotator.report("serper", "a", 200, latency=1.0)
+    rotator.report("serper", "a", 200, latency=2.0)
+    rotator.report("serper", "a", 500, latency=3.0)
+
+    assert state.latency_ewma == pytest.approx(0.3 * 3.0 + 0.7 * (0.3 * 2.0 + 0.7 * 1.0))
+    assert state.success_ewma == pytest.approx(0.7)
+    assert (state.requests, state.successes, state.errors) == (3, 2, 1)
+    # Falha de rede (status None) não entra na latência
+    latency = state.latency_ewma
+    rotator.report("serper", "a", None, latency=50.0)
+    assert state.latency_ewma == latency
+    assert state.success_ewma == pytest.approx(0.49)
+
+def test_429_with_retry_after_pauses_key(clock):
+    rotator = _rotator("a", "b")
+    rotator.report("serper", "a", 429, headers={"Retry-After": "120"})
+
+    assert {rotator.get_key("serper") for _ in range(50)} == {"b"}
+    clock.now += 119
+    assert not _state(rotator, "a").available(clock.now)
+    clock.now += 1
+    assert _state(rotator, "a").available(clock.now)
+
+def test_429_without_retry_after_backs_off_exponentially(clock):
+    rotator = _rotator("a")
+    state = _state(rotator, "a")
+    cooldowns = []
+    for _ in range(4):
+        rotator.report("serper", "a", 429)
+        cooldowns.append(state.cooldown_until - clock.now)
+        clock.now = state.cooldown_until
+    rotator.report("serper", "a", 200)
+    rotator.report("serper", "a", 429)
+
+    assert cooldowns == [60, 120, 240, 480]
+    assert state.cooldown_until - clock.now == 60
+
+def test_exhausted_quota_pauses_until_reset(clock):
+    rotator = _rotator("a")
+    rotator.report("serper", "a", 200, headers={"x-ratelimit-remaining": "0", "x-ratelimit-reset": "1m30s"})
+
+    assert rotator.wait_time("serper") == 90
+    assert rotator.get_key("serper") is None
+
+def test_rejected_key_is_disabled(clock):
+    rotator = _rotator("a", "b")
+    rotator.report("serper", "a", 402)
+
+    assert _state(rotator, "a").remaining == 0
+    assert _state(rotator, "a").cooldown_until == clock.now + 3600
+    assert rotator.summary() == {"serper": {"available": 1, "total": 2}}
+
+@pytest.mark.parametrize("value, expected", [
+    ("30", 30.0), ("1m30s", 90.0), ("500ms", 0.5), ("1h", 3600.0),
+    ("1700000060", 60.0), ("1700000060000", 60.0), ("", None), ("nunca", None),
+])
+def test_parse_reset(clock, value, expected):
+    assert _parse_reset(value) == expected
+
+def test_use_reports_outcome_and_waits_for_cooldown(monkeypatch):
+    rotator = _rotator("a")
+    state = _state(rotator, "a")
+
+    async def run():
+        async with rotator.use("serper") as lease:
+            assert state.in_flight == 1
+            lease.report(429, {"Retry-After": "1"})
+        assert state.in_flight == 0
+        # Pausa curta: aguarda a chave voltar
+        async with rotator.use("serper", max_wait=2) as lease:
+            assert lease is not None
+        # Pausa longa: sem chave utilizável dentro de max_wait
+        rotator.report("serper", "a", 401)
+        async with rotator.use("serper", max_wait=1) as lease:
+            assert lease is None
+        with pytest.raises(RuntimeError):
+            async with rotator.use("serper", max_wait=0):
+                raise RuntimeError
+
+    monkeypatch.setattr(rotator_module, "API_KEY_DISABLE_TIME", 3600.0)
+    asyncio.run(run())
+    assert (state.requests, state.successes, state.errors, state.throttled) == (3, 1, 2, 1)
@@ -0,0 +1,117 @@
+import json
+import os
+import asyncio
+import copy
+
+import pytest
+
+from app.utils import data_saver
+from app.utils.data_saver import DataSaver, LOG_FILENAME, SNAPSHOT_DIR
+
+SESSION = "0123abcd"
+
+@pytest.fixture(autouse=True)
+def _in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_saver, "DATASAVER_FSYNC", False)
+
+def _steps():
+    """Evolução de um estado de missão: listas crescem, chaves mudam e somem."""
+    state = {"user_request": {"topic": "café"}}
+    yield "founder", state
+    state["mission_plan"] = {"search_queries": ["a", "b"]}
+    state["search_results"] = [{"url": "https://a"}]
+    yield "search", state
+    state["search_results"].extend([{"url": "https://b"}, {"url": "https://c"}])
+    state["extracted_data"] = [{"url": "https://a", "content": "texto"}]
+    yield "extract", state
+    state["search_results"] = [{"url": "https://c"}]  # lista substituída: vira "set"
+    state["status"] = "filtrando"
+    yield "filter", state
+    del state["status"]
+    state["extracted_data"].append({"url": "https://c", "content": "mais"})
+    state["screenshot_results"] = []
+    yield "screenshots", state
+    state["screenshot_results"].append({"url": "https://a", "path": "a.png"})
+    yield "final", state
+
+def _record(saver):
+    """Salva cada etapa e devolve as cópias esperadas do estado."""
+    async def run():
+        expected = {}
+        for step, state in _steps():
+            await saver.save_state(SESSION, step, state)
+            expected[step] = copy.deepcopy(state)
+        await saver.close_session(SESSION)
+        return expected
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("snapshot_every", [1, 2, 100])
+def test_replay_matches_full_checkpoints(snapshot_every):
+    delta = DataSaver(mode="delta", snapshot_every=snapshot_every)
+    expected = _record(delta)
+    delta.base_dir = "legacy"
+    legacy = DataSaver(mode="snapshot")
+    legacy.base_dir = "legacy"
+    _record(legacy)
+
+    delta.base_dir = "sessions"
+    for step, state in expected.items():
+        assert delta.load_state(SESSION, step) == state
+        assert legacy.load_state(SESSION, step) == state
+    assert delta.load_state(SESSION) == expected["final"]
+
+def test_log_records_extend_set_and_delete():
+    saver = DataSaver(mode="delta")
+    _record(saver)
+    with open(os.path.join("sessions", SESSION, LOG_FILENAME), encoding="utf-8") as f:
+        records = {r["step"]: r for r in map(json.loads, f)}
+
+    assert records["extract"]["extend"]["search_results"] == [{"url": "https://b"}, {"url": "https://c"}]
+    assert records["filter"]["set"]["search_results"] == [{"url": "https://c"}]
+    assert records["screenshots"]["delete"] == ["status"]
+    assert "set" not in records["final"] and "delete" not in records["final"]
+
+def test_load_step_from_snapshot_plus_log():
+    saver = DataSaver(mode="delta", snapshot_every=2)
+    expected = _record(saver)
+    snapshots = sorted(os.listdir(os.path.join("sessions", SESSION, SNAPSHOT_DIR)))
+
+    assert snapshots == ["0000_founder.json", "0002_extract.json", "0004_screenshots.json", "0005_final.json"]
+    # "filter" (seq 3) parte do snapshot da etapa 2 e aplica só o registro seguinte
+    assert saver._best_snapshot(SESSION, 3)["seq"] == 2
+    assert saver.load_state(SESSION, "filter") == expected["filter"]
+    assert saver.load_state(SESSION, "screenshots") == expected["screenshots"]
+
+def test_keys_projection():
+    saver = DataSaver(mode="delta", snapshot_every=2)
+    expected = _record(saver)
+
+    assert saver.load_state(SESSION, keys=["extracted_data"]) == {"extracted_data": expected["final"]["extracted_data"]}
+    assert saver.load_state(SESSION, "extract", keys=["search_results", "missing"]) == {
+        "search_results": expected["extract"]["search_results"]
+    }
+    assert saver.load_state(SESSION, "founder", keys=["extracted_data"]) == {}
+
+def test_list_steps_and_unknown_step():
+    saver = DataSaver(mode="delta")
+    expected = _record(saver)
+
+    assert saver.list_steps(SESSION) == list(expected)
+    assert saver.list_steps("no_such_session") == []
+    assert saver.load_state(SESSION, "no_such_step") is None
+    assert saver.load_state("no_such_session") is None
+
+def test_snapshot_sequence_past_four_digits():
+    session_dir = os.path.join("sessions", SESSION)
+    os.makedirs(os.path.join(session_dir, SNAPSHOT_DIR))
+    with open(os.path.join(session_dir, LOG_FILENAME), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"seq": 9999, "step": "a", "set": {"x": 1}}) + "\n")
+        f.write(json.dumps({"seq": 10000, "step": "b", "set": {"y": 2}}) + "\n")
+    for seq, step, state in ((9999, "a", {"x": 1}), (10000, "b", {"x": 1, "y": 2, "from_snapshot": True})):
+        with open(os.path.join(session_dir, SNAPSHOT_DIR, f"{seq:04d}_{step}.json"), "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "step": step, "state": state}, f)
+
+    saver = DataSaver(mode="delta")
+    assert saver.load_state(SESSION) == {"x": 1, "y": 2, "from_snapshot": True}
+    assert saver.load_state(SESSION, "a") == {"x": 1}
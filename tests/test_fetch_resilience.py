@@ -0,0 +1,228 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from app.tools import fetch_resilience as resilience_module
+from app.tools.fetch_resilience import CircuitOpenError, FetchResilience
+from app.tools.fetch_scheduler import FetchScheduler
+
+URL = "https://a.com/pagina"
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class FakeRandom:
+    """Sorteia sempre o limite inferior (sem espera) e registra os intervalos pedidos."""
+    def __init__(self):
+        self.ranges = []
+
+    def uniform(self, low, high):
+        self.ranges.append((low, high))
+        return low
+
+class FakeRequest:
+    """`request(timeout)` falso: cada chamada devolve (ou levanta) o próximo item da lista."""
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+
+    async def __call__(self, timeout):
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, asyncio.Event):
+            await outcome.wait()
+            outcome = 200
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome, f"corpo-{len(self.timeouts)}"
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(resilience_module, "time", fake)
+    return fake
+
+@pytest.fixture
+def jitter(monkeypatch):
+    fake = FakeRandom()
+    monkeypatch.setattr(resilience_module, "random", fake)
+    return fake
+
+@pytest.fixture
+def resilience(clock, jitter, monkeypatch):
+    monkeypatch.setattr(resilience_module, "fetch_scheduler", FetchScheduler(rate=1000, burst=1000, concurrency=4))
+    for name, value in {
+        "FETCH_MIN_TIMEOUT": 5, "FETCH_MAX_TIMEOUT": 20, "FETCH_TIMEOUT_FACTOR": 3, "FETCH_MIN_SAMPLES": 5,
+        "FETCH_RETRIES": 2, "FETCH_RETRY_BASE": 0.5, "FETCH_RETRY_MAX": 5, "FETCH_HEDGE": False,
+        "FETCH_HEDGE_BUDGET": 0.1, "FETCH_BREAKER_THRESHOLD": 3, "FETCH_BREAKER_COOLDOWN": 60,
+        "FETCH_BREAKER_MAX_COOLDOWN": 900,
+    }.items():
+        monkeypatch.setattr(resilience_module, name, value)
+    return FetchResilience()
+
+def _observe(resilience, host, latencies):
+    for latency in latencies:
+        resilience._record(host, True, latency)
+
+def test_timeout_follows_host_p95(resilience):
+    # Sem histórico: timeout máximo
+    assert resilience.timeout("a.com") == 20
+    _observe(resilience, "a.com", [1.0] * 4)
+    assert resilience.timeout("a.com") == 20
+
+    _observe(resilience, "a.com", [1.0] * 15 + [4.0])
+    assert resilience.timeout("a.com") == 12  # p95 = 4s × 3
+    _observe(resilience, "a.com", [1.0] * 20)
+    assert resilience.timeout("a.com") == 5  # 1s × 3, elevado ao mínimo
+
+def test_timeout_is_clamped_and_falls_back_to_global_p95(resilience):
+    # Host novo: usa o p95 global (todas as amostras observadas)
+    _observe(resilience, "b.com", [2.0] * 45)
+    assert resilience.timeout("novo.com") == 6
+
+    _observe(resilience, "lento.com", [10.0] * 5)
+    assert resilience.timeout("lento.com") == 20
+
+def test_timeout_is_recorded_as_censored_sample(resilience):
+    request = FakeRequest(*[asyncio.TimeoutError()] * 3)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(resilience.fetch(URL, request))
+    assert request.timeouts == [20, 20, 20]
+    assert list(resilience._health("a.com").latencies) == [20, 20, 20]
+    assert resilience.counters["timeouts"] == 3
+
+def test_retry_delay_uses_full_jitter_with_capped_exponential(resilience, jitter):
+    for attempt in range(6):
+        resilience.retry_delay(attempt)
+
+    assert jitter.ranges == [(0, 0.5), (0, 1.0), (0, 2.0), (0, 4.0), (0, 5), (0, 5)]
+
+def test_transient_failures_are_retried_with_jitter(resilience, jitter):
+    request = FakeRequest(502, aiohttp.ClientConnectionError(), 200)
+
+    assert asyncio.run(resilience.fetch(URL, request)) == (200, "corpo-3")
+    assert resilience.counters["retries"] == 2
+    assert jitter.ranges == [(0, 0.5), (0, 1.0)]
+
+def test_retries_are_limited(resilience):
+    request = FakeRequest(500, 500, 500, 200)
+
+    assert asyncio.run(resilience.fetch(URL, request)) == (500, "corpo-3")
+    assert request.outcomes == [200]
+
+    # Erros que não são transitórios não são repetidos
+    request = FakeRequest(404, 200)
+    assert asyncio.run(resilience.fetch("https://b.com/pagina", request)) == (404, "corpo-1")
+    assert request.outcomes == [200]
+
+def _hedge_run(resilience, monkeypatch, request, concurrency=4, release=None):
+    """Roda o fetch com hedge ligado e p95 de 10ms; `release` é liberado 50ms depois."""
+    monkeypatch.setattr(resilience_module, "FETCH_HEDGE", True)
+    monkeypatch.setattr(resilience_module, "fetch_scheduler", FetchScheduler(rate=1000, burst=1000, concurrency=concurrency))
+    _observe(resilience, "a.com", [0.01] * 20)
+
+    async def run():
+        if release is not None:
+            asyncio.get_running_loop().call_later(0.05, release.set)
+        return await resilience.fetch(URL, request)
+
+    return asyncio.run(run())
+
+def test_slow_request_is_hedged_and_fastest_wins(resilience, monkeypatch):
+    request = FakeRequest(asyncio.Event(), 200)
+
+    assert _hedge_run(resilience, monkeypatch, request) == (200, "corpo-2")
+    assert resilience.counters["hedged"] == 1
+    assert resilience.counters["hedge_wins"] == 1
+    assert resilience.counters["attempts"] == 2
+
+def test_fast_request_is_not_hedged(resilience, monkeypatch):
+    assert _hedge_run(resilience, monkeypatch, FakeRequest(200)) == (200, "corpo-1")
+    assert resilience.counters["hedged"] == 0
+
+def test_hedge_respects_budget(resilience, monkeypatch):
+    resilience.counters["hedged"] = 1
+    stalled = asyncio.Event()
+
+    assert _hedge_run(resilience, monkeypatch, FakeRequest(stalled), release=stalled) == (200, "corpo-1")
+    assert resilience.counters["hedged"] == 1
+    assert resilience.counters["attempts"] == 1
+
+def test_hedge_needs_a_free_host_slot(resilience, monkeypatch):
+    stalled = asyncio.Event()
+
+    assert _hedge_run(resilience, monkeypatch, FakeRequest(stalled), concurrency=1, release=stalled) == (200, "corpo-1")
+    assert resilience.counters["hedged"] == 0
+
+def test_circuit_opens_then_half_open_probe_decides(resilience, clock, monkeypatch):
+    monkeypatch.setattr(resilience_module, "FETCH_RETRIES", 0)
+
+    def fetch(*outcomes):
+        return asyncio.run(resilience.fetch(URL, FakeRequest(*outcomes)))
+
+    for _ in range(3):
+        assert fetch(500)[0] == 500
+    with pytest.raises(CircuitOpenError) as error:
+        fetch(200)
+    assert error.value.retry_in == 60
+
+    # Pausa vencida: uma única requisição de teste; as demais falham na hora
+    clock.advance(60)
+    probe = asyncio.Event()
+
+    async def probe_and_concurrent():
+        probing = asyncio.ensure_future(resilience.fetch(URL, FakeRequest(probe)))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await resilience.fetch(URL, FakeRequest(200))
+        probe.set()
+        return await probing
+
+    # Teste aprovado: o circuito fecha
+    assert asyncio.run(probe_and_concurrent())[0] == 200
+    assert resilience._health("a.com").failures == 0
+    assert fetch(200)[0] == 200
+    assert resilience.counters["fast_failures"] == 2
+
+def test_failed_probe_reopens_with_doubled_cooldown(resilience, clock, monkeypatch):
+    monkeypatch.setattr(resilience_module, "FETCH_RETRIES", 0)
+
+    def fetch(*outcomes):
+        return asyncio.run(resilience.fetch(URL, FakeRequest(*outcomes)))
+
+    for _ in range(3):
+        fetch(500)
+    clock.advance(60)
+    assert fetch(502)[0] == 502
+
+    with pytest.raises(CircuitOpenError) as error:
+        fetch(200)
+    assert error.value.retry_in == 120
+    clock.advance(120)
+    assert fetch(200)[0] == 200
+    assert resilience._health("a.com").cooldown == 60
+    assert resilience.counters["circuit_open"] == 2
+
+def test_cancelled_probe_frees_the_half_open_slot(resilience, clock, monkeypatch):
+    monkeypatch.setattr(resilience_module, "FETCH_RETRIES", 0)
+    for _ in range(3):
+        asyncio.run(resilience.fetch(URL, FakeRequest(500)))
+    clock.advance(60)
+
+    async def cancel_probe():
+        probing = asyncio.ensure_future(resilience.fetch(URL, FakeRequest(asyncio.Event())))
+        await asyncio.sleep(0)
+        probing.cancel()
+        await asyncio.gather(probing, return_exceptions=True)
+        return await resilience.fetch(URL, FakeRequest(200))
+
+    assert asyncio.run(cancel_probe())[0] == 200
@@ -0,0 +1,273 @@
+import asyncio
+import math
+from contextlib import AsyncExitStack
+
+import pytest
+from aiohttp import web
+
+from app.agents.content_extractor_v2 import ContentExtractorV2
+from app.tools import extraction_tools, fetch_scheduler as scheduler_module
+from app.tools.fetch_scheduler import FetchScheduler, HostQueue, HostThrottledError
+from app.utils.http_client import http_client
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(scheduler_module, "time", fake)
+    return fake
+
+async def _take(scheduler, url, times):
+    """Consome `times` requisições do host, uma de cada vez."""
+    for _ in range(times):
+        async with scheduler.slot(url):
+            pass
+
+def test_token_bucket_allows_burst_then_refills_at_rate(clock):
+    scheduler = FetchScheduler(rate=2, burst=3, concurrency=10)
+    asyncio.run(_take(scheduler, "https://a.com/1", 3))
+
+    assert scheduler.delay("a.com") == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert scheduler.delay("a.com") == 0
+    # Parado por muito tempo, o bucket enche só até a rajada
+    clock.advance(60)
+    asyncio.run(_take(scheduler, "https://a.com/1", 3))
+    assert scheduler.delay("a.com") > 0
+    assert scheduler.counters["waits"] == 0
+
+def test_concurrency_cap_per_host(clock):
+    scheduler = FetchScheduler(rate=100, burst=100, concurrency=2)
+
+    async def run():
+        async with AsyncExitStack() as stack:
+            await stack.enter_async_context(scheduler.slot("https://a.com/1"))
+            await stack.enter_async_context(scheduler.slot("https://www.a.com/2"))
+            assert math.isinf(scheduler.delay("a.com"))
+            assert scheduler.delay("b.com") == 0
+            assert scheduler.stats()["in_flight"] == 2
+        assert scheduler.delay("a.com") == 0
+
+    asyncio.run(run())
+
+def test_throttle_blocks_host_and_halves_rate(clock):
+    scheduler = FetchScheduler(rate=2, burst=3, concurrency=2)
+
+    scheduler.report("https://a.com/1", 429, "10")
+    assert scheduler.blocked_for("a.com") == pytest.approx(10)
+    assert scheduler.delay("a.com") == pytest.approx(10)
+    assert scheduler._hosts["a.com"].rate == 1
+    assert scheduler.blocked_for("b.com") == 0
+
+    clock.advance(10)
+    # Sem Retry-After, a pausa cresce exponencialmente
+    scheduler.report("https://a.com/1", 503)
+    assert scheduler.blocked_for("a.com") == pytest.approx(4)
+
+    clock.advance(4)
+    scheduler.report("https://a.com/1", 200)
+    assert scheduler.blocked_for("a.com") == 0
+    assert scheduler._hosts["a.com"].rate == pytest.approx(0.7)
+    assert scheduler._hosts["a.com"].failures == 0
+
+def test_host_queue_interleaves_hosts(clock):
+    scheduler = FetchScheduler(rate=100, burst=100, concurrency=10)
+    queue = HostQueue(scheduler)
+    for url in ("https://a.com/1", "https://a.com/2", "https://a.com/3", "https://b.com/1", "https://b.com/2", "https://c.com/1"):
+        queue.add(url)
+    queue.close()
+
+    async def drain():
+        order = []
+        while (url := await queue.next()) is not None:
+            order.append(url)
+            queue.done(url)
+        return order
+
+    assert asyncio.run(drain()) == [
+        "https://a.com/1", "https://b.com/1", "https://c.com/1", "https://a.com/2", "https://b.com/2", "https://a.com/3",
+    ]
+
+def test_host_queue_skips_blocked_and_busy_hosts(clock):
+    scheduler = FetchScheduler(rate=100, burst=100, concurrency=1)
+    queue = HostQueue(scheduler)
+    for url in ("https://a.com/1", "https://b.com/1", "https://b.com/2", "https://c.com/1"):
+        queue.add(url)
+    scheduler.report("https://a.com/0", 429, "30")
+
+    async def run():
+        first = await queue.next()
+        # b.com já tem uma URL em andamento e a.com está em pausa: a vez é de c.com
+        second = await queue.next()
+        return first, second
+
+    assert asyncio.run(run()) == ("https://b.com/1", "https://c.com/1")
+
+def _robots_app(hits, routes):
+    async def robots(request):
+        hits.append(request.path)
+        status, body = routes["robots"]
+        return web.Response(status=status, text=body)
+    app = web.Application()
+    app.router.add_get("/robots.txt", robots)
+    return app
+
+def _check_robots(monkeypatch, status, body, paths, port_open=True):
+    """Consulta o robots.txt servido localmente para cada caminho; devolve (respostas, acessos, scheduler)."""
+    monkeypatch.setattr(scheduler_module, "FETCH_RESPECT_ROBOTS", True)
+    scheduler = FetchScheduler(rate=2, burst=3, concurrency=2)
+    hits = []
+
+    async def run():
+        runner = web.AppRunner(_robots_app(hits, {"robots": (status, body)}))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        if not port_open:
+            await runner.cleanup()
+        try:
+            return [await scheduler.allowed(f"http://127.0.0.1:{port}{path}") for path in paths]
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+
+    return asyncio.run(run()), hits, scheduler
+
+def test_robots_rules_are_cached_and_crawl_delay_lowers_rate(monkeypatch):
+    body = "User-agent: *\nDisallow: /privado\nCrawl-delay: 4\n"
+    answers, hits, scheduler = _check_robots(monkeypatch, 200, body, ["/publico", "/privado/a", "/outro"])
+
+    assert answers == [True, False, True]
+    assert hits == ["/robots.txt"]
+    assert scheduler.counters["robots_blocked"] == 1
+    state = next(iter(scheduler._hosts.values()))
+    assert state.rate == 0.25
+    # O crawl-delay também limita a recuperação da taxa após sucessos
+    scheduler.report(f"http://{next(iter(scheduler._hosts))}/publico", 200)
+    assert state.rate == 0.25
+
+@pytest.mark.parametrize("status, expected", [(403, False), (401, False), (404, True), (500, True)])
+def test_robots_status_conventions(monkeypatch, status, expected):
+    answers, _, _ = _check_robots(monkeypatch, status, "", ["/qualquer"])
+
+    assert answers == [expected]
+
+def test_unreachable_robots_allows_and_retries_soon(monkeypatch):
+    answers, _, scheduler = _check_robots(monkeypatch, 200, "", ["/a"], port_open=False)
+
+    assert answers == [True]
+    state = next(iter(scheduler._hosts.values()))
+    assert state.robots_expires <= scheduler_module.time.time() + 300
+
+@pytest.fixture
+def throttled_fetch(clock, monkeypatch):
+    """Fetch falso: responde com os (status, Retry-After) da lista, avisando o scheduler."""
+    scheduler = FetchScheduler()
+    responses, calls = [], []
+
+    async def fetch(url, request):
+        status, retry_after = responses.pop(0)
+        calls.append(url)
+        scheduler.report(url, status, retry_after)
+        return status, ({}, None)
+
+    async def allowed(url):
+        return True
+
+    async def lookup(url):
+        return None
+
+    monkeypatch.setattr(scheduler, "allowed", allowed)
+    monkeypatch.setattr(extraction_tools, "fetch_scheduler", scheduler)
+    monkeypatch.setattr(extraction_tools.fetch_resilience, "fetch", fetch)
+    monkeypatch.setattr(extraction_tools.page_cache, "lookup", lookup)
+    monkeypatch.setattr(extraction_tools, "FETCH_THROTTLE_RETRIES", 1)
+    monkeypatch.setattr(extraction_tools, "FETCH_THROTTLE_WAIT", 5)
+    return responses, calls
+
+def test_short_throttle_is_retried_in_place(throttled_fetch):
+    responses, calls = throttled_fetch
+    responses.extend([(429, "2"), (404, None)])
+
+    assert asyncio.run(extraction_tools.extract_content_robust("https://a.com/1")) is None
+    assert len(calls) == 2
+
+def test_long_throttle_is_handed_back_to_the_caller(throttled_fetch):
+    responses, calls = throttled_fetch
+    responses.append((429, "120"))
+
+    with pytest.raises(HostThrottledError) as error:
+        asyncio.run(extraction_tools.extract_content_robust("https://a.com/1"))
+    assert error.value.host == "a.com"
+    assert error.value.retry_in == pytest.approx(120)
+    assert len(calls) == 1
+
+@pytest.fixture
+def extractor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ContentExtractorV2, "MAX_CONCURRENT_EXTRACTIONS", 2)
+    return ContentExtractorV2("s1", "papel", "objetivo", [], [])
+
+def _run_with(extractor, monkeypatch, urls, outcome):
+    """Roda os workers sobre as URLs, com `outcome(url, tentativa)` no lugar da extração."""
+    attempts = {}
+
+    async def extract(url):
+        attempts[url] = attempts.get(url, 0) + 1
+        return outcome(url, attempts[url])
+
+    async def accept(url, result):
+        return result
+
+    monkeypatch.setattr(extraction_tools, "extract_content_robust", extract)
+    monkeypatch.setattr(extractor, "_accept", accept)
+    queue = HostQueue(FetchScheduler(rate=100, burst=100))
+    for url in urls:
+        queue.add(url)
+    queue.close()
+    return asyncio.run(extractor._run_workers(queue)), attempts
+
+def test_throttled_url_is_requeued_without_blocking_others(extractor, monkeypatch):
+    def outcome(url, attempt):
+        if url == "https://a.com/1" and attempt == 1:
+            raise HostThrottledError("a.com", 30)
+        return {"url": url}
+
+    data, attempts = _run_with(extractor, monkeypatch, ["https://a.com/1", "https://b.com/1"], outcome)
+
+    assert sorted(item["url"] for item in data) == ["https://a.com/1", "https://b.com/1"]
+    assert attempts == {"https://a.com/1": 2, "https://b.com/1": 1}
+
+def test_throttled_url_is_dropped_after_requeue_limit(extractor, monkeypatch):
+    monkeypatch.setattr("app.agents.content_extractor_v2.FETCH_THROTTLE_REQUEUES", 2)
+    failed = []
+    monkeypatch.setattr(extractor, "emit", lambda event, **data: failed.append(data["url"]))
+
+    def outcome(url, attempt):
+        raise HostThrottledError("a.com", 30)
+
+    data, attempts = _run_with(extractor, monkeypatch, ["https://a.com/1"], outcome)
+
+    assert data == [] and failed == ["https://a.com/1"]
+    assert attempts == {"https://a.com/1": 3}
+
+def test_very_long_throttle_is_dropped_at_once(extractor, monkeypatch):
+    def outcome(url, attempt):
+        raise HostThrottledError("a.com", 3600)
+
+    data, attempts = _run_with(extractor, monkeypatch, ["https://a.com/1"], outcome)
+
+    assert data == [] and attempts == {"https://a.com/1": 1}
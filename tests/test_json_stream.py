@@ -0,0 +1,68 @@
+import json
+
+from app.utils.json_stream import IncrementalJSONParser
+
+def _feed_all(chunks, key="search_queries"):
+    parser = IncrementalJSONParser(key)
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return parser, items
+
+def test_escaped_quotes_and_backslashes():
+    document = {"search_queries": ['preço "médio" 2025', "C:\\dados\\mercado", "a\\\"b"]}
+    _, items = _feed_all([json.dumps(document)])
+
+    assert items == document["search_queries"]
+
+def test_unicode_escapes():
+    _, items = _feed_all(['{"search_queries": ["an\\u00e1lise", "\\ud83d\\ude80 foguete"]}'])
+
+    assert items == ["análise", "🚀 foguete"]
+
+def test_items_split_across_chunks():
+    text = json.dumps({"search_queries": ['tendências "varejo"', "caf\u00e9 \\ especial"]}, ensure_ascii=False)
+    document = json.dumps({"search_queries": ["a\\u00e9", "x"]})
+    for source in (text, document):
+        expected = json.loads(source)["search_queries"]
+        # Um caractere por pedaço: corta escapes e \uXXXX no meio
+        _, items = _feed_all(list(source))
+        assert items == expected
+
+def test_items_released_before_document_ends():
+    parser = IncrementalJSONParser("search_queries")
+
+    assert parser.feed('{"search_queries": ["primeira", "segu') == ["primeira"]
+    assert parser.feed('nda"') == ["segunda"]
+
+def test_nested_key_is_not_emitted():
+    document = {
+        "meta": {"search_queries": ["aninhada"]},
+        "team": [{"search_queries": ["no time"]}],
+        "search_queries": ["raiz"],
+    }
+    _, items = _feed_all([json.dumps(document)])
+
+    assert items == ["raiz"]
+
+def test_other_keys_and_values_are_not_emitted():
+    _, items = _feed_all(['{"goal": "search_queries", "screenshot_targets": ["https://a"], "search_queries": ["q"]}'])
+
+    assert items == ["q"]
+
+def test_truncated_stream_emits_only_complete_items():
+    parser, items = _feed_all(['{"search_queries": ["completa", "cort'])
+
+    assert items == ["completa"]
+    assert parser.text() == '{"search_queries": ["completa", "cort'
+
+def test_text_around_object_is_ignored():
+    _, items = _feed_all(['```json\n{"search_queries": ["q1"]}\n```\n["depois"]'])
+
+    assert items == ["q1"]
+
+def test_bad_items_do_not_abort_the_stream():
+    # Quebra de linha crua e escape inválido dentro das strings
+    _, items = _feed_all(['{"search_queries": ["linha\nquebrada", "escape \\x inválido", "ok"]}'])
+
+    assert items == ["linha\nquebrada", "ok"]
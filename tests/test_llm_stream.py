@@ -0,0 +1,39 @@
+import asyncio
+
+from app.utils import llm_interface
+from app.utils.llm_interface import LLMInterface
+
+PROMPT = "Crie um plano para o tópico: 'café especial'"
+
+def _run_stream(monkeypatch, stream_request):
+    async def no_cache(key):
+        return None
+
+    monkeypatch.setattr(llm_interface, "LLM_STREAMING", True)
+    monkeypatch.setattr(llm_interface.api_rotator, "has_keys", lambda service: True)
+    monkeypatch.setattr(llm_interface.llm_cache, "get", no_cache)
+    monkeypatch.setattr(LLMInterface, "_stream_request", stream_request)
+    received = []
+    plan = asyncio.run(LLMInterface().stream_json(PROMPT, "search_queries", received.append))
+    return plan, received
+
+def test_failed_stream_keeps_items_already_emitted(monkeypatch):
+    async def fails_midway(self, prompt, response_format, cache_key, stream_key, on_item):
+        on_item("café especial preços")
+        on_item("café especial exportação")
+        return None
+
+    plan, received = _run_stream(monkeypatch, fails_midway)
+
+    assert received == ["café especial preços", "café especial exportação"]
+    assert plan["search_queries"] == received
+    assert plan["team"]
+
+def test_failed_stream_without_items_uses_local_plan(monkeypatch):
+    async def fails_at_once(self, prompt, response_format, cache_key, stream_key, on_item):
+        return None
+
+    plan, received = _run_stream(monkeypatch, fails_at_once)
+
+    assert len(received) == 5
+    assert plan["search_queries"] == received
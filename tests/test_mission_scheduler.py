@@ -0,0 +1,106 @@
+import asyncio
+import itertools
+
+import pytest
+
+from app.core import mission_scheduler as scheduler_module
+from app.core.mission_scheduler import MissionScheduler, QueueFullError
+
+class FakeController:
+    """Registra a ordem de despacho; as missões só terminam quando `finish` é sinalizado."""
+    def __init__(self):
+        self.ids = itertools.count()
+        self.started = []
+        self.finish = asyncio.Event()
+
+    def new_session_id(self) -> str:
+        return f"session_{next(self.ids):04d}"
+
+    async def start_mission(self, user_request, session_id=None):
+        self.started.append(user_request["topic"])
+        await self.finish.wait()
+
+@pytest.fixture(autouse=True)
+def _in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def _dispatch_order(submissions):
+    """Enfileira tudo antes de o worker (um slot) rodar e devolve a ordem de início."""
+    async def run():
+        controller = FakeController()
+        controller.finish.set()
+        scheduler = MissionScheduler(controller, concurrency=1, max_queue=100)
+        for topic, user, priority in submissions:
+            scheduler.submit({"topic": topic, "user_id": user}, priority=priority)
+        while len(controller.started) < len(submissions):
+            await asyncio.sleep(0)
+        await scheduler.close()
+        return controller.started
+    return asyncio.run(run())
+
+def test_higher_priority_runs_first():
+    order = _dispatch_order([("baixa", "u1", 0), ("alta", "u2", 9), ("media", "u3", 5), ("alta2", "u4", 9)])
+
+    assert order == ["alta", "alta2", "media", "baixa"]
+
+def test_round_robin_between_users():
+    submissions = [(f"a{i}", "ana", 0) for i in range(4)] + [("b0", "bia", 0), ("b1", "bia", 0), ("c0", None, 0)]
+    order = _dispatch_order(submissions)
+
+    assert order == ["a0", "b0", "c0", "a1", "b1", "a2", "a3"]
+
+def test_round_robin_inside_each_priority():
+    submissions = [("a0", "ana", 0), ("a1", "ana", 0), ("b0", "bia", 0), ("a_vip0", "ana", 5), ("a_vip1", "ana", 5), ("b_vip0", "bia", 5)]
+    order = _dispatch_order(submissions)
+
+    assert order == ["a_vip0", "b_vip0", "a_vip1", "a0", "b0", "a1"]
+
+def test_concurrency_limits_running_missions():
+    async def run():
+        controller = FakeController()
+        scheduler = MissionScheduler(controller, concurrency=2, max_queue=10)
+        ids = [scheduler.submit({"topic": f"t{i}"}) for i in range(5)]
+        for _ in range(10):
+            await asyncio.sleep(0)
+        stats = scheduler.stats()
+        positions = [scheduler.queue_position(i) for i in ids]
+        await scheduler.close()
+        return controller.started, stats, positions
+
+    started, stats, positions = asyncio.run(run())
+    assert started == ["t0", "t1"]
+    assert stats == {"queued": 3, "running": 2, "slots": 2, "max_queue": 10}
+    assert positions == [None, None, 1, 2, 3]
+
+def test_full_queue_raises_with_retry_after():
+    async def run():
+        scheduler = MissionScheduler(FakeController(), concurrency=2, max_queue=2)
+        scheduler.submit({"topic": "a"})
+        scheduler.submit({"topic": "b"})
+        scheduler._durations.extend([30.0, 50.0])
+        with pytest.raises(QueueFullError) as error:
+            scheduler.submit({"topic": "c"})
+        await scheduler.close()
+        return error.value
+
+    error = asyncio.run(run())
+    # Média de 40s com 2 slots: uma vaga a cada ~20s
+    assert error.retry_after == 20
+
+def test_retry_after_uses_default_without_history(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "MISSION_DEFAULT_DURATION", 90.0)
+    scheduler = MissionScheduler(FakeController(), concurrency=4, max_queue=0)
+
+    assert scheduler.estimate_retry_after() == 23
+
+def test_start_research_returns_429_with_retry_after(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    scheduler = MissionScheduler(FakeController(), concurrency=1, max_queue=0)
+    scheduler._durations.append(12.0)
+    monkeypatch.setattr(main, "mission_scheduler", scheduler)
+
+    response = TestClient(main.app).post("/start-research", json={"topic": "café", "user_id": "ana"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "12"
@@ -0,0 +1,98 @@
+import asyncio
+import random
+
+import pytest
+
+from app.agents.content_extractor_v2 import ContentExtractorV2
+from app.utils import near_duplicates
+from app.utils.near_duplicates import MIN_WORDS, NearDuplicateIndex, PersistentNearDuplicateIndex, simhash
+from app.utils.parser_pool import parser_pool
+
+VOCABULARY = [f"termo{i}" for i in range(2000)]
+
+def _article(seed: int, words: int = 300) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+def _distance(a: str, b: str) -> int:
+    return (simhash(a) ^ simhash(b)).bit_count()
+
+ARTICLE = _article(1)
+# Mesma matéria em outro portal: cabeçalho, rodapé e duas palavras trocadas
+SYNDICATED = "Portal Notícias | Início Contato " + ARTICLE.replace("termo1 ", "alterado ", 2) + " Todos os direitos reservados"
+
+def test_simhash_is_a_stable_64_bit_value():
+    fingerprint = simhash(ARTICLE)
+
+    assert 0 <= fingerprint < 2 ** 64
+    assert fingerprint.bit_length() > 32
+    assert simhash(ARTICLE) == fingerprint
+    assert simhash(ARTICLE.upper()) == fingerprint
+
+def test_short_texts_have_no_fingerprint():
+    assert simhash(_article(1, MIN_WORDS - 1)) is None
+    assert simhash(_article(1, MIN_WORDS)) is not None
+    assert simhash("") is None
+
+def test_near_duplicate_pairs_are_close():
+    assert _distance(ARTICLE, SYNDICATED) <= near_duplicates.NEAR_DUP_MAX_DISTANCE
+
+@pytest.mark.parametrize("seed", range(5))
+def test_distinct_texts_are_far_apart(seed):
+    assert _distance(_article(seed), _article(seed + 100)) > 16
+
+@pytest.mark.parametrize("max_distance", [3, 6, 7, 10])
+def test_index_threshold(max_distance):
+    rng = random.Random(max_distance)
+    index = NearDuplicateIndex(max_distance)
+    base = rng.getrandbits(64)
+    index.add(base, "original")
+
+    def flipped(bits: int) -> int:
+        value = base
+        for position in rng.sample(range(64), bits):
+            value ^= 1 << position
+        return value
+
+    for _ in range(50):
+        assert index.find(flipped(max_distance)) == "original"
+        assert index.find(flipped(max_distance + 1)) is None
+    assert NearDuplicateIndex(max_distance).find(base) is None
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(parser_pool, "workers", 0)
+    monkeypatch.setattr(near_duplicates, "NEAR_DUP_ENABLED", True)
+    monkeypatch.setattr(near_duplicates, "global_index", None)
+    return lambda session_id="s1": ContentExtractorV2(session_id, "papel", "objetivo", [], [])
+
+def _accept(extractor, url: str, content: str):
+    return asyncio.run(extractor._accept(url, {"url": url, "content": content}))
+
+def test_near_duplicate_is_dropped_and_listed_on_kept_item(agent):
+    extractor = agent()
+    kept = _accept(extractor, "https://a.com/materia", ARTICLE)
+
+    assert _accept(extractor, "https://b.com/copia", SYNDICATED) is None
+    assert _accept(extractor, "https://c.com/outra", _article(2)) is not None
+    assert kept["near_duplicates"] == ["https://b.com/copia"]
+
+def test_short_texts_are_never_dropped(agent):
+    extractor = agent()
+    short = _article(1, MIN_WORDS - 1)
+
+    assert _accept(extractor, "https://a.com/nota", short) is not None
+    assert _accept(extractor, "https://b.com/nota", short) is not None
+
+def test_page_dropped_by_global_index_is_not_indexed(agent, tmp_path, monkeypatch):
+    monkeypatch.setattr(near_duplicates, "global_index", PersistentNearDuplicateIndex(str(tmp_path / "index.sqlite3")))
+    assert _accept(agent("s1"), "https://a.com/materia", ARTICLE) is not None
+
+    second = agent("s2")
+    assert _accept(second, "https://b.com/copia", SYNDICATED) is None
+    assert second.fingerprints.find(simhash(SYNDICATED)) is None
+    # A cópia seguinte é atribuída ao original da outra sessão, não à página descartada
+    assert _accept(second, "https://c.com/copia", ARTICLE) is None
+    kept = _accept(second, "https://d.com/outra", _article(3))
+    assert kept is not None and "near_duplicates" not in kept
@@ -0,0 +1,46 @@
+import asyncio
+import cProfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.utils.tracer import Trace, tracer
+
+SESSION = "session_" + "ab" * 16
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    trace = Trace(SESSION, profiled=True)
+    profile = cProfile.Profile()
+    profile.enable()
+    sum(range(100))
+    profile.disable()
+    trace.keep_profile(0.5, "extraction", profile)
+    asyncio.run(tracer.save(trace))
+    (tmp_path / "sessions" / "segredo.txt").write_text("não servir")
+    return TestClient(main.app)
+
+def test_saved_trace_and_profile_are_served(client):
+    trace = client.get(f"/research-trace/{SESSION}")
+    assert trace.status_code == 200
+    assert trace.json()["otherData"]["profiles"] == {"extraction": "profile_extraction.txt"}
+
+    profile = client.get(f"/research-trace/{SESSION}/profiles/extraction")
+    assert profile.status_code == 200
+    assert profile.text.startswith("Duração da etapa: 0.500s")
+
+@pytest.mark.parametrize("session_id", ["..", "session_123", "SESSION_" + "ab" * 16, "session_" + "AB" * 16])
+def test_malformed_session_id_is_rejected(client, session_id):
+    assert client.get(f"/research-trace/{session_id}").status_code == 404
+    assert client.get(f"/research-trace/{session_id}/profiles/extraction").status_code == 404
+
+@pytest.mark.parametrize("stage", ["search", "..%2Fsegredo", "..%2F..%2Fsessions%2Fsegredo"])
+def test_only_stages_listed_in_the_trace_are_served(client, stage):
+    assert client.get(f"/research-trace/{SESSION}/profiles/{stage}").status_code == 404
+
+def test_profile_of_unknown_session_is_not_found(client):
+    other = "session_" + "cd" * 16
+    assert client.get(f"/research-trace/{other}").status_code == 404
+    assert client.get(f"/research-trace/{other}/profiles/extraction").status_code == 404
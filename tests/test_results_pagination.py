@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from app.main import _build_results, _page_windows
+from app.utils import data_saver
+from app.utils.data_saver import DataSaver, LOG_FILENAME
+from app.utils.response_stream import decode_cursor
+
+SESSION = "0123abcd"
+EXTRACTED = [{"url": f"https://example.com/{i}", "content": "texto"} for i in range(50)]
+SHOTS = [f"shot-{i}" for i in range(3)]
+
+@pytest.fixture
+def saver(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_saver, "DATASAVER_FSYNC", False)
+    saver = DataSaver(mode="delta", snapshot_every=2)
+
+    async def run():
+        # Listas crescendo ao longo das etapas, como numa missão (registros "extend")
+        state = {"query": "teste", "extracted_data": [], "screenshot_results": []}
+        for end in (15, 33, 50):
+            state["extracted_data"].extend(EXTRACTED[len(state["extracted_data"]):end])
+            await saver.save_state(SESSION, f"extract_{end}", state)
+        state["screenshot_results"].extend(SHOTS)
+        await saver.save_state(SESSION, "screenshots", state)
+        await saver.close_session(SESSION)
+
+    asyncio.run(run())
+    return saver
+
+def _walk(saver, limit, item_keys=None):
+    """Percorre os cursores até o fim e devolve as páginas recebidas."""
+    pages, offsets = [], {}
+    while True:
+        state, totals = saver.load_page(SESSION, _page_windows(limit, offsets))
+        pages.append(_build_results(state, totals, item_keys, limit, offsets))
+        if pages[-1]["next_cursor"] is None:
+            return pages
+        offsets = decode_cursor(pages[-1]["next_cursor"])
+
+@pytest.mark.parametrize("limit", [1, 7, 20, 50, 500])
+def test_cursor_returns_each_item_once(saver, limit):
+    pages = _walk(saver, limit)
+
+    assert len(pages) == max(1, -(-50 // limit))
+    assert [item for page in pages for item in page["extracted_data"]] == EXTRACTED
+    assert [item for page in pages for item in page["screenshot_results"]] == SHOTS
+    assert all(page["page"]["totals"] == {"extracted_data": 50, "screenshot_results": 3} for page in pages)
+    assert all(page["query"] == "teste" for page in pages)
+
+def test_page_holds_only_its_window(saver):
+    state, totals = saver.load_page(SESSION, _page_windows(20, {"extracted_data": 20}))
+
+    assert state["extracted_data"] == EXTRACTED[20:40]
+    assert state["screenshot_results"] == SHOTS
+    assert totals == {"extracted_data": 50, "screenshot_results": 3}
+
+def test_item_fields_projection(saver):
+    pages = _walk(saver, 20, item_keys=["url"])
+
+    assert pages[0]["extracted_data"][0] == {"url": "https://example.com/0"}
+
+def test_page_after_list_is_replaced(saver):
+    # Um "set" (lista substituída) reinicia a contagem da janela
+    with open(os.path.join("sessions", SESSION, LOG_FILENAME), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"seq": 99, "step": "filter", "set": {"extracted_data": EXTRACTED[:5]}}) + "\n")
+
+    state, totals = saver.load_page(SESSION, _page_windows(3, {"extracted_data": 3}))
+    assert state["extracted_data"] == EXTRACTED[3:5]
+    assert totals["extracted_data"] == 5
+
+def test_without_limit_returns_everything(saver):
+    state, totals = saver.load_page(SESSION, _page_windows(None, {}))
+    document = _build_results(state, totals, None, None, {})
+
+    assert document["extracted_data"] == EXTRACTED
+    assert "next_cursor" not in document
+    assert document == {**saver.load_state(SESSION)}
+
+def test_legacy_sessions_are_paginated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    legacy = DataSaver(mode="snapshot")
+    asyncio.run(legacy.save_state(SESSION, "final", {"extracted_data": EXTRACTED, "screenshot_results": SHOTS}))
+
+    pages = _walk(legacy, 20)
+    assert [item for page in pages for item in page["extracted_data"]] == EXTRACTED
+    assert [item for page in pages for item in page["screenshot_results"]] == SHOTS
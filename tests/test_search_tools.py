@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from app.tools import search_tools
+from app.utils.api_rotator import APIRotator
+from app.utils.http_client import http_client
+from app.utils.response_cache import ResponseCache
+
+def _serper_app(calls, statuses):
+    async def search(request):
+        calls.append((request.headers["X-API-KEY"], (await request.json())["q"]))
+        status = statuses.get(request.headers["X-API-KEY"], 200)
+        if status != 200:
+            return web.json_response({"message": "erro"}, status=status)
+        return web.json_response({"organic": [
+            {"title": "Café no Brasil", "link": "https://cafe.example/a", "snippet": "..."},
+            {"title": "Sem link"},
+        ]})
+    app = web.Application()
+    app.router.add_post("/search", search)
+    return app
+
+def _search(monkeypatch, keys, statuses=None, query="café especial", cache=None):
+    calls = []
+
+    async def run():
+        runner = web.AppRunner(_serper_app(calls, statuses or {}))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(search_tools, "SERPER_BASE_URL", f"http://127.0.0.1:{port}")
+        try:
+            return await search_tools.search_web_robust(query)
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+
+    monkeypatch.setattr(search_tools, "api_rotator", APIRotator({"serper": keys}))
+    if cache is not None:
+        monkeypatch.setitem(search_tools.search_caches, "web", cache)
+    else:
+        for provider_cache in search_tools.search_caches.values():
+            monkeypatch.setattr(provider_cache, "enabled", False)
+    return asyncio.run(run()), calls
+
+def test_serper_results_use_the_key_pool(monkeypatch):
+    results, calls = _search(monkeypatch, ["chave-1"])
+
+    assert results == [{"title": "Café no Brasil", "url": "https://cafe.example/a", "snippet": "..."}]
+    assert calls == [("chave-1", "café especial")]
+
+def test_rejected_key_falls_over_to_the_next(monkeypatch):
+    results, calls = _search(monkeypatch, ["recusada", "valida"], statuses={"recusada": 403})
+
+    assert results[0]["url"] == "https://cafe.example/a"
+    assert sorted(key for key, _ in calls) in (["recusada", "valida"], ["valida"])
+
+def test_failing_serper_falls_back_to_simulated_results(monkeypatch):
+    results, _ = _search(monkeypatch, ["quebrada"], statuses={"quebrada": 500})
+
+    assert results == search_tools._simulated_web_results("café especial")
+
+def test_fallback_results_are_not_cached(monkeypatch, tmp_path):
+    cache = ResponseCache("search:web", ttl=3600, max_entries=10, path=str(tmp_path / "cache.sqlite3"))
+    first, _ = _search(monkeypatch, ["chave"], statuses={"chave": 500}, cache=cache)
+    second, calls = _search(monkeypatch, ["chave"], cache=cache)
+    third, more_calls = _search(monkeypatch, ["chave"], cache=cache)
+
+    assert first == search_tools._simulated_web_results("café especial")
+    assert second[0]["url"] == "https://cafe.example/a" and len(calls) == 1
+    assert third == second and more_calls == []
+
+def test_without_keys_results_are_simulated(monkeypatch):
+    results, calls = _search(monkeypatch, [])
+
+    assert calls == []
+    assert results == search_tools._simulated_web_results("café especial")
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.utils.seen_urls import BloomFilter, SeenUrls
+
+def test_bloom_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    items = [f"example.com/{i}" for i in range(1000)]
+
+    assert all(bloom.add(item) for item in items[:10])
+    for item in items[10:]:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert not bloom.add(items[0])
+
+def test_bloom_false_positive_rate_at_capacity():
+    bloom = BloomFilter(10000, 0.01)
+    for i in range(10000):
+        bloom.add(f"example.com/dentro/{i}")
+
+    probes = 20000
+    false_positives = sum(f"example.com/fora/{i}" in bloom for i in range(probes))
+    assert false_positives / probes < 0.02
+
+def test_bloom_round_trip():
+    bloom = BloomFilter(500, 0.01)
+    for i in range(300):
+        bloom.add(f"example.com/{i}")
+
+    loaded = BloomFilter.from_bytes(bloom.to_bytes(), 500, 0.01)
+    assert (loaded.num_bits, loaded.num_hashes, loaded.count) == (bloom.num_bits, bloom.num_hashes, 300)
+    assert all(f"example.com/{i}" in loaded for i in range(300))
+
+@pytest.mark.parametrize("mangle", [lambda data: b"XXXXXXXX" + data[8:], lambda data: data[:-1]])
+def test_bloom_rejects_bad_files(mangle):
+    data = BloomFilter(100, 0.01).to_bytes()
+    with pytest.raises(ValueError):
+        BloomFilter.from_bytes(mangle(data), 100, 0.01)
+
+def test_seen_urls_save_and_load(tmp_path):
+    path = str(tmp_path / "seen.bloom")
+
+    async def run():
+        seen = SeenUrls(path, capacity=1000, save_every=2)
+        seen.mark("https://www.example.com/a/")
+        seen.mark("https://example.com/b")
+        await seen.close()
+
+    asyncio.run(run())
+    reloaded = SeenUrls(path, capacity=1000)
+    # Variantes da mesma URL (url_key) também contam como vistas
+    assert reloaded.seen("http://example.com/a")
+    assert reloaded.seen("https://example.com/b?utm_source=x")
+    assert not reloaded.seen("https://example.com/c")
+    assert reloaded.filter.count == 2
+
+def test_seen_urls_starts_over_on_corrupt_file(tmp_path):
+    path = tmp_path / "seen.bloom"
+    path.write_bytes(b"lixo")
+
+    seen = SeenUrls(str(path), capacity=1000)
+    assert not seen.seen("https://example.com/a")
+    assert seen.filter.count == 0
+
+def test_page_cache_is_used_when_filter_lost_the_url(tmp_path, monkeypatch):
+    from app.tools import extraction_tools
+    from app.utils.page_cache import CachedPage
+
+    url = "https://example.com/artigo"
+    entry = CachedPage(url, "hash", None, None, fetched_at=10**10, result={"url": url, "content": "texto"}, ttl=60)
+
+    async def lookup(requested):
+        return entry if requested == url else None
+
+    async def no_network(*args, **kwargs):
+        raise AssertionError("o cache deveria ter sido usado")
+
+    seen = SeenUrls(str(tmp_path / "seen.bloom"), capacity=1000)
+    monkeypatch.setattr(extraction_tools, "seen_urls", seen)
+    monkeypatch.setattr(extraction_tools.page_cache, "lookup", lookup)
+    monkeypatch.setattr(extraction_tools.fetch_scheduler, "allowed", no_network)
+
+    result = asyncio.run(extraction_tools.extract_content_robust(url))
+    assert result == {"url": url, "content": "texto"}
+    # O filtro (novo, como após perder o arquivo) é recomposto a partir do cache
+    assert seen.seen(url)
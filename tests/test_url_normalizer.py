@@ -0,0 +1,47 @@
+import pytest
+
+from app.utils.url_normalizer import normalize_url, url_key
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTP://WWW.Example.COM:80/a/./b/../c//d#frag", "http://www.example.com/a/c/d"),
+    ("example.com", "https://example.com/"),
+    ("https://example.com:443/", "https://example.com/"),
+    ("https://example.com:8443/x", "https://example.com:8443/x"),
+    ("https://example.com/%7euser/%2f", "https://example.com/~user/%2F"),
+    ("  https://example.com/a/  ", "https://example.com/a/"),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+@pytest.mark.parametrize("param", [
+    "utm_source=x", "UTM_Campaign=x", "pk_kwd=x", "mtm_source=x", "fbclid=x", "gclid=x",
+    "msclkid=x", "_ga=x", "_gl=x", "mc_cid=x", "igshid=x",
+])
+def test_tracking_params_are_removed(param):
+    assert normalize_url(f"https://example.com/a?page=2&{param}") == "https://example.com/a?page=2"
+
+def test_query_is_sorted_and_keeps_blank_values():
+    assert normalize_url("https://example.com/a?b=2&a=1&c=") == "https://example.com/a?a=1&b=2&c="
+    assert normalize_url("https://example.com/a?b=2&a=1") == normalize_url("https://example.com/a?a=1&b=2")
+
+def test_parameters_that_change_content_are_kept():
+    assert normalize_url("https://example.com/a?ref=home&id=7") == "https://example.com/a?id=7&ref=home"
+
+@pytest.mark.parametrize("variant", [
+    "http://example.com/noticia",
+    "https://www.example.com/noticia",
+    "https://example.com/noticia/",
+    "HTTP://WWW.EXAMPLE.COM/noticia/?utm_source=newsletter#topo",
+])
+def test_url_key_treats_variants_as_same_url(variant):
+    assert url_key(variant) == url_key("https://example.com/noticia")
+
+def test_url_key_distinguishes_different_pages():
+    keys = {
+        url_key("https://example.com/noticia"),
+        url_key("https://example.com/noticia?page=2"),
+        url_key("https://example.com/outra"),
+        url_key("https://blog.example.com/noticia"),
+        url_key("https://example.com:8443/noticia"),
+    }
+    assert len(keys) == 5